@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from django.utils import timezone
+
+from .models import OutgoingEmail, User
+from .tokens import revoke_tokens
 
 
 class UserAdmin(BaseUserAdmin):
@@ -34,10 +37,42 @@ class UserAdmin(BaseUserAdmin):
     readonly_fields = ('last_login', 'created_at', 'updated_at')
     filter_horizontal = ('groups', 'user_permissions',)
 
+    # Fields stamped into tokens or checked when authenticating
+    token_fields = {'password', 'role', 'is_active', 'is_staff', 'is_superuser'}
+
     def get_fieldsets(self, request, obj=None):
         if not obj:
             return self.add_fieldsets
         return super().get_fieldsets(request, obj)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and self.token_fields & set(form.changed_data):
+            revoke_tokens(obj)
+
+    def user_change_password(self, request, id, form_url=''):
+        response = super().user_change_password(request, id, form_url)
+        if request.method == 'POST' and response.status_code == 302:
+            revoke_tokens(self.get_object(request, id))
+        return response
+
 admin.site.register(User, UserAdmin)
 
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the email outbox.
+    """
+
+    list_display = ('to_email', 'kind', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind', 'created_at')
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ('retry_now',)
+
+    @admin.action(description='Queue selected emails for delivery now')
+    def retry_now(self, request, queryset):
+        queued = queryset.exclude(status='sent').update(status='queued', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{queued} email(s) queued.')
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
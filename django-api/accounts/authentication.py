@@ -0,0 +1,119 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+from .tokens import TOKEN_VERSION_CLAIM, USER_CLAIMS, aget_token_version, get_token_version
+
+
+def has_user_claims(token):
+    return all(claim in token for claim in (api_settings.USER_ID_CLAIM, TOKEN_VERSION_CLAIM, *USER_CLAIMS))
+
+
+def user_from_claims(token):
+    """
+    Build the user from the claims of a token, without a query. Its other
+    fields are deferred: reading one loads it from the database.
+    """
+    values = {claim: token[claim] for claim in USER_CLAIMS}
+    values[api_settings.USER_ID_FIELD] = User._meta.get_field(api_settings.USER_ID_FIELD).to_python(
+        token[api_settings.USER_ID_CLAIM]
+    )
+    values['is_active'] = True
+    values['token_version'] = token[TOKEN_VERSION_CLAIM]
+    # from_db() takes the values in field order
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(User.objects.db, field_names, [values[name] for name in field_names])
+
+
+def load_user(user):
+    """
+    Load the fields a user built from token claims is missing, for views
+    that need more than its id, role and permission flags.
+    """
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+async def aload_user(user):
+    deferred = user.get_deferred_fields()
+    if deferred:
+        await user.arefresh_from_db(fields=deferred)
+    return user
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT authentication that trusts the signed claims of the token instead
+    of loading the user on every request.
+
+    Tokens carry the user id, role, staff and superuser flags and a token
+    version. The request user is built from those claims, and the version
+    is checked against the user's current one, which is cached; bumping it
+    revokes every token issued before. Tokens without these claims, issued
+    before they were added, are authenticated with a user lookup.
+    """
+
+    def get_user(self, validated_token):
+        if not has_user_claims(validated_token):
+            return super().get_user(validated_token)
+
+        version = get_token_version(validated_token[api_settings.USER_ID_CLAIM])
+        if version is None:
+            # No active user with that id; the lookup raises the right error
+            version = super().get_user(validated_token).token_version
+        self.check_token_version(validated_token, version)
+        return user_from_claims(validated_token)
+
+    def check_token_version(self, validated_token, version):
+        if validated_token[TOKEN_VERSION_CLAIM] != version:
+            raise AuthenticationFailed(_('Token has been revoked.'), code='token_revoked')
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if not has_user_claims(validated_token):
+            return await self.alookup_user(validated_token)
+
+        version = await aget_token_version(validated_token[api_settings.USER_ID_CLAIM])
+        if version is None:
+            version = (await self.alookup_user(validated_token)).token_version
+        self.check_token_version(validated_token, version)
+        return user_from_claims(validated_token)
+
+    async def alookup_user(self, validated_token):
+        """
+        Async version of simplejwt's ``get_user``.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
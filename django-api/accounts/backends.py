@@ -0,0 +1,26 @@
+from django.contrib.auth import backends, get_user_model
+
+from .hashers import check_password, make_password
+
+User = get_user_model()
+
+
+class ModelBackend(backends.ModelBackend):
+    """
+    Model backend that verifies passwords in the password hashing pool
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            make_password(password)
+            return None
+        if check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
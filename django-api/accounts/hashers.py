@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """
+    scrypt with the cost parameters of PASSWORD_HASHER_PARAMS['scrypt']
+    """
+
+    def __init__(self):
+        for name, value in settings.PASSWORD_HASHER_PARAMS.get('scrypt', {}).items():
+            setattr(self, name, value)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id with the cost parameters of PASSWORD_HASHER_PARAMS['argon2']
+    """
+
+    def __init__(self):
+        for name, value in settings.PASSWORD_HASHER_PARAMS.get('argon2', {}).items():
+            setattr(self, name, value)
+
+
+def _init_worker():
+    # Workers are spawned, so they import nothing from the server process
+    django.setup()
+
+
+def _verify(password, encoded):
+    """
+    Check ``password`` against ``encoded`` and, when the hash was made by
+    another hasher or with other parameters, hash it again for storage.
+    """
+    is_correct, must_update = hashers.verify_password(password, encoded)
+    return is_correct, hashers.make_password(password) if is_correct and must_update else None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a threaded server process is unsafe, spawn instead
+            _executor = ProcessPoolExecutor(
+                settings.PASSWORD_HASHING_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def run_hasher(func, *args):
+    """
+    Run a hashing function in the password hashing pool, so the calling
+    thread waits without holding the GIL, or in the calling thread when
+    PASSWORD_HASHING_WORKERS is 0.
+    """
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return func(*args)
+    return get_executor().submit(func, *args).result()
+
+
+def make_password(password):
+    return run_hasher(hashers.make_password, password)
+
+
+def check_password(user, password):
+    """
+    ``user.check_password()`` that hashes in the pool. Hashes made by an
+    older hasher, or with older parameters, are upgraded when they match.
+    """
+    is_correct, upgraded = run_hasher(_verify, password, user.password)
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import OutgoingEmail
+
+User = get_user_model()
+
+
+def queue_mail(subject, body, to_email):
+    return OutgoingEmail.objects.create(subject=subject, body=body, to_email=to_email)
+
+
+def queue_password_reset(email):
+    """
+    Queue a password reset link for ``email``. The account is looked up when
+    the mail is delivered, so this costs the same whether it exists or not.
+    """
+    return OutgoingEmail.objects.create(kind='password_reset', to_email=email)
+
+
+def render_password_reset(outgoing):
+    user = User.objects.filter(email=outgoing.to_email, is_active=True).first()
+    if user is None:
+        return None
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    # Build reset URL (frontend should handle this)
+    reset_url = f"/reset-password/{uid}/{token}/"
+    return 'Password Reset Request', f'Please click the link to reset your password: {reset_url}'
+
+
+def render(outgoing):
+    """
+    Return the message for a queued email, or None if it should be dropped.
+    """
+    if outgoing.kind == 'password_reset':
+        rendered = render_password_reset(outgoing)
+        if rendered is None:
+            return None
+        subject, body = rendered
+    else:
+        subject, body = outgoing.subject, outgoing.body
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [outgoing.to_email])
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff before the next delivery attempt.
+    """
+    delay = settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_RETRY_BACKOFF_MAX))
+
+
+def record_failure(outgoing, error, now):
+    outgoing.attempts += 1
+    outgoing.last_error = str(error) or error.__class__.__name__
+    if outgoing.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        outgoing.status = 'failed'
+    else:
+        outgoing.next_attempt_at = now + retry_delay(outgoing.attempts)
+    outgoing.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def send_queued_mail(batch_size=None):
+    """
+    Deliver the queued emails that are due, a batch at a time, over one
+    connection to the email backend. Failed deliveries are retried with
+    backoff, up to EMAIL_OUTBOX_MAX_ATTEMPTS. Returns the number of emails
+    sent, discarded and failed by this run.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    counts = {'sent': 0, 'discarded': 0, 'failed': 0}
+    connection = get_connection(fail_silently=False)
+    last_id = 0
+    try:
+        while True:
+            now = timezone.now()
+            batch = list(
+                OutgoingEmail.objects.filter(status='queued', next_attempt_at__lte=now, id__gt=last_id)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                return counts
+            last_id = batch[-1].id
+            for outgoing in batch:
+                message = render(outgoing)
+                if message is None:
+                    outgoing.status = 'discarded'
+                    outgoing.save(update_fields=['status'])
+                    counts['discarded'] += 1
+                    continue
+                try:
+                    # Opens the connection once; backends close connections
+                    # that send_messages() had to open itself
+                    connection.open()
+                    connection.send_messages([message])
+                except Exception as exc:
+                    # The connection may be broken, reopen it for the next one
+                    connection.close()
+                    record_failure(outgoing, exc, now)
+                    counts['failed'] += 1
+                else:
+                    outgoing.status = 'sent'
+                    outgoing.sent_at = timezone.now()
+                    outgoing.save(update_fields=['status', 'sent_at'])
+                    counts['sent'] += 1
+    finally:
+        connection.close()
@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+from accounts.hashers import _init_worker
+
+PASSWORD = 'correct horse battery staple'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the CPU time per login and the login throughput of PBKDF2 with the '
+        'configured password hasher, verifying in the request threads or in a pool of '
+        'hashing processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=64, help='Password checks per run.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent request threads.')
+        parser.add_argument('--workers', type=int, default=settings.PASSWORD_HASHING_WORKERS or 4,
+                            help='Hashing processes in the pool.')
+
+    def handle(self, *args, **options):
+        algorithms = ['pbkdf2_sha256', hashers.get_hasher().algorithm]
+        with ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as pool:
+            # Start the workers before timing anything
+            list(pool.map(abs, range(options['workers'])))
+
+            self.stdout.write(
+                f'{"hasher":<16} {"CPU ms/login":>13} {"threads logins/s":>17} {"pool logins/s":>14}'
+            )
+            for algorithm in algorithms:
+                encoded = hashers.make_password(PASSWORD, hasher=algorithm)
+
+                start = time.process_time()
+                for _ in range(4):
+                    hashers.check_password(PASSWORD, encoded)
+                cpu_ms = (time.process_time() - start) / 4 * 1000
+
+                inline = self.throughput(lambda: hashers.check_password(PASSWORD, encoded), options)
+                pooled = self.throughput(
+                    lambda: pool.submit(hashers.check_password, PASSWORD, encoded).result(), options
+                )
+                self.stdout.write(f'{algorithm:<16} {cpu_ms:>13.1f} {inline:>17.1f} {pooled:>14.1f}')
+
+    def throughput(self, check, options):
+        """
+        Logins per second with ``concurrency`` threads running ``check``.
+        """
+        with ThreadPoolExecutor(options['concurrency']) as threads:
+            start = time.perf_counter()
+            if not all(threads.map(lambda _: check(), range(options['logins']))):
+                raise AssertionError('A password check failed')
+            return options['logins'] / (time.perf_counter() - start)
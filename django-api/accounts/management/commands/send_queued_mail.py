@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver the queued emails that are due, over one connection to the email '
+        'backend. Run it periodically, e.g. from cron, or keep it running with --poll. '
+        'Run a single instance: concurrent runs may send an email twice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                            help='Emails loaded per query.')
+        parser.add_argument('--poll', type=float, metavar='SECONDS',
+                            help='Keep running, looking for due emails every SECONDS.')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = send_queued_mail(options['batch_size'])
+            if any(counts.values()) or not options['poll']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Sent {counts["sent"]} email(s), discarded {counts["discarded"]}, '
+                    f'{counts["failed"]} failed.'
+                ))
+            if not options['poll']:
+                return
+            time.sleep(options['poll'])
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
@@ -70,6 +71,10 @@ class User(TimeStampedModel, AbstractUser):
     email = models.EmailField(_('email address'), unique=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='Customer')
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+    token_version = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='Stamped into issued tokens. Incremented to revoke all of them.'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []  # Email & Password are required by default
@@ -82,6 +87,10 @@ class User(TimeStampedModel, AbstractUser):
     def __str__(self):
         return self.email
 
+    @property
+    def is_admin(self):
+        return self.role == 'ADMIN' or self.is_staff or self.is_superuser
+
     def save(self, *args, **kwargs):
         """
         Check if new User set to Admin make set staff to true
@@ -104,3 +113,37 @@ class UserProfile(TimeStampedModel):
     class Meta:
         abstract = True
 
+
+class OutgoingEmail(models.Model):
+    """
+    Email queued for delivery by the send_queued_mail command
+    """
+    KIND_CHOICES = (
+        ('message', 'Message'),
+        ('password_reset', 'Password reset'),  # Rendered at delivery, if the address has an active user
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('discarded', 'Discarded'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='message')
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outgoingemail_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.to_email} ({self.status})"
@@ -1,7 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import TOKEN_VERSION_CLAIM, add_user_claims, get_token_version
 
 User = get_user_model()
 
@@ -29,8 +35,13 @@ class UserSerializer(serializers.ModelSerializer):
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
-    Custom token serializer to include user data in response
+    Custom token serializer to include user data in response, and the
+    claims JWTAuthentication builds the request user from in the tokens
     """
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data['user'] = UserSerializer(self.user).data
@@ -38,6 +49,18 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Token refresh that rejects refresh tokens revoked by a token version bump
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if TOKEN_VERSION_CLAIM in refresh and \
+                refresh[TOKEN_VERSION_CLAIM] != get_token_version(refresh.get(api_settings.USER_ID_CLAIM)):
+            raise InvalidToken(_('Token has been revoked.'))
+        return super().validate(attrs)
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for password change
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import forget_token_version
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    """
+    Stop accepting the tokens of a deleted user as soon as it is committed.
+    """
+    forget_token_version(instance.pk)
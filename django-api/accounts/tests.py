@@ -1,3 +1,347 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.throttling import TokenBucketThrottle
+from .mail import queue_mail, send_queued_mail
+from .models import OutgoingEmail
+from .serializers import CustomTokenObtainPairSerializer
+from .views import AsyncMeView
+
+User = get_user_model()
+
+
+class AsyncMeViewTests(TestCase):
+    """
+    The async /api/auth/me/ view must authenticate and answer like MeView
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='me@example.com', password=None, first_name='Ada')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, token):
+        request = APIRequestFactory().get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return async_to_sync(AsyncMeView.as_view())(request)
+
+    def test_same_response_as_sync_view(self):
+        token = AccessToken.for_user(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        expected = client.get('/api/auth/me/')
+
+        with self.assertNumQueries(1):
+            response = self.get(token)
+        self.assertEqual((response.status_code, response.content), (200, expected.content))
+
+        # Tokens with claims only need the user's remaining fields
+        claims_token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.get(claims_token)
+        with self.assertNumQueries(1):
+            response = self.get(claims_token)
+        self.assertEqual(response.content, expected.content)
+
+    def test_rejects_unknown_and_inactive_users(self):
+        token = AccessToken.for_user(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(token).data['code'], 'user_inactive')
+
+        User.objects.filter(pk=self.user.pk).delete()
+        response = self.get(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_not_found')
+
+    def test_rejects_missing_credentials(self):
+        response = async_to_sync(AsyncMeView.as_view())(APIRequestFactory().get('/api/auth/me/'))
+        self.assertEqual(response.status_code, 401)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    Tests for authenticating from token claims and revoking tokens
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='claims@example.com', password='Old-secret-42', role='ADMIN')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'email': self.user.email, 'password': 'Old-secret-42'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['access'], response.data['refresh']
+
+    def me(self, access):
+        return self.client.get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_tokens_carry_claims(self):
+        access, _ = self.login()
+        token = AccessToken(access)
+        self.assertEqual((token['role'], token['is_staff'], token['token_version']), ('ADMIN', True, 0))
+        self.assertEqual(self.me(access).data['email'], self.user.email)
+
+    def test_request_user_is_built_from_claims(self):
+        access, _ = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.client.get('/api/cart/summary/?fields=totals')
+        # Only the product insert; the admin check uses the role claim
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks():
+            response = self.client.post('/api/products/categories/', {'name': 'Garden'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_tokens_without_claims_still_work(self):
+        self.assertEqual(self.me(AccessToken.for_user(self.user)).status_code, 200)
+
+    def test_change_password_revokes_tokens(self):
+        access, refresh = self.login()
+        self.me(access)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/auth/change-password/', {
+                'old_password': 'Old-secret-42', 'new_password': 'New-secret-42', 'new_password2': 'New-secret-42',
+            }, HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.me(access)
+        self.assertEqual((response.status_code, response.data['code']), (401, 'token_revoked'))
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        response = self.client.post('/api/auth/login/', {'email': self.user.email, 'password': 'New-secret-42'})
+        self.assertEqual(self.me(response.data['access']).status_code, 200)
+
+    def test_reset_password_revokes_tokens(self):
+        access, _ = self.login()
+        self.me(access)
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = default_token_generator.make_token(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/auth/reset-password/{uid}/{token}/', {'password': 'New-secret-42'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.me(access).data['code'], 'token_revoked')
+
+    def test_refresh_keeps_claims(self):
+        _, refresh = self.login()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'ADMIN')
+        self.assertEqual(self.me(response.data['access']).status_code, 200)
+
+    def test_deleted_and_inactive_users_are_rejected(self):
+        access, refresh = self.login()
+        self.me(access)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertEqual(self.me(access).data['code'], 'user_inactive')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).delete()
+        self.assertEqual(self.me(access).data['code'], 'user_not_found')
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class PasswordHashingTests(TestCase):
+    """
+    Tests for the password hashers and the login path
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, email, password):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password})
+
+    def test_new_passwords_use_the_first_hasher(self):
+        user = User.objects.create_user(email='new@example.com', password='Secret-42')
+        hasher = identify_hasher(user.password)
+        self.assertIn(hasher.algorithm, ('argon2', 'scrypt'))
+        self.assertFalse(hasher.must_update(user.password))
+
+    def test_legacy_hashes_are_upgraded_on_login(self):
+        user = User.objects.create_user(email='legacy@example.com')
+        User.objects.filter(pk=user.pk).update(password=make_password('Secret-42', hasher='pbkdf2_sha256'))
+
+        self.assertEqual(self.login(user.email, 'Wrong-42').status_code, 401)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+
+        self.assertEqual(self.login(user.email, 'Secret-42').status_code, 200)
+        user.refresh_from_db()
+        self.assertNotEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+        self.assertTrue(user.check_password('Secret-42'))
+
+    def test_unknown_email_is_rejected(self):
+        self.assertEqual(self.login('nobody@example.com', 'Secret-42').status_code, 401)
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_hashing_in_worker_pool(self):
+        user = User.objects.create_user(email='pool@example.com', password='Old-secret-42')
+        response = self.login(user.email, 'Old-secret-42')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.put('/api/auth/change-password/', {
+            'old_password': 'Old-secret-42', 'new_password': 'New-secret-42', 'new_password2': 'New-secret-42',
+        }, HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('New-secret-42'))
+
+
+class ConnectionCountingBackend(locmem.EmailBackend):
+    """
+    Email backend that opens connections like the SMTP one, and counts them
+    """
+    connections = 0
+
+    def open(self):
+        if getattr(self, 'connected', False):
+            return False
+        self.connected = True
+        ConnectionCountingBackend.connections += 1
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        sent = super().send_messages(messages)
+        if new_connection:
+            self.close()
+        return sent
+
+
+class EmailOutboxTests(TestCase):
+    """
+    Tests for queued password reset emails and their delivery
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='reset@example.com', password=None)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def request_reset(self, email):
+        return self.client.post('/api/auth/reset-password/', {'email': email})
+
+    def test_reset_request_is_queued_without_looking_up_the_user(self):
+        responses = []
+        for email in (self.user.email, 'nobody@example.com'):
+            with self.assertNumQueries(1):
+                responses.append(self.request_reset(email))
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutgoingEmail.objects.filter(kind='password_reset', status='queued').count(), 2)
+
+    def test_worker_delivers_reset_link(self):
+        self.request_reset(self.user.email)
+        self.request_reset('nobody@example.com')
+        call_command('send_queued_mail', stdout=mock.Mock())
+
+        self.assertEqual([message.to for message in mail.outbox], [[self.user.email]])
+        self.assertEqual(
+            dict(OutgoingEmail.objects.values_list('to_email', 'status')),
+            {self.user.email: 'sent', 'nobody@example.com': 'discarded'},
+        )
+        reset_url = mail.outbox[0].body.split(': ')[1]
+        response = self.client.post(f'/api/auth{reset_url}', {'password': 'New-secret-42'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(EMAIL_BACKEND='accounts.tests.ConnectionCountingBackend')
+    def test_batches_share_one_connection(self):
+        ConnectionCountingBackend.connections = 0
+        for i in range(5):
+            queue_mail('Hello', 'Body', f'user{i}@example.com')
+        self.assertEqual(send_queued_mail(batch_size=2), {'sent': 5, 'discarded': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(ConnectionCountingBackend.connections, 1)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BACKOFF=60)
+    def test_failed_delivery_is_retried_with_backoff(self):
+        outgoing = queue_mail('Hello', 'Body', 'user@example.com')
+        send = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+        with mock.patch(send, side_effect=SMTPException('Server busy')):
+            self.assertEqual(send_queued_mail()['failed'], 1)
+            # Not due again yet
+            self.assertEqual(send_queued_mail()['failed'], 0)
+
+        outgoing.refresh_from_db()
+        self.assertEqual((outgoing.status, outgoing.attempts, outgoing.last_error), ('queued', 1, 'Server busy'))
+        delay = outgoing.next_attempt_at - timezone.now()
+        self.assertTrue(timedelta(seconds=55) < delay <= timedelta(seconds=60))
+
+        with mock.patch(send, side_effect=SMTPException('Server busy')):
+            for attempts in (2, 3):
+                OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+                send_queued_mail()
+        outgoing.refresh_from_db()
+        self.assertEqual((outgoing.status, outgoing.attempts), ('failed', 3))
+
+        OutgoingEmail.objects.update(status='queued', next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_mail()['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(THROTTLE_BUCKETS={'register': {'rate': '6/min', 'burst': 2}})
+class ThrottlingTests(TestCase):
+    """
+    Tests for the token bucket throttle, on the registration endpoint
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.now = 1_000_000.0
+        self.enterContext(mock.patch.object(TokenBucketThrottle, 'timer', side_effect=lambda: self.now))
+
+    def register(self, ip='10.0.0.1'):
+        # Invalid, so nothing but the throttle has any effect
+        return self.client.post('/api/auth/register/', {}, REMOTE_ADDR=ip)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.register().status_code for _ in range(3)], [400, 400, 429])
+        self.assertEqual(self.register()['Retry-After'], '10')
+
+        self.now += 9
+        self.assertEqual(self.register().status_code, 429)
+        self.now += 1
+        self.assertEqual([self.register().status_code for _ in range(2)], [400, 429])
+
+    def test_idle_bucket_holds_at_most_burst(self):
+        self.register()
+        self.now += 3600
+        self.assertEqual([self.register().status_code for _ in range(3)], [400, 400, 429])
+
+    def test_buckets_are_per_client(self):
+        self.assertEqual([self.register('10.0.0.1').status_code for _ in range(3)], [400, 400, 429])
+        self.assertEqual(self.register('10.0.0.2').status_code, 400)
+
+        # Other scopes are not throttled
+        self.assertEqual(self.client.post('/api/auth/login/', {}, REMOTE_ADDR='10.0.0.1').status_code, 400)
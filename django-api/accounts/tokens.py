@@ -0,0 +1,63 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import User
+
+# Claims embedded in every token, so authentication needs no user lookup
+TOKEN_VERSION_CLAIM = 'token_version'
+USER_CLAIMS = ('role', 'is_staff', 'is_superuser')
+
+
+def add_user_claims(token, user):
+    for name in USER_CLAIMS:
+        token[name] = getattr(user, name)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def token_version_key(user_id):
+    return f'accounts:token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Return the current token version of an active user, or None if there
+    is no such user. Versions are cached for TOKEN_VERSION_CACHE_TIMEOUT.
+    """
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_token_version(user_id):
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = await User.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).afirst()
+        if version is not None:
+            cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    """
+    Drop the cached version once the current transaction commits.
+    """
+    transaction.on_commit(partial(cache.delete, token_version_key(user_id)))
+
+
+def revoke_tokens(user):
+    """
+    Invalidate every access and refresh token issued to ``user`` so far.
+    """
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    forget_token_version(user.pk)
@@ -1,15 +1,22 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from config.async_views import read_async
 from .views import (
     RegisterView,
     CustomTokenObtainPairView,
     ChangePasswordView,
     ResetPasswordEmailView,
     ResetPasswordConfirmView,
-    MeView
+    MeView,
+    AsyncMeView
 )
 
+me_view = MeView.as_view()
+if settings.ASYNC_READ_VIEWS:
+    me_view = read_async(AsyncMeView.as_view(), me_view)
+
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -17,5 +24,5 @@ urlpatterns = [
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('reset-password/', ResetPasswordEmailView.as_view(), name='reset_password'),
     path('reset-password/<uidb64>/<token>/', ResetPasswordConfirmView.as_view(), name='password_reset_confirm'),
-    path('me/', MeView.as_view(), name='me'),
+    path('me/', me_view, name='me'),
 ]
\ No newline at end of file
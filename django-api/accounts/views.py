@@ -1,20 +1,23 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.urls import reverse
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import urlsafe_base64_decode
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from config.async_views import AsyncViewMixin
+from .authentication import aload_user, load_user
+from .hashers import check_password, make_password
+from .mail import queue_password_reset
 from .serializers import (
     UserSerializer,
     CustomTokenObtainPairSerializer,
     ChangePasswordSerializer,
     ResetPasswordEmailSerializer
 )
+from .tokens import revoke_tokens
 
 User = get_user_model()
 
@@ -26,12 +29,22 @@ class MeView(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        return load_user(self.request.user)
+
+class AsyncMeView(AsyncViewMixin, MeView):
+    """
+    Async variant of MeView, served under ASGI when ASYNC_READ_VIEWS is on
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await aload_user(request.user)
+        return self.retrieve(request, *args, **kwargs)
 
 class RegisterView(generics.CreateAPIView):
     """
     API endpoint for user registration
     """
+    throttle_scope = 'register'
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     serializer_class = UserSerializer
@@ -40,6 +53,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom token view to use our serializer
     """
+    throttle_scope = 'login'
     serializer_class = CustomTokenObtainPairSerializer
 
 class ChangePasswordView(generics.UpdateAPIView):
@@ -50,7 +64,7 @@ class ChangePasswordView(generics.UpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        return load_user(self.request.user)
 
     def update(self, request, *args, **kwargs):
         user = self.get_object()
@@ -58,12 +72,13 @@ class ChangePasswordView(generics.UpdateAPIView):
 
         if serializer.is_valid():
             # Check old password
-            if not user.check_password(serializer.validated_data.get("old_password")):
+            if not check_password(user, serializer.validated_data.get("old_password")):
                 return Response({"old_password": ["Wrong password."]}, status=status.HTTP_400_BAD_REQUEST)
 
             # Set new password
-            user.set_password(serializer.validated_data.get("new_password"))
+            user.password = make_password(serializer.validated_data.get("new_password"))
             user.save()
+            revoke_tokens(user)
             return Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -72,36 +87,15 @@ class ResetPasswordEmailView(APIView):
     """
     API endpoint for sending password reset email
     """
+    throttle_scope = 'reset_password'
     permission_classes = (permissions.AllowAny,)
 
     def post(self, request):
         serializer = ResetPasswordEmailSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data.get('email')
-            try:
-                user = User.objects.get(email=email)
-                # Generate token
-                token = default_token_generator.make_token(user)
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
-
-                # Build reset URL (frontend should handle this)
-                reset_url = f"/reset-password/{uid}/{token}/"
-
-                # Send email
-                send_mail(
-                    'Password Reset Request',
-                    f'Please click the link to reset your password: {reset_url}',
-                    'noreply@ecommerce.com',
-                    [email],
-                    fail_silently=False,
-                )
-                return Response(
-                    {"message": "Password reset email has been sent."},
-                    status=status.HTTP_200_OK
-                )
-            except User.DoesNotExist:
-                # Don't reveal that email doesn't exist for security
-                pass
+            # Queued without looking the user up, so the response takes as
+            # long whether or not the email exists and doesn't reveal it
+            queue_password_reset(serializer.validated_data.get('email'))
 
         return Response(
             {"message": "Password reset email has been sent if the email exists."},
@@ -129,8 +123,9 @@ class ResetPasswordConfirmView(APIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
-                user.set_password(password)
+                user.password = make_password(password)
                 user.save()
+                revoke_tokens(user)
                 return Response(
                     {"message": "Password has been reset successfully."},
                     status=status.HTTP_200_OK
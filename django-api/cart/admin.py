@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CartItem
+from .models import Cart, CartItem
 
 
 class CartItemAdmin(admin.ModelAdmin):
@@ -7,6 +7,7 @@ class CartItemAdmin(admin.ModelAdmin):
     Admin configuration for the CartItem model.
     """
     list_display = ('user', 'product', 'quantity', 'total_price', 'created_at', 'updated_at')
+    list_select_related = ('user', 'product')
     list_filter = ('user', 'product', 'created_at')
     search_fields = ('user__email', 'product__name')
     readonly_fields = ('created_at', 'updated_at', 'total_price')
@@ -17,4 +18,21 @@ class CartItemAdmin(admin.ModelAdmin):
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
 
+    # Edits made here bypass the API, so the cart totals are recomputed
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        user_ids = [obj.user_id]
+        if change and 'user' in form.changed_data:
+            user_ids.append(form.initial['user'])
+        Cart.objects.recalculate(user_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Cart.objects.recalculate([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        Cart.objects.recalculate(user_ids)
+
 admin.site.register(CartItem, CartItemAdmin)
@@ -0,0 +1,79 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from cart.models import Cart, CartItem
+from cart.serializers import CartItemSerializer
+from cart.views import CartViewSet
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+def legacy_summary(user):
+    """
+    The Python-side summary that the cart header replaced, kept for comparison.
+    """
+    queryset = CartItem.objects.filter(user=user).select_related('product')
+    total = sum(item.total_price for item in queryset)
+    count = queryset.count()
+    return {'items': CartItemSerializer(queryset, many=True).data, 'total': total, 'count': count}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the cart summary computed in Python with the one read from the '
+        'cart header, with and without items. Benchmark data is created in a transaction that is '
+        'rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark')
+            products = Product.objects.bulk_create([
+                Product(name=f'Product {i}', description='Benchmark product ' * 20,
+                        price=Decimal('4.99'), category=category)
+                for i in range(max(options['sizes']))
+            ])
+
+            self.stdout.write(
+                f'{"lines":>6} {"legacy ms":>10} {"queries":>8} {"header ms":>13} {"queries":>8} '
+                f'{"totals ms":>10} {"queries":>8}'
+            )
+            for size in options['sizes']:
+                user = User.objects.create_user(email=f'benchmark-summary-{size}@example.com', password=None)
+                CartItem.objects.bulk_create([CartItem(user=user, product=p, quantity=2) for p in products[:size]])
+                Cart.objects.recalculate([user.pk])
+                request = Request(RequestFactory().get('/api/cart/summary/'))
+                request.user = user
+                view = CartViewSet(request=request, format_kwarg=None, kwargs={})
+
+                results = [
+                    self.time(lambda: legacy_summary(user), options['repeat']),
+                    self.time(lambda: view.get_summary(), options['repeat']),
+                    self.time(lambda: view.get_summary(include_items=False), options['repeat']),
+                ]
+                self.stdout.write(f'{size:>6} ' + ' '.join(
+                    f'{ms:>{width}.2f} {queries:>8}'
+                    for (ms, queries), width in zip(results, (10, 13, 10))
+                ))
+            transaction.set_rollback(True)
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+        return min(timings), len(queries)
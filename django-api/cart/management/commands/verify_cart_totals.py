@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cart.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare every cart header with the cart rows it summarizes, report the '
+        'carts whose totals have drifted and recompute them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not repair it.')
+
+    def handle(self, *args, **options):
+        drifted = []
+        for cart, count, subtotal in Cart.objects.with_drift():
+            drifted.append(cart.pk)
+            self.stdout.write(
+                f'{cart.pk}: stored {cart.item_count} items / {cart.subtotal}, actual {count} items / {subtotal}'
+            )
+
+        missing = list(
+            CartItem.objects.exclude(user__in=Cart.objects.values('pk'))
+            .values_list('user', flat=True).distinct()
+        )
+        for user_id in missing:
+            self.stdout.write(f'{user_id}: no cart header')
+
+        if options['dry_run']:
+            self.stdout.write(f'Found {len(drifted)} drifted and {len(missing)} missing cart header(s).')
+            return
+
+        with transaction.atomic():
+            for start in range(0, len(drifted) + len(missing), 500):
+                Cart.objects.recalculate((drifted + missing)[start:start + 500])
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {len(drifted)} drifted and {len(missing)} missing cart header(s).'
+        ))
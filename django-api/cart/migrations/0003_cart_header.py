@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:16
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def create_cart_headers(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    totals = {
+        row['user']: row
+        for row in CartItem.objects.values('user').annotate(
+            count=Count('id'),
+            total=Sum(F('quantity') * F('product__price'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+    }
+    empty = {'count': 0, 'total': Decimal('0')}
+    Cart.objects.bulk_create(
+        [
+            Cart(user_id=pk, item_count=totals.get(pk, empty)['count'], subtotal=totals.get(pk, empty)['total'])
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_first_name_alter_user_last_name'),
+        ('cart', '0002_cartitem_user_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_cart_headers, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,62 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import connection, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from products.models import Product
 
+
+def product_price(product_id):
+    """
+    Subquery expression for a product's current price
+    """
+    return Subquery(Product.objects.filter(pk=product_id).values('price')[:1])
+
+
+class CartItemManager(models.Manager):
+    """
+    Manager for cart items with an atomic add-to-cart operation
+    """
+
+    def add(self, user, product_id, quantity):
+        """
+        Add ``quantity`` units of a product to the user's cart with a single
+        ``INSERT ... ON CONFLICT DO UPDATE`` statement, so concurrent adds of
+        the same product never lose an increment.
+
+        Returns ``(item_id, quantity, created)`` for the resulting row, or
+        ``None`` if the product does not exist.
+        """
+        opts = self.model._meta
+        now = opts.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+        user_id = opts.get_field('user').get_db_prep_value(user.pk, connection)
+        table = opts.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (user_id, product_id, quantity, created_at, updated_at)
+                SELECT %s, p.id, %s, %s, %s
+                FROM {Product._meta.db_table} p
+                WHERE p.id = %s
+                ON CONFLICT (user_id, product_id) DO UPDATE
+                SET quantity = {table}.quantity + excluded.quantity,
+                    updated_at = excluded.updated_at
+                RETURNING id, quantity, created_at = updated_at
+                """,
+                [user_id, quantity, now, now, product_id],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        # Only a freshly inserted row has matching timestamps
+        item_id, quantity, created = row
+        return item_id, quantity, bool(created)
+
+
 class CartItem(models.Model):
     """
     Shopping cart item model
@@ -12,12 +67,104 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemManager()
+
     class Meta:
         unique_together = ('user', 'product')
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='cartitem_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s cart: {self.product.name} x {self.quantity}"
 
     @property
     def total_price(self):
-        return self.quantity * self.product.price
\ No newline at end of file
+        return self.quantity * self.product.price
+
+
+class CartManager(models.Manager):
+    """
+    Manager for cart headers. Every cart mutation keeps the running totals
+    up to date through these methods.
+    """
+
+    def apply_delta(self, user, lines=0, amount=0):
+        """
+        Add ``lines`` and ``amount`` (a number or a query expression) to the
+        user's running totals with one UPDATE of F() expressions. Call it in
+        the same transaction as, and after, the change to the cart rows; a
+        missing header is then created from those rows instead.
+        """
+        updated = self.filter(pk=user.pk).update(
+            item_count=F('item_count') + lines,
+            subtotal=F('subtotal') + amount,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            self.recalculate([user.pk])
+
+    def reset(self, user):
+        """
+        Zero the user's totals, for when the whole cart has been emptied
+        """
+        self.filter(pk=user.pk).update(item_count=0, subtotal=Decimal('0'), updated_at=timezone.now())
+
+    def recalculate(self, user_ids):
+        """
+        Recompute the totals of the given users' carts from their cart rows.
+
+        ``user_ids`` is a list, for which missing headers are created, or a
+        queryset of user ids, for which only existing headers are updated.
+        """
+        if isinstance(user_ids, (list, tuple, set)):
+            self.bulk_create([self.model(user_id=pk) for pk in user_ids], ignore_conflicts=True)
+
+        items = CartItem.objects.filter(user=OuterRef('pk')).values('user')
+        return self.filter(pk__in=user_ids).update(
+            item_count=Coalesce(Subquery(items.annotate(count=Count('id')).values('count')), 0),
+            subtotal=Coalesce(
+                Subquery(items.annotate(total=Sum(F('quantity') * F('product__price'))).values('total')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def with_drift(self):
+        """
+        Yield ``(cart, actual_count, actual_subtotal)`` for every header whose
+        stored totals differ from its cart rows.
+        """
+        items = CartItem.objects.filter(user=OuterRef('pk')).values('user')
+        carts = self.annotate(
+            actual_count=Coalesce(Subquery(items.annotate(count=Count('id')).values('count')), 0),
+            actual_subtotal=Coalesce(
+                Subquery(items.annotate(total=Sum(F('quantity') * F('product__price'))).values('total')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        # Compared in Python, after the decimals have been quantized, as some
+        # backends store them as floating point
+        for cart in carts.iterator(chunk_size=2000):
+            if (cart.item_count, cart.subtotal) != (cart.actual_count, cart.actual_subtotal):
+                yield cart, cart.actual_count, cart.actual_subtotal
+
+
+class Cart(models.Model):
+    """
+    Per-user cart header holding running totals, so the cart badge is a
+    single primary key lookup instead of an aggregate over the cart rows
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, related_name='cart', on_delete=models.CASCADE
+    )
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartManager()
+
+    def __str__(self):
+        return f"{self.user_id}'s cart: {self.item_count} items, {self.subtotal}"
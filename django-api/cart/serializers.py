@@ -1,6 +1,8 @@
 from rest_framework import serializers
+
+from config.serializers import FastReadMixin
 from .models import CartItem
-from products.serializers import ProductSerializer
+from products.serializers import ProductReadSerializer, ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
     """
@@ -13,10 +15,26 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['id', 'product', 'product_detail', 'quantity', 'total_price']
 
+class CartItemReadSerializer(FastReadMixin, CartItemSerializer):
+    """
+    Read-only fast path producing the same output as CartItemSerializer
+    """
+    product_detail = ProductReadSerializer(source='product', read_only=True)
+
 class CartSerializer(serializers.Serializer):
     """
     Serializer for the entire cart
     """
-    items = CartItemSerializer(many=True, read_only=True)
+    items = CartItemReadSerializer(many=True, read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    count = serializers.IntegerField(read_only=True)
\ No newline at end of file
+    count = serializers.IntegerField(read_only=True)
+
+class CartOperationSerializer(serializers.Serializer):
+    """
+    Serializer for one operation of a bulk cart update
+    """
+    MODE_CHOICES = ('add', 'set', 'remove')
+
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    mode = serializers.ChoiceField(choices=MODE_CHOICES, default='add')
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from products.signals import products_imported
+from .models import Cart, CartItem
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_cart(sender, instance, created, raw=False, **kwargs):
+    """
+    Give every new user an empty cart header, so cart changes only ever
+    have to update it.
+    """
+    if created and not raw:
+        Cart.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Product)
+def reprice_carts(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Recompute the subtotals of the carts holding a product whose price may
+    have changed.
+    """
+    if created or (update_fields is not None and 'price' not in update_fields):
+        return
+    Cart.objects.recalculate(CartItem.objects.filter(product=instance).values('user'))
+
+
+@receiver(pre_delete, sender=Product)
+def remember_cart_owners(sender, instance, **kwargs):
+    # The cart rows are gone by post_delete, so collect their owners first
+    instance._cart_user_ids = list(CartItem.objects.filter(product=instance).values_list('user', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def recalculate_carts(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_cart_user_ids', None)
+    if user_ids:
+        Cart.objects.recalculate(user_ids)
+
+
+@receiver(products_imported)
+def reprice_imported_carts(sender, skus, **kwargs):
+    Cart.objects.recalculate(CartItem.objects.filter(product__sku__in=skus).values('user'))
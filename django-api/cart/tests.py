@@ -1,3 +1,435 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.serializers import CustomTokenObtainPairSerializer
+from accounts.tokens import get_token_version
+from products.models import Category, Product
+from .models import Cart, CartItem
+from .serializers import CartItemReadSerializer, CartItemSerializer
+from .views import AsyncCartViewSet, CartViewSet
+
+User = get_user_model()
+
+
+class AddToCartTests(TestCase):
+    """
+    Tests for adding products to the cart
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='shopper@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        cls.product = Product.objects.create(name='Kettle', description='', price=Decimal('25.00'), category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_add_creates_then_increments(self):
+        response = self.client.post('/api/cart/', {'product': self.product.pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['quantity'], 2)
+        self.assertEqual(response.data['total_price'], '50.00')
+
+        response = self.client.post('/api/cart/', {'product': self.product.pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 5)
+        self.assertEqual(response.data['product_detail']['name'], 'Kettle')
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_add_is_a_single_write(self):
+        # The upsert and the cart header update inside a savepoint, then the
+        # read of the resulting item
+        with self.assertNumQueries(5):
+            self.client.post('/api/cart/', {'product': self.product.pk})
+
+    def test_unknown_product(self):
+        self.assertEqual(self.client.post('/api/cart/', {'product': 999}).status_code, 404)
+        self.assertEqual(self.client.post('/api/cart/', {'product': 'abc'}).status_code, 404)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_invalid_quantity(self):
+        response = self.client.post('/api/cart/', {'product': self.product.pk, 'quantity': 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkCartTests(TestCase):
+    """
+    Tests for the bulk cart operations endpoint
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='guest@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=Decimal('1.50'), category=category)
+            for i in range(100)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, operations):
+        return self.client.post('/api/cart/bulk/', operations, format='json')
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def test_add_set_and_remove(self):
+        a, b, c = self.products[:3]
+        self.client.post('/api/cart/', {'product': a.pk, 'quantity': 1})
+        self.client.post('/api/cart/', {'product': c.pk, 'quantity': 4})
+
+        response = self.bulk([
+            {'product': a.pk, 'quantity': 2},
+            {'product': b.pk, 'quantity': 5, 'mode': 'set'},
+            {'product': b.pk, 'quantity': 1, 'mode': 'add'},
+            {'product': c.pk, 'mode': 'remove'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {a.pk: 3, b.pk: 6})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['total'], '13.50')
+
+    def test_unknown_product_rejects_whole_request(self):
+        response = self.bulk([{'product': self.products[0].pk}, {'product': 999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'], [999])
+        self.assertEqual(self.quantities(), {})
+
+    def test_invalid_operation(self):
+        response = self.bulk([{'product': self.products[0].pk, 'mode': 'double'}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_depend_on_size(self):
+        small = [{'product': p.pk, 'quantity': 2} for p in self.products[:5]]
+        large = [{'product': p.pk, 'quantity': 2} for p in self.products]
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.bulk(small)
+        CartItem.objects.all().delete()
+        with CaptureQueriesContext(connection) as large_queries:
+            self.bulk(large)
+
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(len(self.quantities()), 100)
+
+
+class CartSummaryTests(TestCase):
+    """
+    Tests for the cart summary endpoint
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='summary@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=Decimal('0.99') + i, category=category)
+            for i in range(3)
+        ])
+        CartItem.objects.bulk_create([CartItem(user=cls.user, product=p, quantity=3) for p in products])
+        Cart.objects.recalculate([cls.user.pk])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summary(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data['total'], '17.91')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(response.data['items'][0]['product_detail']['category_name'], 'Kitchen')
+
+    def test_totals_only(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/summary/?fields=totals')
+        self.assertEqual(response.data, {'total': '17.91', 'count': 3})
+
+    def test_empty_cart(self):
+        self.client.delete('/api/cart/clear/')
+        response = self.client.get('/api/cart/summary/?fields=totals')
+        self.assertEqual(response.data, {'total': '0.00', 'count': 0})
+
+    def test_token_authentication_does_not_load_the_user(self):
+        cache.clear()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token()}')
+        # The first request caches the user's token version
+        with self.assertNumQueries(2):
+            client.get('/api/cart/summary/?fields=totals')
+        with self.assertNumQueries(1):
+            response = client.get('/api/cart/summary/?fields=totals')
+        self.assertEqual(response.data, {'total': '17.91', 'count': 3})
+
+    def access_token(self):
+        return CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+
+class AsyncCartSummaryTests(CartSummaryTests):
+    """
+    The async cart summary must answer like the sync one, with the same
+    number of queries
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        get_token_version(self.user.pk)
+
+    def get(self, path, **extra):
+        view = AsyncCartViewSet.as_view({'get': 'summary'}, basename='cart', detail=False)
+        extra.setdefault('HTTP_AUTHORIZATION', f'Bearer {self.access_token()}')
+        return async_to_sync(view)(APIRequestFactory().get(path, **extra))
+
+    def test_summary(self):
+        with self.assertNumQueries(2):
+            response = self.get('/api/cart/summary/')
+        self.assertEqual(response.content, self.client.get('/api/cart/summary/').content)
+
+    def test_totals_only(self):
+        with self.assertNumQueries(1):
+            response = self.get('/api/cart/summary/?fields=totals')
+        self.assertEqual(response.data, {'total': '17.91', 'count': 3})
+
+    def test_empty_cart(self):
+        self.client.delete('/api/cart/clear/')
+        self.assertEqual(self.get('/api/cart/summary/?fields=totals').data, {'total': '0.00', 'count': 0})
+
+    def test_missing_header_is_recalculated(self):
+        Cart.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.get('/api/cart/summary/?fields=totals').data, {'total': '17.91', 'count': 3})
+
+    def test_requires_authentication(self):
+        response = self.get('/api/cart/summary/', HTTP_AUTHORIZATION='')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        response = self.get('/api/cart/summary/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertEqual(response.data['code'], 'token_not_valid')
+
+
+class CartHeaderTests(TestCase):
+    """
+    Tests for keeping the cart header totals in step with the cart rows
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='header@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        cls.kettle = Product.objects.create(name='Kettle', description='', price=Decimal('25.00'), category=category)
+        cls.mug = Product.objects.create(name='Mug', description='', price=Decimal('4.50'), category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def totals(self):
+        cart = Cart.objects.get(pk=self.user.pk)
+        return cart.item_count, cart.subtotal
+
+    def test_mutations_keep_totals(self):
+        self.client.post('/api/cart/', {'product': self.kettle.pk, 'quantity': 2})
+        self.client.post('/api/cart/', {'product': self.kettle.pk})
+        response = self.client.post('/api/cart/', {'product': self.mug.pk, 'quantity': 2})
+        self.assertEqual(self.totals(), (2, Decimal('84.00')))
+
+        self.client.patch(f'/api/cart/{response.data["id"]}/', {'quantity': 4})
+        self.assertEqual(self.totals(), (2, Decimal('93.00')))
+
+        self.client.delete(f'/api/cart/{response.data["id"]}/')
+        self.assertEqual(self.totals(), (1, Decimal('75.00')))
+
+        self.client.post('/api/cart/bulk/', [
+            {'product': self.kettle.pk, 'mode': 'remove'},
+            {'product': self.mug.pk, 'quantity': 3, 'mode': 'set'},
+        ], format='json')
+        self.assertEqual(self.totals(), (1, Decimal('13.50')))
+
+        self.client.delete('/api/cart/clear/')
+        self.assertEqual(self.totals(), (0, Decimal('0')))
+
+    def test_racing_deletes_count_once(self):
+        self.client.post('/api/cart/', {'product': self.kettle.pk})
+        response = self.client.post('/api/cart/', {'product': self.mug.pk, 'quantity': 2})
+        stale = CartItem.objects.get(pk=response.data['id'])
+
+        self.client.delete(f'/api/cart/{stale.pk}/')
+        CartViewSet().perform_destroy(stale)
+        self.assertEqual(self.totals(), (1, Decimal('25.00')))
+
+    def test_checkout_empties_totals(self):
+        self.client.post('/api/cart/', {'product': self.kettle.pk})
+        self.assertEqual(self.client.post('/api/orders/checkout/').status_code, 201)
+        self.assertEqual(self.totals(), (0, Decimal('0')))
+
+    def test_price_change_reprices_carts(self):
+        self.client.post('/api/cart/', {'product': self.kettle.pk, 'quantity': 2})
+        self.kettle.price = Decimal('20.00')
+        self.kettle.save()
+        self.assertEqual(self.totals(), (1, Decimal('40.00')))
+
+        self.kettle.delete()
+        self.assertEqual(self.totals(), (0, Decimal('0')))
+
+    def test_verify_repairs_drift(self):
+        self.client.post('/api/cart/', {'product': self.kettle.pk})
+        Cart.objects.filter(pk=self.user.pk).update(item_count=7, subtotal=Decimal('1'))
+        other = User.objects.create_user(email='no-header@example.com', password=None)
+        CartItem.objects.create(user=other, product=self.mug, quantity=2)
+
+        call_command('verify_cart_totals', '--dry-run', stdout=StringIO())
+        self.assertEqual(self.totals(), (7, Decimal('1')))
+
+        call_command('verify_cart_totals', stdout=StringIO())
+        self.assertEqual(self.totals(), (1, Decimal('25.00')))
+        self.assertEqual(Cart.objects.get(pk=other.pk).subtotal, Decimal('9.00'))
+        self.assertEqual(list(Cart.objects.with_drift()), [])
+
+
+class ConcurrentAddToCartTests(TransactionTestCase):
+    """
+    Concurrent adds of the same product must not lose increments
+    """
+
+    def test_no_lost_increments(self):
+        user = User.objects.create_user(email='tabs@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        product = Product.objects.create(name='Kettle', description='', price=Decimal('25.00'), category=category)
+        workers, adds = 10, 5
+        errors = []
+        barrier = threading.Barrier(workers)
+
+        def add():
+            barrier.wait()
+            try:
+                for _ in range(adds):
+                    # The shared-cache test database reports lock conflicts
+                    # instead of waiting; a failed statement changes nothing,
+                    # so it is simply retried
+                    while True:
+                        try:
+                            CartItem.objects.add(user, product.pk, 1)
+                            break
+                        except OperationalError as exc:
+                            if 'locked' not in str(exc):
+                                raise
+                            time.sleep(0.001)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=add) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(CartItem.objects.get(user=user, product=product).quantity, workers * adds)
+
+
+class ConcurrentCartChangeTests(TransactionTestCase):
+    """
+    An add landing while an item is updated or removed must not make the
+    cart header drift
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='racing@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        self.kettle = Product.objects.create(name='Kettle', description='', price=Decimal('25.00'), category=category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.item_id = self.client.post('/api/cart/', {'product': self.kettle.pk, 'quantity': 2}).data['id']
+
+    def add_during(self, request):
+        """
+        Run ``request`` while another thread adds a kettle right after the
+        view has loaded the cart item, giving the add a moment to land.
+        """
+        get_object = CartViewSet.get_object
+
+        def add():
+            try:
+                # The shared-cache test database reports lock conflicts
+                # instead of waiting; a failed transaction changes nothing
+                while True:
+                    try:
+                        # What CartViewSet.create does
+                        with transaction.atomic():
+                            _, _, created = CartItem.objects.add(self.user, self.kettle.pk, 1)
+                            Cart.objects.apply_delta(self.user, int(created), self.kettle.price)
+                        break
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        time.sleep(0.001)
+            finally:
+                connections.close_all()
+
+        adder = threading.Thread(target=add)
+
+        def get_object_then_add(view):
+            item = get_object(view)
+            adder.start()
+            adder.join(0.2)
+            return item
+
+        with mock.patch.object(CartViewSet, 'get_object', get_object_then_add):
+            response = request()
+        adder.join()
+        return response
+
+    def test_update(self):
+        response = self.add_during(lambda: self.client.patch(f'/api/cart/{self.item_id}/', {'quantity': 5}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Cart.objects.with_drift()), [])
+
+    def test_delete(self):
+        response = self.add_during(lambda: self.client.delete(f'/api/cart/{self.item_id}/'))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(Cart.objects.with_drift()), [])
+
+
+class CartItemReadSerializerTests(TestCase):
+    """
+    The fast read serializer must render exactly like CartItemSerializer
+    """
+
+    def test_parity(self):
+        user = User.objects.create_user(email='parity@example.com', password=None)
+        category = Category.objects.create(name='Kitchen')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='x' * i, price=Decimal('3.333') * i, category=category,
+                    image=f'products/{i}.png' if i % 2 else '')
+            for i in range(1, 6)
+        ])
+        CartItem.objects.bulk_create([CartItem(user=user, product=p, quantity=i + 1) for i, p in enumerate(products)])
+        queryset = CartItem.objects.filter(user=user).select_related('product__category')
+        context = {'request': APIRequestFactory().get('/api/cart/')}
+
+        self.assertEqual(
+            JSONRenderer().render(CartItemReadSerializer(queryset, many=True, context=context).data),
+            JSONRenderer().render(CartItemSerializer(queryset, many=True, context=context).data),
+        )
@@ -1,10 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CartViewSet
+
+from config.async_views import async_reads
+from .views import AsyncCartViewSet, CartViewSet
 
 router = DefaultRouter()
 router.register(r'', CartViewSet, basename='cart')
 
+routes = router.urls
+if settings.ASYNC_READ_VIEWS:
+    routes = async_reads(routes, {CartViewSet: AsyncCartViewSet})
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(routes)),
 ]
\ No newline at end of file
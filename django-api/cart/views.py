@@ -1,10 +1,12 @@
-from django.db.models import Sum, F
+from asgiref.sync import sync_to_async
+from django.db import transaction
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import CartItem
-from .serializers import CartItemSerializer, CartSerializer
+from config.async_views import AsyncViewMixin
+from .models import Cart, CartItem, product_price
+from .serializers import CartItemReadSerializer, CartItemSerializer, CartSerializer, CartOperationSerializer
 from products.models import Product
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -15,36 +17,49 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItem.objects.filter(user=self.request.user).select_related('product')
+        return CartItem.objects.filter(user=self.request.user).select_related('product__category')
 
-    def create(self, request, *args, **kwargs):
-        product_id = request.data.get('product')
-        quantity = int(request.data.get('quantity', 1))
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return CartItemReadSerializer
+        return super().get_serializer_class()
 
+    def create(self, request, *args, **kwargs):
         try:
-            product = Product.objects.get(pk=product_id)
-        except Product.DoesNotExist:
+            quantity = int(request.data.get('quantity', 1))
+            if quantity < 1:
+                raise ValueError
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'Product not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Quantity must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check if the product is already in the cart
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-
-        # If the item already exists, update the quantity
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-
+        try:
+            product_id = int(request.data.get('product'))
+        except (TypeError, ValueError):
+            product_id = None
+
+        with transaction.atomic():
+            # Insert the item, or add to its quantity if it is already in the cart
+            result = CartItem.objects.add(request.user, product_id, quantity) if product_id is not None else None
+            if result is None:
+                return Response(
+                    {'error': 'Product not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            item_id, _, created = result
+            Cart.objects.apply_delta(request.user, int(created), quantity * product_price(product_id))
+
+        cart_item = self.get_queryset().get(pk=item_id)
         serializer = self.get_serializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
+        # Read the item in the transaction, which starts with the write lock
+        # (BEGIN IMMEDIATE), so no add can change it before it is replaced
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
 
@@ -55,29 +70,149 @@ class CartViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        old_product_id, old_quantity = instance.product_id, instance.quantity
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+        Cart.objects.apply_delta(
+            request.user,
+            amount=(instance.quantity * product_price(instance.product_id)
+                    - old_quantity * product_price(old_product_id)),
+        )
 
         return Response(serializer.data)
 
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        # As in update, the quantity withdrawn is read under the write lock
+        return super().destroy(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        # A concurrent request may have removed the item already
+        deleted, _ = CartItem.objects.filter(pk=instance.pk).delete()
+        if deleted:
+            Cart.objects.apply_delta(instance.user, -1, -instance.quantity * product_price(instance.product_id))
+
+    def get_summary(self, include_items=True):
+        """
+        Cart total and line count read from the user's cart header, plus the
+        serialized items unless only the totals are wanted
+        """
+        user = self.request.user
+        totals = self.get_totals().first()
+        if totals is None:
+            Cart.objects.recalculate([user.pk])
+            totals = self.get_totals().first()
+        return self.serialize_summary(totals, self.get_queryset() if include_items else None)
+
+    def get_totals(self):
+        return Cart.objects.filter(pk=self.request.user.pk).values_list('subtotal', 'item_count')
+
+    def serialize_summary(self, totals, items=None):
+        cart_data = {
+            'total': totals[0],
+            'count': totals[1]
+        }
+        if items is not None:
+            cart_data['items'] = items
+
+        return CartSerializer(cart_data, context=self.get_serializer_context()).data
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        queryset = self.get_queryset()
+        """
+        Cart items, total and count. Use ?fields=totals to get only the
+        total and count, e.g. for a cart badge.
+        """
+        return Response(self.get_summary(include_items=request.query_params.get('fields') != 'totals'))
+
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk(self, request):
+        """
+        Apply a list of operations to the cart in one request, e.g. to merge
+        a guest cart after login:
+
+        [{"product": 1, "quantity": 2, "mode": "add"},
+         {"product": 2, "quantity": 5, "mode": "set"},
+         {"product": 3, "mode": "remove"}]
+
+        Operations are applied in order and a quantity of 0 removes the item.
+        Returns the resulting cart summary.
+        """
+        serializer = CartOperationSerializer(data=request.data, many=True, max_length=500)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data
 
-        # Calculate the total price of all items in the cart
-        total = sum(item.total_price for item in queryset)
-        count = queryset.count()
+        product_ids = {operation['product'] for operation in operations}
+        prices = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'price'))
+        missing = product_ids - set(prices)
+        if missing:
+            return Response(
+                {'error': 'Product not found', 'products': sorted(missing)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        cart_data = {
-            'items': self.get_serializer(queryset, many=True).data,
-            'total': total,
-            'count': count
-        }
+        current = dict(
+            CartItem.objects.filter(user=request.user, product_id__in=product_ids)
+            .values_list('product_id', 'quantity')
+        )
+        quantities = dict(current)
+        for operation in operations:
+            product_id = operation['product']
+            if operation['mode'] == 'add':
+                quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+            elif operation['mode'] == 'set':
+                quantities[product_id] = operation['quantity']
+            else:
+                quantities[product_id] = 0
+
+        upserts = [
+            CartItem(user=request.user, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if quantity and quantity != current.get(product_id)
+        ]
+        removed = [product_id for product_id, quantity in quantities.items() if not quantity and product_id in current]
+
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        if removed:
+            CartItem.objects.filter(user=request.user, product_id__in=removed).delete()
+
+        if upserts or removed:
+            Cart.objects.apply_delta(
+                request.user,
+                lines=len([item for item in upserts if item.product_id not in current]) - len(removed),
+                amount=sum((quantity - current.get(product_id, 0)) * prices[product_id]
+                           for product_id, quantity in quantities.items()),
+            )
 
-        return Response(CartSerializer(cart_data).data)
+        return Response(self.get_summary())
 
     @action(detail=False, methods=['delete'])
+    @transaction.atomic
     def clear(self, request):
         CartItem.objects.filter(user=request.user).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        Cart.objects.reset(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class AsyncCartViewSet(AsyncViewMixin, CartViewSet):
+    """
+    Async cart summary, served under ASGI when ASYNC_READ_VIEWS is on
+    """
+
+    async def summary(self, request):
+        totals = await self.get_totals().afirst()
+        if totals is None:
+            await sync_to_async(Cart.objects.recalculate)([request.user.pk])
+            totals = await self.get_totals().afirst()
+
+        items = None
+        if request.query_params.get('fields') != 'totals':
+            items = [item async for item in self.get_queryset()]
+        return Response(self.serialize_summary(totals, items))
@@ -0,0 +1,165 @@
+from inspect import isawaitable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern
+from django_filters import utils as filter_utils
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+
+class AsyncViewMixin:
+    """
+    Runs the read handlers of a DRF view or viewset as coroutines under ASGI.
+
+    Content negotiation, authentication, permission and throttle checks and
+    exception handling are DRF's own, in the same order. Authenticators
+    with an ``aauthenticate`` coroutine are awaited, and database access in
+    the generic helpers below goes through the async ORM, so a request
+    that does not need the database never leaves the event loop.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        # Viewset views wrap dispatch() in a plain function, which returns
+        # the coroutine; tell Django to await it
+        return view if iscoroutinefunction(view) else markcoroutinefunction(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if not hasattr(self.response, 'render'):
+            return self.response
+        # Django renders template responses of async views in a worker
+        # thread, so render here and hand back a plain response instead
+        self.response.render()
+        rendered = HttpResponse(self.response.content, status=self.response.status_code, headers=self.response.headers)
+        rendered.cookies = self.response.cookies
+        rendered.data = self.response.data
+        return rendered
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        """
+        Authenticate the request up front, as ``Request.user`` would lazily.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def afilter_queryset(self, queryset):
+        for backend in list(self.filter_backends):
+            backend = backend()
+            if isinstance(backend, DjangoFilterBackend):
+                queryset = await self._afilter_with_filterset(backend, queryset)
+            else:
+                queryset = backend.filter_queryset(self.request, queryset, self)
+        return queryset
+
+    async def _afilter_with_filterset(self, backend, queryset):
+        filterset = backend.get_filterset(self.request, queryset, self)
+        if filterset is None or not set(filterset.filters) & set(self.request.query_params):
+            return queryset
+        # Model choice filters are validated with a query
+        if not await sync_to_async(filterset.is_valid)() and backend.raise_exception:
+            raise filter_utils.translate_validation(filterset.errors)
+        return filterset.qs
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([obj async for obj in queryset], many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
+
+
+def read_async(async_view, sync_view):
+    """
+    Serve GET and HEAD requests with ``async_view`` and other methods with
+    ``sync_view``, run in a worker thread as Django runs sync views.
+    """
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def async_reads(patterns, viewsets):
+    """
+    Route the GET requests of router ``patterns`` to async viewsets, given
+    as a ``{viewset: async_viewset}`` mapping. Actions the async viewset
+    does not implement as coroutines stay on the sync viewset.
+    """
+    routes = []
+    for pattern in patterns:
+        callback = pattern.callback
+        async_viewset = viewsets.get(getattr(callback, 'cls', None))
+        action = (getattr(callback, 'actions', None) or {}).get('get')
+        if async_viewset is not None and iscoroutinefunction(getattr(async_viewset, action or '', None)):
+            async_view = async_viewset.as_view({'get': action}, **callback.initkwargs)
+            pattern = URLPattern(pattern.pattern, read_async(async_view, callback), pattern.default_args, pattern.name)
+        routes.append(pattern)
+    return routes
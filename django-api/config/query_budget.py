@@ -0,0 +1,213 @@
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current_log = ContextVar('query_log', default=None)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+VALUE_LIST = re.compile(r'\(\?(?:, \?)*\)')
+VALUE_LISTS = re.compile(r'\(\.\.\.\)(?:, \(\.\.\.\))+')
+
+
+def fingerprint(sql):
+    """
+    The shape of a query: its SQL with values, placeholders and IN or
+    VALUES lists of any length collapsed, so the queries of an N+1 loop
+    share one fingerprint.
+    """
+    sql = STRING_LITERAL.sub('?', ' '.join(sql.split()))
+    sql = NUMBER_LITERAL.sub('?', sql.replace('%s', '?'))
+    return VALUE_LISTS.sub('(...)', VALUE_LIST.sub('(...)', sql))
+
+
+def code_location():
+    """
+    The innermost project frame that led to the current query, skipping
+    this module and installed packages.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(str(settings.BASE_DIR)) and 'site-packages' not in path and path != __file__:
+            return f'{os.path.relpath(path, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryLog:
+    """
+    The queries run while recording: their count and total time and, when
+    ``trace`` is on, their SQL and where each query shape ran from.
+    """
+
+    def __init__(self, parent=None, trace=True):
+        self.parent = parent
+        self.trace = trace
+        self.count = 0
+        self.queries = []
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.locations = defaultdict(Counter)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def tracing(self):
+        """
+        Whether this log or an enclosing one wants query shapes.
+        """
+        log = self
+        while log is not None:
+            if log.trace:
+                return True
+            log = log.parent
+        return False
+
+    def add(self, sql, duration, shape=None, location=None):
+        log = self
+        while log is not None:
+            log.count += 1
+            log.duration += duration
+            if log.trace and shape is not None:
+                log.queries.append(sql)
+                log.shapes[shape] += 1
+                log.locations[shape][location] += 1
+            log = log.parent
+
+    def duplicates(self, min_count=2):
+        """
+        Query shapes run at least ``min_count`` times, most repeated first,
+        with the code locations that ran them.
+        """
+        return [
+            {'sql': shape, 'count': count, 'locations': dict(self.locations[shape])}
+            for shape, count in self.shapes.most_common() if count >= min_count
+        ]
+
+    def server_timing(self):
+        timing = f'db;dur={self.duration * 1000:.1f};desc="{len(self)} queries"'
+        duplicates = self.duplicates()
+        if duplicates:
+            timing += f', db-repeated;desc="{len(duplicates)} repeated query shapes"'
+        return timing
+
+    def describe(self, min_repeats=2):
+        lines = [f'{len(self)} queries in {self.duration * 1000:.1f} ms:']
+        lines += [f'  {sql}' for sql in self.queries]
+        for duplicate in self.duplicates(min_repeats):
+            lines.append(f'Repeated {duplicate["count"]} times: {duplicate["sql"]}')
+            lines += [f'  {count}x {location}' for location, count in duplicate['locations'].items()]
+        return '\n'.join(lines)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    log = _current_log.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        if log.tracing:
+            log.add(sql, duration, fingerprint(sql), code_location())
+        else:
+            log.add(sql, duration)
+
+
+def install_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+# Connections are per thread; sync_to_async threads get theirs here
+connection_created.connect(install_wrapper)
+
+
+@contextmanager
+def record_queries(trace=True):
+    """
+    Record the queries run in the block, including those of sync_to_async
+    calls it awaits, into the QueryLog it yields. Blocks can be nested.
+    Without ``trace`` only their count and time are kept, which skips the
+    fingerprint and stack walk per query.
+    """
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(connection)
+    log = QueryLog(_current_log.get(), trace)
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the queries of each request. Their count and time are sent in
+    a Server-Timing header when DEBUG is on, and logged, with the repeated
+    query shapes and the code that ran them when QUERY_TRACE is on.
+    Requests running more queries than the QUERY_BUDGETS entry of their
+    method and URL name, or (when tracing) a query shape
+    QUERY_REPEAT_WARNING times, are logged as warnings.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries(settings.QUERY_TRACE) as log:
+            response = self.get_response(request)
+        self.report(request, response, log)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries(settings.QUERY_TRACE) as log:
+            response = await self.get_response(request)
+        self.report(request, response, log)
+        return response
+
+    def report(self, request, response, log):
+        if settings.DEBUG:
+            response['Server-Timing'] = log.server_timing()
+
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = settings.QUERY_BUDGETS.get(f'{request.method} {view_name}')
+        duplicates = log.duplicates()
+        repeated = duplicates and duplicates[0]['count'] >= settings.QUERY_REPEAT_WARNING
+        over_budget = budget is not None and len(log) > budget
+        logger.log(
+            logging.WARNING if repeated or over_budget else logging.DEBUG,
+            '%s %s ran %d queries in %.1f ms%s', request.method, request.path, len(log), log.duration * 1000,
+            f', budget {budget}' if over_budget else '',
+            extra={'query_budget': {
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'queries': len(log),
+                'duration_ms': round(log.duration * 1000, 3),
+                'budget': budget,
+                'duplicates': duplicates,
+            }},
+        )
@@ -0,0 +1,155 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_write_log = ContextVar('write_log', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of ``read_from_replicas`` blocks to one of
+    DATABASE_REPLICAS, picked at random. Writes, reads inside a
+    transaction on the primary and every other read go to 'default'.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and settings.DATABASE_REPLICAS
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        log = _write_log.get()
+        if log is not None:
+            log.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+@contextmanager
+def read_from_replicas():
+    """
+    Route the reads of the block, outside transactions, to the replicas.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_key(user):
+    return f'db:primary-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """
+    Keep the user's reads on the primary for DATABASE_REPLICA_LAG_SECONDS,
+    so they see what they just wrote.
+    """
+    cache.set(_pin_key(user), True, settings.DATABASE_REPLICA_LAG_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user), False)
+
+
+class ReplicaReadMixin:
+    """
+    Serves the safe requests of a DRF view from the replicas, unless the
+    user wrote recently. Authentication and throttling still read the
+    primary, as does anything run in a transaction.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.start_replica_reads(request)
+
+    def use_replica(self, request):
+        return request.method in SAFE_METHODS and not is_pinned(request.user)
+
+    def start_replica_reads(self, request):
+        if self.use_replica(request):
+            self._replica_reads = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = self.__dict__.pop('_replica_reads', None)
+        if token is not None:
+            _replica_reads.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class AsyncReplicaReadMixin:
+    """
+    ReplicaReadMixin for views built on AsyncViewMixin, listed before it.
+    """
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        self.start_replica_reads(request)
+
+
+class _WriteLog:
+    wrote = False
+
+
+class PrimaryPinMiddleware:
+    """
+    Pins the user of a request that wrote to the database to the primary,
+    see pin_to_primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        log = _WriteLog()
+        token = _write_log.set(log)
+        try:
+            response = self.get_response(request)
+        finally:
+            _write_log.reset(token)
+        self.pin(request, log)
+        return response
+
+    async def __acall__(self, request):
+        log = _WriteLog()
+        token = _write_log.set(log)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _write_log.reset(token)
+        self.pin(request, log)
+        return response
+
+    def pin(self, request, log):
+        # DRF views authenticate the user onto the request they were given
+        user = getattr(request, 'user', None)
+        if log.wrote and user is not None and user.is_authenticated:
+            pin_to_primary(user)
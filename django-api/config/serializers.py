@@ -0,0 +1,168 @@
+import decimal
+import re
+from functools import cached_property, partial
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from rest_framework import serializers
+from rest_framework.fields import SkipField, get_attribute
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import ISO_8601, api_settings
+
+# Fields whose to_representation() returns model values unchanged
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.ReadOnlyField)
+
+# File names whose URL is simply the storage's base URL followed by the name
+PLAIN_FILE_NAME = re.compile(r'[\w-][\w.-]*(?:/[\w-][\w.-]*)*', re.ASCII)
+
+
+def _model_getter(model, source_attrs):
+    """
+    Return a plain attribute getter for a dotted source when every step is a
+    model field or property, or DRF's generic lookup otherwise (methods are
+    called, mappings are indexed).
+    """
+    for attr in source_attrs:
+        if model is None:
+            return partial(get_attribute, attrs=source_attrs)
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            if not isinstance(getattr(model, attr, None), property):
+                return partial(get_attribute, attrs=source_attrs)
+            model = None
+        else:
+            model = field.related_model if field.many_to_one or field.one_to_one else None
+    return attrgetter('.'.join(source_attrs))
+
+
+def _related_getter(field):
+    def getter(instance):
+        value = field.get_attribute(instance)
+        return None if isinstance(value, PKOnlyObject) and value.pk is None else value
+    return getter
+
+
+def _decimal_converter(field):
+    if (
+        field.decimal_places is None or field.localize or field.normalize_output
+        or not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    ):
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or value.utcoffset() is None:
+            return field.to_representation(value)
+        try:
+            value = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _file_converter(field, model_field):
+    storage = getattr(model_field, 'storage', None)
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL) or not isinstance(storage, FileSystemStorage):
+        return field.to_representation
+
+    request = field.context.get('request')
+    prefix = request.build_absolute_uri(storage.base_url) if request is not None else storage.base_url
+
+    def convert(value):
+        if value.name and PLAIN_FILE_NAME.fullmatch(value.name):
+            return prefix + value.name
+        return field.to_representation(value)
+    return convert
+
+
+def compile_reader(field, model):
+    """
+    Return ``(getter, converter)`` for one readable field. ``converter`` is
+    None when the value is returned as is.
+
+    Converters capture the current timezone and request, so readers are
+    compiled per serializer instance rather than per class.
+    """
+    if field.source == '*':
+        return field.get_attribute, field.to_representation
+
+    if (
+        isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None
+        and model is not None and len(field.source_attrs) == 1
+    ):
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is not None and model_field.many_to_one:
+            # Read the foreign key column instead of loading the related object
+            return attrgetter(model_field.attname), None
+
+    if isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField)):
+        return _related_getter(field), field.to_representation
+
+    getter = _model_getter(model, field.source_attrs)
+    if type(field) in IDENTITY_FIELDS:
+        return getter, None
+    if type(field) is serializers.DecimalField:
+        return getter, _decimal_converter(field)
+    if type(field) is serializers.DateTimeField:
+        return getter, _datetime_converter(field)
+    if type(field) in (serializers.FileField, serializers.ImageField) and len(field.source_attrs) == 1:
+        try:
+            model_field = model._meta.get_field(field.source) if model is not None else None
+        except FieldDoesNotExist:
+            model_field = None
+        return getter, _file_converter(field, model_field)
+    return getter, field.to_representation
+
+
+class FastReadMixin:
+    """
+    Read-only fast path for model serializers.
+
+    Each readable field is compiled once per serializer into an attribute
+    getter and a converter, which skips DRF's per-value field machinery
+    while producing exactly the same output. Anything the fast path cannot
+    read (missing attributes, dict instances) goes through the regular
+    ``to_representation``.
+    """
+
+    @cached_property
+    def _readers(self):
+        model = getattr(getattr(self, 'Meta', None), 'model', None)
+        return [(field.field_name, *compile_reader(field, model)) for field in self._readable_fields]
+
+    def to_representation(self, instance):
+        ret = {}
+        try:
+            for name, getter, convert in self._readers:
+                value = getter(instance)
+                if value is None or convert is None:
+                    ret[name] = value
+                else:
+                    ret[name] = convert(value)
+        except (AttributeError, KeyError, ObjectDoesNotExist, SkipField):
+            return super().to_representation(instance)
+        return ret
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -47,11 +49,14 @@ INSTALLED_APPS = [
     'accounts',
     'products',
     'cart',
-    'orders'
+    'orders',
+    'reports',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.query_budget.QueryBudgetMiddleware',
+    'config.routers.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +68,11 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Serve the hot read endpoints (product and category list/detail, cart
+# summary, /api/auth/me/) with async views. Only worth it under an ASGI
+# server (config.asgi); under WSGI every async view would start an event loop.
+ASYNC_READ_VIEWS = os.environ.get('DJANGO_ASYNC_READ_VIEWS', '').lower() in ('1', 'true', 'yes')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -84,13 +94,155 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite is tuned for several workers writing to one file. Every
+# connection runs these PRAGMAs:
+# - journal_mode=WAL lets readers carry on while a write commits, and
+#   synchronous=NORMAL only syncs at checkpoints (a power loss can drop
+#   the last commits but not corrupt the file)
+# - busy_timeout is how long, in ms, a connection waits for the write
+#   lock before failing with "database is locked"
+# - mmap_size (bytes) and cache_size (negative: KiB) keep hot pages in memory
+# Transactions on the primary start with BEGIN IMMEDIATE, taking the write
+# lock up front: a deferred transaction that reads before writing can't
+# wait for the lock and fails at once when another connection got it in
+# between. It applies to every atomic block, read-only or not, but the API
+# reads in autocommit and every atomic block of the apps writes. The only
+# read-only ones are the admin's add, change and delete pages, which wait
+# for a writer to finish like a write would; at admin traffic that is
+# cheaper than failing checkouts. Replicas are only read, outside
+# transactions, and keep deferred ones (REPLICA_SQLITE_OPTIONS).
+SQLITE_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA busy_timeout=5000',
+        'PRAGMA mmap_size=134217728',
+        'PRAGMA cache_size=-32000',
+    ]),
+    'transaction_mode': 'IMMEDIATE',
+}
+REPLICA_SQLITE_OPTIONS = {key: value for key, value in SQLITE_OPTIONS.items() if key != 'transaction_mode'}
+
+# Connections are kept open for this many seconds, so requests skip the
+# connect and PRAGMAs, and checked before reuse. They are per thread, and
+# async views query from whichever thread sync_to_async picks, so they are
+# closed after each request when ASYNC_READ_VIEWS is on.
+DATABASE_CONN_MAX_AGE = 0 if ASYNC_READ_VIEWS else 600
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas
+# Aliases of DATABASES holding read-only copies of 'default'. Safe
+# requests to the catalogue and report endpoints read from one of them,
+# writes and everything else use 'default' (config.routers). Set
+# DJANGO_DB_REPLICAS to a comma-separated list of SQLite files, copied
+# from the primary outside Django, to add them as replica1, replica2...
+DATABASE_REPLICAS = []
+for path in filter(None, map(str.strip, os.environ.get('DJANGO_DB_REPLICAS', '').split(','))):
+    alias = f'replica{len(DATABASE_REPLICAS) + 1}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'OPTIONS': REPLICA_SQLITE_OPTIONS,
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+
+# How far in seconds replicas may trail the primary. A user's reads stay
+# on the primary for this long after a request of theirs wrote, and
+# catalogue reads after the catalogue changed, so neither serves (nor
+# caches) rows older than the write. Pins are kept in the cache, which
+# must be shared when running several workers (see CACHES).
+DATABASE_REPLICA_LAG_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The local-memory cache is per process. When running several gunicorn
+# workers use a shared backend, so catalogue invalidations and replica
+# pins are seen by every worker: memcached or redis (e.g.
+# 'django.core.cache.backends.redis.RedisCache' with a LOCATION URL),
+# which the throttles below also need for their atomic counters.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Lifetime in seconds of cached catalogue responses. Entries are also
+# invalidated as soon as a Product or Category is saved or deleted.
+CATALOGUE_CACHE_TIMEOUT = 60 * 60
+
+# Number of products upserted per statement by product imports.
+PRODUCT_IMPORT_BATCH_SIZE = 1000
+
+# Resized copies (JPEG and WebP) generated for every product image, by
+# label and maximum width in pixels. Uploads are processed by a pool of
+# PRODUCT_IMAGE_WORKERS background threads, or inline when it is 0.
+PRODUCT_IMAGE_VARIANTS = {'thumbnail': 160, 'small': 320, 'medium': 640}
+PRODUCT_IMAGE_WORKERS = 2
+
+
+# Query budgets
+# QueryBudgetMiddleware logs the count and time of the queries of every
+# request to the config.query_budget logger, and warns when a
+# "<METHOD> <URL name>" listed in QUERY_BUDGETS runs more queries than its
+# budget. With QUERY_TRACE it also fingerprints each query and walks the
+# stack for the code that ran it, to warn when a query shape runs at least
+# QUERY_REPEAT_WARNING times, as in N+1 loops. That costs time on every
+# query, so it is only on with DEBUG.
+QUERY_BUDGETS = {
+    'GET orders-list': 3,
+    'GET orders-detail': 3,
+}
+QUERY_TRACE = DEBUG
+QUERY_REPEAT_WARNING = 3
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# Query budget warnings go to the console; the per-request DEBUG reports of
+# QueryBudgetMiddleware are dropped unless the level is lowered.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'config.query_budget': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+
+# Inventory
+# How long stock stays reserved for a pending order before
+# release_expired_reservations puts it back on sale.
+STOCK_RESERVATION_TIMEOUT = timedelta(minutes=30)
+
+# Checkout retries a bounded number of times, with jittered exponential
+# backoff (in seconds), when it runs into locked or contended rows.
+CHECKOUT_RETRY_ATTEMPTS = 5
+CHECKOUT_RETRY_BACKOFF = 0.05
+CHECKOUT_RETRY_BACKOFF_MAX = 1.0
+
+# Orders exported by /api/orders/export/ are read, with their items, this
+# many at a time.
+ORDER_EXPORT_CHUNK_SIZE = 500
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -110,6 +262,43 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# New passwords are hashed with Argon2id when argon2-cffi is installed and
+# with scrypt otherwise. Both are memory-hard, so their parameters match
+# PBKDF2's resistance to cracking at a fraction of its CPU time per login.
+# Hashes made by the other hashers, or with other parameters, are still
+# accepted and rehashed with the first one when their user next logs in.
+PASSWORD_HASHERS = [
+    'accounts.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if importlib.util.find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, 'accounts.hashers.Argon2PasswordHasher')
+
+# Cost parameters of the hashers above (OWASP's minimums)
+PASSWORD_HASHER_PARAMS = {
+    'argon2': {'time_cost': 2, 'memory_cost': 19 * 1024, 'parallelism': 1},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 5},
+}
+
+# Logins and password changes hash in a pool of this many processes, so
+# request threads wait on it instead of holding the GIL. 0 hashes in the
+# request thread.
+PASSWORD_HASHING_WORKERS = min(4, os.cpu_count() or 1)
+
+AUTHENTICATION_BACKENDS = ['accounts.backends.ModelBackend']
+
+# Email
+# Emails are queued in the OutgoingEmail table and delivered by the
+# send_queued_mail command, which retries failed deliveries with
+# exponential backoff (in seconds) up to EMAIL_OUTBOX_MAX_ATTEMPTS times.
+DEFAULT_FROM_EMAIL = 'noreply@ecommerce.com'
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_BACKOFF = 60
+EMAIL_OUTBOX_RETRY_BACKOFF_MAX = 60 * 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -137,15 +326,39 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'config.throttling.TokenBucketThrottle',
+    ],
 }
 
+# Throttling
+# Views with a throttle_scope listed here are rate limited with a token
+# bucket per scope and client (the user, or the IP address of anonymous
+# requests): up to `burst` requests at once, refilled at `rate`. Throttled
+# requests get a 429 with a Retry-After header. Buckets are kept in the
+# default cache, which as shipped is locmem: every worker process has its
+# own buckets, so the default setup does not enforce these limits (nor
+# CHECKOUT_MAX_IN_FLIGHT) across workers, only per process. With several
+# workers use memcached or redis, which are shared and increment
+# atomically; the file and database caches are shared but don't.
+THROTTLE_BUCKETS = {
+    'register': {'rate': '10/hour', 'burst': 5},
+    'login': {'rate': '20/min', 'burst': 10},
+    'reset_password': {'rate': '5/hour', 'burst': 3},
+    'checkout': {'rate': '30/min', 'burst': 10},
+}
+
+# Checkouts running at once, counted in the default cache, beyond which
+# more are turned away with a 503 and Retry-After. None disables the cap.
+CHECKOUT_MAX_IN_FLIGHT = 16
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -155,8 +368,15 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
 }
 
+# Authentication builds the request user from token claims and only checks
+# the user's token version, cached for this many seconds. Revoking tokens
+# clears the cached version; with a per-process cache other workers may
+# accept revoked tokens until their copy expires.
+TOKEN_VERSION_CACHE_TIMEOUT = 5 * 60
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 
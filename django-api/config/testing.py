@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from .query_budget import record_queries
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for asserting the query budget of endpoints
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_repeats=1):
+        """
+        Fail if the block runs more than ``max_queries`` queries, or runs a
+        query shape more than ``max_repeats`` times, as N+1 loops do. The
+        failure lists the queries and the code that repeated them.
+        """
+        with record_queries() as log:
+            yield log
+        problems = []
+        if len(log) > max_queries:
+            problems.append(f'{len(log)} queries, over the budget of {max_queries}.')
+        if log.duplicates(max_repeats + 1):
+            problems.append(f'Query shapes ran more than {max_repeats} time(s).')
+        if problems:
+            self.fail(' '.join(problems) + '\n' + log.describe(max_repeats + 1))
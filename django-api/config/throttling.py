@@ -0,0 +1,119 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import BaseThrottle
+
+# Bucket levels are counted in thousandths of a request, so slow rates
+# (e.g. 5/hour) still refill by whole units
+SCALE = 1000
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """
+    Requests per second of a '<requests>/<period>' rate, as in DRF's
+    throttle rates ('10/min', '5/hour', ...).
+    """
+    num, period = rate.split('/')
+    return int(num) / PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client for views with a ``throttle_scope`` listed in
+    THROTTLE_BUCKETS. Clients are the user, or the IP address of anonymous
+    requests.
+
+    A bucket is a single cache counter updated with atomic increments. Its
+    tokens refill continuously since the epoch, so the level of a full
+    bucket is ``burst`` requests below what the rate has generated by now,
+    and a request is allowed when adding it keeps the level under that.
+    """
+    cache = default_cache
+    timer = time.time
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = f'ip-{self.get_ident(request)}'
+        return f'throttle:{view.throttle_scope}:{ident}'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        bucket = settings.THROTTLE_BUCKETS.get(getattr(view, 'throttle_scope', None))
+        if bucket is None:
+            return True
+
+        rate = parse_rate(bucket['rate'])
+        key = self.get_cache_key(request, view)
+        generated = int(self.timer() * rate * SCALE)
+        full = generated - bucket['burst'] * SCALE
+        # An untouched bucket is full again by then, as if it were new
+        timeout = math.ceil(bucket['burst'] / rate)
+
+        self.cache.add(key, full, timeout)
+        try:
+            level = self.cache.incr(key, SCALE)
+        except ValueError:
+            # Expired since add()
+            level = full + SCALE
+            self.cache.set(key, level, timeout)
+        if level < full + SCALE:
+            # Idle for so long it holds more than ``burst`` tokens
+            level = self.cache.incr(key, full + SCALE - level)
+        self.cache.touch(key, timeout)
+
+        if level <= generated:
+            return True
+        self.cache.decr(key, SCALE)
+        self.wait_seconds = (level - generated) / (rate * SCALE)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class InFlightLimit:
+    """
+    Counts the requests inside a with block in the cache. Entering returns
+    False, and does not count, once ``limit`` are already in flight; a
+    limit of None admits everything.
+
+    The counter expires ``timeout`` seconds after it is created, so counts
+    left by killed workers do not shed load forever.
+    """
+
+    def __init__(self, name, limit, timeout=60, cache=default_cache):
+        self.key = f'in-flight:{name}'
+        self.limit, self.timeout, self.cache = limit, timeout, cache
+        self.admitted = False
+
+    def __enter__(self):
+        if self.limit is None:
+            return True
+        self.cache.add(self.key, 0, self.timeout)
+        try:
+            in_flight = self.cache.incr(self.key)
+        except ValueError:
+            in_flight = 1
+            self.cache.set(self.key, in_flight, self.timeout)
+        if in_flight > self.limit:
+            self.release()
+            return False
+        self.admitted = True
+        return True
+
+    def __exit__(self, *exc_info):
+        if self.admitted:
+            self.admitted = False
+            self.release()
+
+    def release(self):
+        try:
+            self.cache.decr(self.key)
+        except ValueError:
+            pass
@@ -41,7 +41,8 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls')),
     path('api/products/', include('products.urls')),
     path('api/cart/', include('cart.urls')),
-    path('api/orders/', include('orders.urls'))
+    path('api/orders/', include('orders.urls')),
+    path('api/reports/', include('reports.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import Order, OrderItem
+from django.contrib import admin, messages
+from django.db.models import F, Q
+from django.http import HttpResponseRedirect
+
+from .models import Order, OrderItem, OrderStatusConflict
+from .services import attach_snapshots
+from .signals import order_status_changed
 
 
 class OrderItemInline(admin.TabularInline):
@@ -25,8 +30,37 @@ class OrderAdmin(admin.ModelAdmin):
     Admin configuration for the Order model.
     """
     list_display = ('id', 'user', 'status', 'total_amount', 'created_at', 'updated_at')
+    list_select_related = ('user',)
     list_filter = ('status', 'created_at', 'user')
     search_fields = ('id', 'user__email', 'items__product__name')
     readonly_fields = ('user', 'total_amount', 'created_at', 'updated_at')
     inlines = [OrderItemInline] # Embed OrderItem management within the Order page
     list_per_page = 25
+
+    def save_model(self, request, obj, form, change):
+        try:
+            super().save_model(request, obj, form, change)
+        except OrderStatusConflict as exc:
+            # Leave the order and its items as they are
+            obj._status_conflict = True
+            self.message_user(request, f'{obj}: {exc}', messages.ERROR)
+
+    def response_change(self, request, obj):
+        if getattr(obj, '_status_conflict', False):
+            return HttpResponseRedirect(request.path)
+        return super().response_change(request, obj)
+
+    def save_related(self, request, form, formsets, change):
+        if getattr(form.instance, '_status_conflict', False):
+            return
+        # Item edits change the order's sales: withdraw them while the old
+        # items are still there, and announce the order again afterwards
+        items_changed = change and any(formset.has_changed() for formset in formsets)
+        order = form.instance
+        if items_changed:
+            order_status_changed.send(sender=Order, order_ids=[order.pk], old_status=order.status, new_status=None)
+        super().save_related(request, form, formsets, change)
+        # Added lines, and lines moved to another product, sell its current version
+        attach_snapshots(order.items.filter(Q(snapshot__isnull=True) | ~Q(snapshot__product=F('product'))))
+        if items_changed:
+            order_status_changed.send(sender=Order, order_ids=[order.pk], old_status=None, new_status=order.status)
@@ -0,0 +1,73 @@
+import csv
+
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from .models import OrderItem
+from .serializers import OrderReadSerializer
+
+CSV_HEADER = (
+    'order_id', 'user', 'status', 'total_amount', 'created_at', 'updated_at',
+    'product_id', 'product_name', 'quantity', 'price',
+)
+
+
+class _Echo:
+    """
+    File-like object that hands back what csv.writer writes to it
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_orders(queryset):
+    """
+    Iterate over the orders in chunks of ``ORDER_EXPORT_CHUNK_SIZE``, with
+    their items and products prefetched one chunk at a time, so memory use
+    does not depend on the size of the export. Prefetching rather than
+    joining the product snapshots loads each of them once per chunk.
+    """
+    orders = (
+        queryset.order_by('id')
+        .prefetch_related(Prefetch('items', queryset=OrderItem.objects.order_by('id')), 'items__snapshot')
+        .iterator(chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE)
+    )
+    for order in orders:
+        yield order
+        # Prefetched items point back at their order. Breaking the cycle frees
+        # each chunk as soon as it is written instead of whenever the cyclic
+        # garbage collector runs
+        order._prefetched_objects_cache.clear()
+
+
+def export_ndjson(queryset, context=None):
+    """
+    Yield one JSON document per order, in the same shape as the order API.
+    """
+    serializer = OrderReadSerializer(context=context or {})
+    renderer = JSONRenderer()
+    for order in iter_orders(queryset):
+        yield renderer.render(serializer.to_representation(order)) + b'\n'
+
+
+def export_csv(queryset):
+    """
+    Yield CSV lines with one row per order item. Orders without items get a
+    single row with empty item columns.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order in iter_orders(queryset):
+        columns = [order.pk, order.user_id, order.status, order.total_amount,
+                   order.created_at.isoformat(), order.updated_at.isoformat()]
+        items = order.items.all()
+        if not items:
+            yield writer.writerow(columns + [''] * 4)
+        for item in items:
+            product = item.product_version
+            yield writer.writerow(columns + [
+                product.product_id if product else item.product_id, product.name if product else '',
+                item.quantity, item.price,
+            ])
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from orders.models import OrderItem
+from orders.services import attach_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Point order items saved before product snapshots existed at a snapshot of '
+        "their product, a batch per transaction. Their product's current version is "
+        'the best record left of what was sold. Items of deleted products are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Order items per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        pending = OrderItem.objects.filter(snapshot__isnull=True, product__isnull=False).order_by('pk')
+        done = last_pk = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                attach_snapshots(OrderItem.objects.filter(pk__in=batch, snapshot__isnull=True))
+            done += len(batch)
+            last_pk = batch[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{done} items')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled the snapshots of {done} order items.'))
@@ -0,0 +1,71 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from cart.models import CartItem
+from orders.models import Order, OrderItem
+from orders.services import checkout_cart
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+def legacy_checkout(user):
+    """
+    The row-by-row checkout that ``checkout_cart`` replaced, kept for comparison.
+    """
+    with transaction.atomic():
+        cart_items = CartItem.objects.filter(user=user).select_related('product')
+        if not cart_items.exists():
+            return None
+        total_amount = sum(item.quantity * item.product.price for item in cart_items)
+        order = Order.objects.create(user=user, total_amount=total_amount, status='pending')
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=item.product, quantity=item.quantity, price=item.product.price)
+            for item in cart_items
+        ])
+        cart_items.delete()
+        return order
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare checkout latency and query counts of the legacy and set-based '
+        'pipelines. Benchmark data is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 50, 500])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(email='benchmark-checkout@example.com', password=None)
+            category = Category.objects.create(name='Benchmark')
+            products = Product.objects.bulk_create([
+                Product(name=f'Product {i}', description='', price=Decimal('9.99'), category=category)
+                for i in range(max(options['sizes']))
+            ])
+
+            self.stdout.write(f'{"lines":>6} {"legacy ms":>10} {"queries":>8} {"set-based ms":>13} {"queries":>8}')
+            for size in options['sizes']:
+                legacy = self.time(legacy_checkout, user, products[:size], options['repeat'])
+                current = self.time(checkout_cart, user, products[:size], options['repeat'])
+                self.stdout.write(
+                    f'{size:>6} {legacy[0]:>10.2f} {legacy[1]:>8} {current[0]:>13.2f} {current[1]:>8}'
+                )
+            transaction.set_rollback(True)
+
+    def time(self, checkout, user, products, repeat):
+        timings = []
+        for _ in range(repeat):
+            CartItem.objects.bulk_create([CartItem(user=user, product=product, quantity=2) for product in products])
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                checkout(user)
+                timings.append((time.perf_counter() - start) * 1000)
+        return min(timings), len(queries)
@@ -0,0 +1,92 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from orders.models import Order, OrderItem
+from orders.services import attach_snapshots
+from orders.serializers import OrderListSerializer, OrderReadSerializer
+from orders.views import with_line_detail, with_line_summary
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full and compact representations of a user's order history, "
+        'page by page: queries, time and payload size. Benchmark data is created '
+        'in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--lines', type=int, default=5, help='Items per order.')
+        parser.add_argument('--description-size', type=int, default=2000,
+                            help='Characters of each product description.')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['orders'], options['lines'], options['description_size'])
+            orders = Order.objects.filter(user=user).order_by('-created_at', '-id')
+            page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+            self.stdout.write(
+                f"{options['orders']} orders of {options['lines']} lines, {page_size} per page, "
+                f"{options['description_size']} character descriptions"
+            )
+            self.stdout.write(f'{"representation":>15} {"queries/page":>13} {"ms/page":>9} {"KiB/page":>9} {"KiB total":>10}')
+            for name, queryset, serializer_class in (
+                ('full', with_line_detail(orders), OrderReadSerializer),
+                ('compact', with_line_summary(orders), OrderListSerializer),
+            ):
+                queries, ms, size, pages = self.measure(queryset, serializer_class, page_size, options['repeat'])
+                self.stdout.write(
+                    f'{name:>15} {queries / pages:>13.1f} {ms / pages:>9.2f} '
+                    f'{size / pages / 1024:>9.1f} {size / 1024:>10.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, total, lines, description_size):
+        user = User.objects.create_user(email='benchmark-orders@example.com', password=None)
+        category = Category.objects.create(name='Benchmark')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='x' * description_size, price=Decimal('9.99'), category=category)
+            for i in range(lines * 4)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=user, total_amount=Decimal('9.99') * lines, status='delivered') for _ in range(total)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(i + line) % len(products)], price=Decimal('9.99'))
+            for i, order in enumerate(orders) for line in range(lines)
+        ], batch_size=5000)
+        attach_snapshots(OrderItem.objects.filter(order__user=user))
+        return user
+
+    def measure(self, queryset, serializer_class, page_size, repeat):
+        """
+        Render every page of the history, as the list endpoint would, and
+        return the queries, best time in ms and bytes summed over pages.
+        """
+        renderer = JSONRenderer()
+        count = queryset.count()
+        pages = (count + page_size - 1) // page_size
+        best = None
+        for _ in range(repeat):
+            queries = size = 0
+            start = time.perf_counter()
+            for offset in range(0, count, page_size):
+                with CaptureQueriesContext(connection) as captured:
+                    page = list(queryset[offset:offset + page_size])
+                    size += len(renderer.render(serializer_class(page, many=True).data))
+                queries += len(captured)
+            ms = (time.perf_counter() - start) * 1000
+            best = min(best or ms, ms)
+        return queries, best, size, pages
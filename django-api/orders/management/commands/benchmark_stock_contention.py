@@ -0,0 +1,77 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cart.models import CartItem
+from orders.services import CheckoutError, checkout_cart
+from products.models import Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent checkouts against a single hot product and report '
+        'throughput and oversell. Benchmark rows are committed (threads use '
+        'their own connections) and deleted again afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50)
+        parser.add_argument('--stock', type=int, default=25)
+
+    def handle(self, *args, **options):
+        buyers, stock = options['buyers'], options['stock']
+        category = Category.objects.create(name='Stock contention benchmark')
+        product = Product.objects.create(
+            name='Hot item', description='', price=Decimal('1'), category=category, stock=stock
+        )
+        users = [
+            User.objects.create_user(email=f'stock-benchmark-{i}@example.com', password=None)
+            for i in range(buyers)
+        ]
+        try:
+            CartItem.objects.bulk_create([CartItem(user=user, product=product) for user in users])
+            outcomes, elapsed = self.run(users)
+
+            product.refresh_from_db()
+            sold = outcomes.count('sold')
+            self.stdout.write(f'{buyers} concurrent checkouts on one product with {stock} units')
+            self.stdout.write(f'  sold:          {sold}')
+            self.stdout.write(f'  out of stock:  {outcomes.count("out of stock")}')
+            self.stdout.write(f'  errors:        {len(outcomes) - sold - outcomes.count("out of stock")}')
+            self.stdout.write(f'  stock left:    {product.stock}')
+            self.stdout.write(f'  oversold:      {max(sold - stock, 0)}')
+            self.stdout.write(f'  throughput:    {len(outcomes) / elapsed:.1f} checkouts/s ({elapsed * 1000:.0f} ms)')
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            category.delete()
+
+    def run(self, users):
+        outcomes = []
+        barrier = threading.Barrier(len(users) + 1)
+
+        def buy(user):
+            barrier.wait()
+            try:
+                checkout_cart(user)
+                outcomes.append('sold')
+            except CheckoutError:
+                outcomes.append('out of stock')
+            except Exception as exc:
+                outcomes.append(repr(exc))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return outcomes, time.perf_counter() - start
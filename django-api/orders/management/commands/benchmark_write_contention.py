@@ -0,0 +1,178 @@
+import logging
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+
+User = get_user_model()
+
+# Connection settings of each configuration, over a fresh database file
+CONFIGURATIONS = {
+    # Django's own: rollback journal, deferred transactions, a 5 s busy
+    # timeout and a new connection per request
+    'defaults': {'OPTIONS': {}, 'CONN_MAX_AGE': 0},
+    'tuned': {
+        'OPTIONS': settings.DATABASES['default'].get('OPTIONS', {}),
+        'CONN_MAX_AGE': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+    },
+}
+
+ENDPOINTS = ('cart', 'checkout')
+
+
+def shop(user_id, product_ids, lines, start_at, deadline, results):
+    """
+    Worker process: fill the cart with ``lines`` products through
+    /api/cart/ and check it out, until the deadline. Puts the outcome
+    counts and latencies of each endpoint on ``results``.
+    """
+    logging.disable(logging.CRITICAL)
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user_id))
+    close_old_connections()
+    outcomes = {endpoint: Counter() for endpoint in ENDPOINTS}
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+
+    def post(endpoint, path, data=None):
+        start = time.perf_counter()
+        try:
+            status = client.post(path, data, format='json').status_code
+            outcome = 'ok' if status < 400 else 'error'
+        except OperationalError as exc:
+            outcome = 'locked' if 'locked' in str(exc) else 'error'
+        latencies[endpoint].append(time.perf_counter() - start)
+        outcomes[endpoint][outcome] += 1
+        # What the request handler does at the end of each request
+        close_old_connections()
+
+    time.sleep(max(start_at - time.time(), 0))
+    while time.time() < deadline:
+        for product_id in random.sample(product_ids, lines):
+            post('cart', '/api/cart/', {'product': product_id, 'quantity': 1})
+        post('checkout', '/api/orders/checkout/')
+    connections.close_all()
+    results.put((outcomes, latencies))
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer /api/cart/ and checkout from several processes, as gunicorn workers '
+        'would, with Django\'s default SQLite settings and with the tuned ones '
+        '(WAL, busy timeout, BEGIN IMMEDIATE, persistent connections), and report '
+        'throughput and the rate of "database is locked" errors. Each configuration '
+        'runs against a fresh temporary database. Needs the fork start method (Linux).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configurations', default=','.join(CONFIGURATIONS),
+                            help=f'Comma-separated configurations to run ({", ".join(CONFIGURATIONS)}).')
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds of load per configuration.')
+        parser.add_argument('--lines', type=int, default=3, help='Cart lines per checkout.')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configurations'].split(',') if name.strip()]
+        unknown = set(names) - set(CONFIGURATIONS)
+        if unknown:
+            raise CommandError(f'Unknown configurations: {", ".join(sorted(unknown))}')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('This benchmark needs the fork start method')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name in names:
+                with self.database(os.path.join(directory, f'{name}.sqlite3'), CONFIGURATIONS[name]):
+                    results[name] = self.run(options)
+
+        self.stdout.write(
+            f'{options["processes"]} processes, {options["lines"]} cart lines per checkout, '
+            f'{options["duration"]:g} s per configuration'
+        )
+        self.stdout.write(
+            f'{"configuration":<14} {"endpoint":<9} {"requests":>9} {"ok/s":>8} {"locked":>8} '
+            f'{"errors":>7} {"p50 ms":>8} {"p99 ms":>8}'
+        )
+        for name, (outcomes, latencies, elapsed) in results.items():
+            for endpoint in ENDPOINTS:
+                counts, samples = outcomes[endpoint], latencies[endpoint]
+                total = sum(counts.values())
+                self.stdout.write(
+                    f'{name:<14} {endpoint:<9} {total:>9} {counts["ok"] / elapsed:>8.1f} '
+                    f'{counts["locked"] / max(total, 1):>8.1%} {counts["error"]:>7} '
+                    f'{self.percentile(samples, 0.5):>8.1f} {self.percentile(samples, 0.99):>8.1f}'
+                )
+
+    @contextmanager
+    def database(self, path, configuration):
+        """
+        Point the default connection at a new, migrated database file with
+        the given connection settings for the duration of the block.
+        """
+        connection = connections['default']
+        original = dict(connection.settings_dict)
+        connection.close()
+        connection.settings_dict.update(configuration, NAME=path)
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+
+    def run(self, options):
+        category = Category.objects.create(name='Write contention benchmark')
+        product_ids = [
+            product.pk for product in Product.objects.bulk_create([
+                Product(name=f'Product {i}', description='', price=Decimal('9.99'), category=category)
+                for i in range(max(options['lines'], 20))
+            ])
+        ]
+        user_ids = [
+            User.objects.create_user(email=f'write-contention-{i}@example.com', password=None).pk
+            for i in range(options['processes'])
+        ]
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        start_at = time.time() + 1
+        deadline = start_at + options['duration']
+        # Throttles and the in-flight cap would turn the load away before it
+        # reaches the database
+        with override_settings(THROTTLE_BUCKETS={}, CHECKOUT_MAX_IN_FLIGHT=None):
+            processes = [
+                context.Process(target=shop, args=(user_id, product_ids, options['lines'], start_at, deadline, results))
+                for user_id in user_ids
+            ]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+        elapsed = time.time() - start_at
+
+        outcomes, latencies = defaultdict(Counter), defaultdict(list)
+        for process_outcomes, process_latencies in collected:
+            for endpoint in ENDPOINTS:
+                outcomes[endpoint].update(process_outcomes[endpoint])
+                latencies[endpoint].extend(process_latencies[endpoint])
+        return outcomes, latencies, elapsed
+
+    def percentile(self, values, fraction):
+        return statistics.quantiles(values, n=100)[int(fraction * 100) - 1] * 1000 if len(values) > 1 else 0.0
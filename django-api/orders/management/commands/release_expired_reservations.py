@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancel pending orders whose stock reservation has expired and put the '
+        'reserved units back on sale. Run it periodically, e.g. from cron.'
+    )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservation(s).'))
@@ -1,6 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
 from django.conf import settings
-from products.models import Product
+from products.models import Product, ProductSnapshot
+from .signals import order_status_changed
+
+class OrderStatusConflict(Exception):
+    """
+    Raised when saving an order whose status changed since it was loaded
+    """
 
 class Order(models.Model):
     """
@@ -17,23 +24,104 @@ class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reserved_until = models.DateTimeField(null=True, blank=True)  # Stock is held for a pending order until then
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Compared with on save, to announce status changes
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        old_status = getattr(self, '_loaded_status', None)
+        if old_status is None or old_status == self.status:
+            super().save(*args, **kwargs)
+        else:
+            if old_status == 'cancelled':
+                # Its units are back on sale already
+                raise OrderStatusConflict('Cancelled orders cannot be reopened')
+            with transaction.atomic():
+                # Claim the transition, so a concurrent one from the same
+                # status (e.g. reservation expiry) isn't applied twice
+                if not Order.objects.filter(pk=self.pk, status=old_status).update(status=self.status):
+                    raise OrderStatusConflict('The order status changed meanwhile, reload it and try again')
+                if self.status == 'cancelled':
+                    self.reserved_until = None
+                    self.release_stock()
+                super().save(*args, **kwargs)
+                order_status_changed.send(
+                    sender=Order, order_ids=[self.pk], old_status=old_status, new_status=self.status
+                )
+        self._loaded_status = self.status
+
+    def cancel_if_pending(self, **filters):
+        """
+        Cancel the order and put its units back on sale, unless it is no
+        longer pending (or doesn't match ``filters``). The conditional
+        update makes sure concurrent cancellations release the stock once.
+        Returns whether it was cancelled; announcing it is up to the caller.
+        """
+        with transaction.atomic():
+            if not Order.objects.filter(pk=self.pk, status='pending', **filters).update(
+                status='cancelled', reserved_until=None
+            ):
+                return False
+            self.release_stock()
+            return True
+
+    def release_stock(self):
+        """
+        Return the order's units to stock.
+        """
+        quantity = (
+            OrderItem.objects.filter(order=self, product=OuterRef('pk'))
+            .values('product')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        Product.objects.filter(
+            pk__in=self.items.values('product'),
+            stock__isnull=False,
+        ).update(stock=F('stock') + Subquery(quantity))
+
 class OrderItem(models.Model):
     """
     Order item model
     """
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Lines outlive their product, whose sold version is kept in ``snapshot``
+    product = models.ForeignKey(Product, null=True, on_delete=models.SET_NULL)
+    snapshot = models.ForeignKey(ProductSnapshot, null=True, blank=True, editable=False, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)  # Price at time of purchase
 
     def __str__(self):
-        return f"{self.product.name} x {self.quantity} in Order #{self.order.id}"
+        product = self.snapshot if self.snapshot_id is not None else self.product
+        return f"{product.name if product else 'Deleted product'} x {self.quantity} in Order #{self.order_id}"
+
+    @property
+    def product_version(self):
+        """
+        The product as it was sold. Lines saved before snapshots existed, and
+        not backfilled yet, fall back to an unsaved snapshot of the live
+        product, or None once it is deleted.
+        """
+        if self.snapshot_id is not None:
+            return self.snapshot
+        if self.product_id is not None:
+            return ProductSnapshot.from_product(self.product)
+        return None
 
     @property
     def total_price(self):
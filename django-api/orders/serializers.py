@@ -1,12 +1,15 @@
 from rest_framework import serializers
+
+from config.serializers import FastReadMixin
 from .models import Order, OrderItem
-from products.serializers import ProductSerializer
+from products.models import ProductSnapshot
+from products.serializers import ProductSnapshotReadSerializer, ProductSnapshotSerializer
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """
     Serializer for OrderItem model
     """
-    product_detail = ProductSerializer(source='product', read_only=True)
+    product_detail = ProductSnapshotSerializer(source='product_version', read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
@@ -25,6 +28,53 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'status', 'total_amount', 'items', 'created_at', 'updated_at']
         read_only_fields = ['user', 'total_amount']
 
+class OrderItemReadSerializer(FastReadMixin, OrderItemSerializer):
+    """
+    Read-only fast path producing the same output as OrderItemSerializer
+    """
+    product_detail = ProductSnapshotReadSerializer(source='product_version', read_only=True)
+
+class OrderReadSerializer(FastReadMixin, OrderSerializer):
+    """
+    Read-only fast path producing the same output as OrderSerializer
+    """
+    items = OrderItemReadSerializer(many=True, read_only=True)
+
+class OrderLineProductSerializer(FastReadMixin, serializers.ModelSerializer):
+    """
+    The few product fields an order line shows in order lists
+    """
+    id = serializers.ReadOnlyField(source='product_id')
+
+    class Meta:
+        model = ProductSnapshot
+        fields = ['id', 'name', 'image']
+
+class OrderListItemSerializer(FastReadMixin, serializers.ModelSerializer):
+    """
+    Compact order line for order lists, without the product's description,
+    category and image variants
+    """
+    product_detail = OrderLineProductSerializer(source='product_version', read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'product_detail', 'quantity', 'price', 'total_price']
+
+class OrderListSerializer(FastReadMixin, serializers.ModelSerializer):
+    """
+    Compact order for order lists. ``item_count`` and ``units`` are
+    annotated by the view; the full lines are served by the order detail.
+    """
+    items = OrderListItemSerializer(many=True, read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    units = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'user', 'status', 'total_amount', 'item_count', 'units', 'items', 'created_at', 'updated_at']
+
 class OrderCreateSerializer(serializers.Serializer):
     """
     Serializer for creating a new order from cart
@@ -0,0 +1,18 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import Signal, receiver
+
+# Sent in the transaction that changes the status of orders, with their
+# ``order_ids``, ``old_status`` and ``new_status``; None stands for orders
+# that are not placed yet, or whose items are being changed. New orders
+# are announced by checkout once their items are saved, saved orders by
+# Order.save(), and update() calls by the code making them.
+order_status_changed = Signal()
+
+
+@receiver(pre_delete, sender='orders.Order')
+def release_deleted_reservation(sender, instance, **kwargs):
+    """
+    Put the units held by a deleted pending order back on sale, while its
+    items still exist. Covers API, admin and cascading deletes.
+    """
+    instance.cancel_if_pending()
@@ -1,3 +1,666 @@
-from django.test import TestCase
+import csv
+import json
+import threading
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.utils import timezone
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from cart.models import CartItem
+from config.query_budget import fingerprint, record_queries
+from config.testing import QueryBudgetMixin
+from config.throttling import InFlightLimit
+from products.models import Category, Product, ProductSnapshot
+from products.serializers import ProductSerializer, ProductSnapshotSerializer
+from .models import Order, OrderItem
+from .serializers import OrderReadSerializer, OrderSerializer
+from .services import CheckoutError, attach_snapshots, checkout_cart, release_expired_reservations
+
+User = get_user_model()
+
+
+class CheckoutTests(TestCase):
+    """
+    Tests for turning a cart into an order
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='buyer@example.com', password='secret-pass-123')
+        category = Category.objects.create(name='Kitchen')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=Decimal('2.50') * (i + 1), category=category)
+            for i in range(60)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, products, quantity=2):
+        CartItem.objects.bulk_create([CartItem(user=self.user, product=p, quantity=quantity) for p in products])
+
+    def test_checkout_copies_cart_and_clears_it(self):
+        self.fill_cart(self.products[:3])
+        response = self.client.post('/api/orders/checkout/')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_amount, Decimal('30.00'))
+        self.assertEqual(response.data['total_amount'], '30.00')
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price')),
+            [(p.pk, 2, p.price) for p in self.products[:3]],
+        )
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_empty_cart_is_rejected(self):
+        response = self.client.post('/api/orders/checkout/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        counts = []
+        for size in (1, 60):
+            self.fill_cart(self.products[:size])
+            with CaptureQueriesContext(connection) as queries:
+                checkout_cart(self.user)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(OrderItem.objects.count(), 61)
+
+
+
+@override_settings(THROTTLE_BUCKETS={'checkout': {'rate': '1/min', 'burst': 2}}, CHECKOUT_MAX_IN_FLIGHT=1)
+class CheckoutAdmissionTests(TestCase):
+    """
+    Tests for the checkout throttle and concurrency cap
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='bot@example.com', password=None)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_checkout_is_throttled_per_user(self):
+        # Empty carts are rejected, but still count
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/orders/checkout/').status_code, 400)
+        response = self.client.post('/api/orders/checkout/')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+        # Other actions and other users are not affected
+        self.assertEqual(self.client.get('/api/orders/').status_code, 200)
+        self.client.force_authenticate(User.objects.create_user(email='shopper@example.com', password=None))
+        self.assertEqual(self.client.post('/api/orders/checkout/').status_code, 400)
+
+    def test_checkouts_beyond_the_cap_are_shed(self):
+        with InFlightLimit('checkout', 1) as admitted:
+            self.assertTrue(admitted)
+            response = self.client.post('/api/orders/checkout/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Both the slot held above and the one of the shed request are free
+        self.assertEqual(self.client.post('/api/orders/checkout/').status_code, 400)
+        self.assertEqual(cache.get('in-flight:checkout'), 0)
+
+class StockReservationTests(TestCase):
+    """
+    Tests for reserving stock at checkout
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='stock@example.com', password=None)
+        category = Category.objects.create(name='Furniture')
+        cls.chair = Product.objects.create(name='Chair', description='', price=Decimal('20'), category=category, stock=5)
+        cls.couch = Product.objects.create(name='Couch', description='', price=Decimal('500'), category=category, stock=1)
+        cls.lamp = Product.objects.create(name='Lamp', description='', price=Decimal('15'), category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_checkout_decrements_tracked_stock(self):
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=3)
+        CartItem.objects.create(user=self.user, product=self.lamp, quantity=10)
+
+        response = self.client.post('/api/orders/checkout/')
+        self.assertEqual(response.status_code, 201)
+
+        self.chair.refresh_from_db()
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.chair.stock, 2)
+        self.assertIsNone(self.lamp.stock)
+        self.assertIsNotNone(Order.objects.get().reserved_until)
+
+    def test_insufficient_stock_rolls_back_everything(self):
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=2)
+        CartItem.objects.create(user=self.user, product=self.couch, quantity=2)
+
+        response = self.client.post('/api/orders/checkout/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['products'], [self.couch.pk])
+
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 5)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+
+    def test_expired_reservations_are_released(self):
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=4)
+        order = checkout_cart(self.user)
+        paid = Order.objects.create(user=self.user, total_amount=Decimal('0'), status='processing',
+                                    reserved_until=order.reserved_until)
+
+        self.assertEqual(release_expired_reservations(), 0)
+        released = release_expired_reservations(now=order.reserved_until + timedelta(seconds=1))
+        self.assertEqual(released, 1)
+
+        order.refresh_from_db()
+        paid.refresh_from_db()
+        self.chair.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(paid.status, 'processing')
+        self.assertEqual(self.chair.stock, 5)
+
+    def test_cancelled_and_deleted_orders_release_stock(self):
+        admin = User.objects.create_superuser(email='stock-admin@example.com', password='secret-pass-123')
+        self.client.force_authenticate(admin)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=2)
+        cancelled = checkout_cart(self.user)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=1)
+        deleted = checkout_cart(self.user)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=1)
+        shipped = checkout_cart(self.user)
+        self.client.patch(f'/api/orders/{shipped.pk}/', {'status': 'shipped'}, format='json')
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 1)
+
+        response = self.client.patch(f'/api/orders/{cancelled.pk}/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Order.objects.get(pk=cancelled.pk).reserved_until)
+        response = self.client.patch(f'/api/orders/{cancelled.pk}/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.delete(f'/api/orders/{cancelled.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/orders/{deleted.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/orders/{shipped.pk}/').status_code, 204)
+
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 4)
+
+    def test_product_saves_keep_reservations(self):
+        stale = Product.objects.get(pk=self.chair.pk)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=3)
+        checkout_cart(self.user)
+
+        stale.name = 'Armchair'
+        stale.save()
+        admin = User.objects.create_superuser(email='stock-admin@example.com', password='secret-pass-123')
+        self.client.force_authenticate(admin)
+        response = self.client.patch(f'/api/products/{self.chair.pk}/', {'price': '25.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.chair.refresh_from_db()
+        self.assertEqual((self.chair.name, self.chair.price, self.chair.stock), ('Armchair', Decimal('25.00'), 2))
+
+    def test_stock_changes_are_not_dropped_silently(self):
+        chair = Product.objects.get(pk=self.chair.pk)
+        chair.stock = 9
+        with self.assertRaisesMessage(ValueError, 'changed from 5 to 9'):
+            chair.save()
+        chair.save(update_fields=['stock'])
+        chair.name = 'Stool'
+        chair.save()
+        chair.refresh_from_db()
+        self.assertEqual((chair.name, chair.stock), ('Stool', 9))
+
+    def test_admin_stock_edits_are_relative(self):
+        admin = User.objects.create_superuser(email='stock-admin@example.com', password='secret-pass-123')
+        self.client.force_login(admin)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=3)
+        checkout_cart(self.user)
+
+        # The form was shown with 5 in stock, before the checkout took 3
+        form = {'category': self.chair.category_id, 'name': 'Chair', 'sku': '', 'description': 'Oak', 'price': '20',
+                'initial-stock': '5', 'stock': '8'}
+        response = self.client.post(f'/admin/products/product/{self.chair.pk}/change/', form)
+        self.assertEqual(response.status_code, 302)
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 5)
+
+        # Selling out from the same stale form takes what the checkout left
+        self.client.post(f'/admin/products/product/{self.chair.pk}/change/', {**form, 'stock': '0'})
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 0)
+
+        # Taking away more than is left is refused
+        response = self.client.post(f'/admin/products/product/{self.chair.pk}/change/',
+                                    {**form, 'initial-stock': '2', 'stock': '1'}, follow=True)
+        self.assertIn('changed meanwhile', str(list(response.context['messages'])))
+        self.chair.refresh_from_db()
+        self.assertEqual(self.chair.stock, 0)
+
+        self.client.post(f'/admin/products/product/{self.lamp.pk}/change/',
+                         {**form, 'name': 'Lamp', 'initial-stock': '', 'stock': '4'})
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.lamp.stock, 4)
+
+
+class StockContentionTests(TransactionTestCase):
+    """
+    Concurrent checkouts on a hot product must never oversell it
+    """
+
+    def test_concurrent_checkouts_do_not_oversell(self):
+        stock, buyers = 20, 50
+        category = Category.objects.create(name='Flash sale')
+        product = Product.objects.create(name='Hot item', description='', price=Decimal('1'),
+                                         category=category, stock=stock)
+        users = [User.objects.create_user(email=f'buyer{i}@example.com', password=None) for i in range(buyers)]
+        CartItem.objects.bulk_create([CartItem(user=user, product=product) for user in users])
+
+        outcomes = []
+        barrier = threading.Barrier(buyers)
+
+        def buy(user):
+            barrier.wait()
+            try:
+                checkout_cart(user)
+                outcomes.append('sold')
+            except CheckoutError:
+                outcomes.append('out of stock')
+            except Exception as exc:
+                outcomes.append(repr(exc))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).count()
+        self.assertEqual(outcomes.count('sold'), sold)
+        self.assertEqual(sold + product.stock, stock)
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(sold, stock, outcomes)
+
+
+class OrderReadSerializerTests(TestCase):
+    """
+    The fast read serializer must render exactly like OrderSerializer
+    """
+
+    def test_parity(self):
+        user = User.objects.create_user(email='parity@example.com', password=None)
+        category = Category.objects.create(name='Garden')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=Decimal('0.10') * i, category=category)
+            for i in range(1, 4)
+        ])
+        for status in ('pending', 'delivered'):
+            order = Order.objects.create(user=user, total_amount=Decimal('12.345'), status=status)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=p, quantity=2, price=p.price) for p in products
+            ])
+        Order.objects.create(user=user, total_amount=Decimal('0'))
+
+        queryset = Order.objects.prefetch_related('items__product__category').order_by('id')
+        context = {'request': APIRequestFactory().get('/api/orders/')}
+        self.assertEqual(
+            JSONRenderer().render(OrderReadSerializer(queryset, many=True, context=context).data),
+            JSONRenderer().render(OrderSerializer(queryset, many=True, context=context).data),
+        )
+
+
+class OrderListTests(TestCase):
+    """
+    Order lists must be compact, leaving the full lines to the order detail
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='history@example.com', password=None)
+        category = Category.objects.create(name='Library')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Tome {i}', description='A very long description. ' * 500, price=Decimal('7.25'),
+                    category=category)
+            for i in range(2)
+        ])
+        cls.orders = Order.objects.bulk_create([
+            Order(user=cls.user, total_amount=Decimal('21.75')) for _ in range(3)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity, price=product.price)
+            for order in cls.orders for product, quantity in zip(cls.products, (1, 2))
+        ])
+        attach_snapshots(OrderItem.objects.all())
+        Order.objects.create(user=cls.user, total_amount=Decimal('0'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_compact(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'description' in query['sql']])
+
+        empty, *orders = response.data['results']
+        self.assertEqual((empty['item_count'], empty['units'], empty['items']), (0, 0, []))
+        self.assertEqual([order['id'] for order in orders], [order.pk for order in reversed(self.orders)])
+        self.assertEqual((orders[0]['item_count'], orders[0]['units']), (2, 3))
+        self.assertEqual(orders[0]['items'][1], {
+            'id': orders[0]['items'][1]['id'],
+            'product': self.products[1].pk,
+            'product_detail': {'id': self.products[1].pk, 'name': 'Tome 1', 'image': None},
+            'quantity': 2,
+            'price': '7.25',
+            'total_price': '14.50',
+        })
+
+    def test_detail_has_full_lines(self):
+        response = self.client.get(f'/api/orders/{self.orders[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('item_count', response.data)
+        self.assertEqual(response.data['items'][0]['product_detail']['category_name'], 'Library')
+        self.assertTrue(response.data['items'][0]['product_detail']['description'])
+
+
+class ProductSnapshotTests(TestCase):
+    """
+    Orders must show products as they were sold, from snapshots shared by
+    the orders that bought the same version
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='snapshots@example.com', password=None)
+        cls.category = Category.objects.create(name='Records')
+        cls.product = Product.objects.create(name='Blue LP', description='Pressed in 1959', price=Decimal('25.00'),
+                                             category=cls.category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def buy(self):
+        CartItem.objects.create(user=self.user, product=self.product)
+        return checkout_cart(self.user)
+
+    def test_versions_are_shared_and_kept(self):
+        first, second = self.buy(), self.buy()
+        self.assertEqual(ProductSnapshot.objects.count(), 1)
+        self.assertEqual(first.items.get().snapshot_id, second.items.get().snapshot_id)
+
+        self.product.name = 'Blue LP (reissue)'
+        self.product.price = Decimal('30.00')
+        self.product.save()
+        self.assertNotEqual(self.buy().items.get().snapshot_id, first.items.get().snapshot_id)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/orders/{first.pk}/')
+        self.assertEqual(response.data['items'][0]['product_detail']['name'], 'Blue LP')
+        self.assertEqual(response.data['items'][0]['product_detail']['price'], '25.00')
+
+    def test_known_versions_are_matched_without_hashing(self):
+        Product.objects.filter(pk=self.product.pk).update(
+            sku='LP-1959', image='products/blue.jpg', image_variants={'w320': 'products/blue-320.webp'}
+        )
+        first = self.buy()
+        with CaptureQueriesContext(connection) as captured:
+            second = self.buy()
+        self.assertEqual(second.items.get().snapshot_id, first.items.get().snapshot_id)
+        self.assertFalse([q['sql'] for q in captured if 'digest' in q['sql']])
+
+    def test_lines_outlive_deleted_products(self):
+        order = self.buy()
+        product_id = self.product.pk
+        self.product.delete()
+
+        response = self.client.get(f'/api/orders/{order.pk}/')
+        [item] = response.data['items']
+        self.assertIsNone(item['product'])
+        self.assertEqual((item['product_detail']['id'], item['product_detail']['name']), (product_id, 'Blue LP'))
+        response = self.client.get('/api/orders/')
+        self.assertEqual(response.data['results'][0]['items'][0]['product_detail']['name'], 'Blue LP')
+
+    def test_snapshots_render_like_products(self):
+        order = self.buy()
+        context = {'request': APIRequestFactory().get('/api/orders/')}
+        self.assertEqual(
+            ProductSnapshotSerializer(order.items.get().snapshot, context=context).data,
+            ProductSerializer(self.product, context=context).data,
+        )
+
+    def test_backfill(self):
+        legacy = Order.objects.create(user=self.user, total_amount=Decimal('25.00'))
+        OrderItem.objects.create(order=legacy, product=self.product, price=Decimal('25.00'))
+        # Lines without snapshots read their product, over the budget
+        with self.assertLogs('config.query_budget', 'WARNING'):
+            before = self.client.get(f'/api/orders/{legacy.pk}/').data
+
+        out = StringIO()
+        call_command('backfill_order_snapshots', '--batch-size=1', stdout=out)
+        self.assertIn('Backfilled the snapshots of 1 order items', out.getvalue())
+        self.assertIsNotNone(legacy.items.get().snapshot_id)
+        self.assertEqual(self.client.get(f'/api/orders/{legacy.pk}/').data, before)
+
+        call_command('backfill_order_snapshots', stdout=out)
+        self.assertIn('Backfilled the snapshots of 0 order items', out.getvalue())
+
+
+class OrderExportTests(TestCase):
+    """
+    Tests for streaming the order export
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='admin@example.com', password=None, is_staff=True)
+        cls.customer = User.objects.create_user(email='customer@example.com', password=None)
+        category = Category.objects.create(name='Export')
+        cls.product = Product.objects.create(name='Widget, large', description='', price=Decimal('2.50'),
+                                             category=category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_orders(self, count, items=2, **kwargs):
+        orders = Order.objects.bulk_create([
+            Order(user=self.customer, total_amount=Decimal('5.00'), **kwargs) for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=self.product, quantity=1, price=Decimal('2.50'))
+            for order in orders for _ in range(items)
+        ])
+        return orders
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/orders/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        orders = self.create_orders(3)
+        lines = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([line['id'] for line in lines], [order.pk for order in orders])
+        self.assertEqual(len(lines[0]['items']), 2)
+        self.assertEqual(lines[0]['items'][0]['product_detail']['name'], 'Widget, large')
+        self.assertEqual(lines[0]['total_amount'], '5.00')
+
+    def test_csv(self):
+        self.create_orders(2)
+        self.create_orders(1, items=0)
+        rows = list(csv.reader(self.export('?output=csv').splitlines()))
+
+        self.assertEqual(rows[0][:3], ['order_id', 'user', 'status'])
+        self.assertEqual(len(rows), 1 + 2 * 2 + 1)
+        self.assertEqual(rows[1][7:], ['Widget, large', '1', '2.50'])
+        self.assertEqual(rows[-1][6:], ['', '', '', ''])
+
+    def test_filters(self):
+        self.create_orders(2, status='delivered')
+        self.create_orders(1, status='cancelled')
+        old = self.create_orders(1, status='delivered')[0]
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+        self.assertEqual(len(self.export('?status=delivered').splitlines()), 3)
+        self.assertEqual(len(self.export('?status=delivered,cancelled').splitlines()), 4)
+        since = (timezone.now() - timedelta(days=30)).date().isoformat()
+        self.assertEqual(len(self.export(f'?status=delivered&created_after={since}').splitlines()), 2)
+        self.assertEqual(len(self.export(f'?created_before={since}').splitlines()), 1)
+
+    def test_invalid_parameters(self):
+        for query in ('?output=xml', '?status=lost', '?created_after=yesterday', '?created_before=2024-13-01'):
+            self.assertEqual(self.client.get(f'/api/orders/export/{query}').status_code, 400, query)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/orders/export/').status_code, 403)
+
+    @override_settings(ORDER_EXPORT_CHUNK_SIZE=50)
+    def test_memory_does_not_grow_with_export_size(self):
+        def peak_memory(output):
+            tracemalloc.start()
+            try:
+                response = self.client.get(f'/api/orders/export/?output={output}')
+                for _ in response.streaming_content:
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        self.create_orders(200)
+        small = {output: peak_memory(output) for output in ('ndjson', 'csv')}
+        self.create_orders(1800)
+        large = {output: peak_memory(output) for output in ('ndjson', 'csv')}
+
+        # Ten times the orders; the margin is for when the cyclic garbage
+        # collector happens to run
+        for output in ('ndjson', 'csv'):
+            self.assertLess(large[output], small[output] * 2, output)
+
+
+class OrderQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    The order endpoints and admin must not run queries per row
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='budget@example.com', password=None)
+        cls.admin = User.objects.create_superuser(email='budget-admin@example.com', password='secret-pass-123')
+        category = Category.objects.create(name='Budget')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Budget product {i}', description='', price=Decimal('1.50'), category=category)
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, total_amount=Decimal('4.50')) for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, price=product.price)
+            for order in orders for product in self.products
+        ])
+        attach_snapshots(OrderItem.objects.filter(order__in=orders))
+        return orders
+
+    @override_settings(DEBUG=True)
+    def test_order_list_budget_does_not_depend_on_page_size(self):
+        for count in (1, 9):
+            self.create_orders(count)
+            with self.assertQueryBudget(3):
+                response = self.client.get('/api/orders/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results'][0]['items']), 3)
+            self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries"$')
+
+        with self.assertQueryBudget(2):
+            self.client.get(f'/api/orders/{response.data["results"][0]["id"]}/')
+
+    def test_repeated_query_shapes_are_traced_to_their_code(self):
+        self.create_orders(2)
+        with record_queries() as log:
+            [str(item) for item in OrderItem.objects.all()]
+
+        self.assertEqual(len(log), 7)
+        [duplicate] = log.duplicates()
+        self.assertEqual(duplicate['count'], 6)
+        [location] = duplicate['locations']
+        self.assertRegex(location, r'^orders/models\.py:\d+ in __str__$')
+
+        with self.assertRaisesMessage(AssertionError, 'Repeated 6 times'):
+            with self.assertQueryBudget(10):
+                [str(item) for item in OrderItem.objects.all()]
+
+    def test_fingerprints_ignore_values(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t1" WHERE "id" IN (%s, %s) AND "name" = \'x\' LIMIT 21'),
+            fingerprint('SELECT *\nFROM "t1" WHERE "id" IN (%s) AND "name" = \'y\' LIMIT 5'),
+        )
+
+    @override_settings(QUERY_BUDGETS={'GET orders-list': 1, 'GET orders-detail': 1})
+    def test_requests_over_budget_are_logged(self):
+        [order] = self.create_orders(1)
+        with self.assertLogs('config.query_budget', 'WARNING') as logs:
+            self.client.get('/api/orders/')
+        record = logs.records[0].query_budget
+        self.assertEqual((record['view'], record['queries'], record['budget']), ('orders-list', 3, 1))
+
+        # Budgets are per method
+        self.client.force_authenticate(self.admin)
+        with self.assertLogs('config.query_budget', 'DEBUG') as logs:
+            self.client.patch(f'/api/orders/{order.pk}/', {'status': 'processing'}, format='json')
+        self.assertIsNone(logs.records[0].query_budget['budget'])
+
+    @override_settings(QUERY_TRACE=False)
+    def test_untraced_requests_only_count_queries(self):
+        self.create_orders(2)
+        with record_queries(trace=False) as log:
+            [str(item) for item in OrderItem.objects.all()]
+        self.assertEqual((len(log), log.queries, log.duplicates()), (7, [], []))
+
+        with self.assertLogs('config.query_budget', 'DEBUG') as logs:
+            self.client.get('/api/orders/')
+        record = logs.records[0].query_budget
+        self.assertEqual((record['queries'], record['duplicates']), (3, []))
+
+    def test_admin_lists_do_not_query_per_row(self):
+        self.client.force_login(self.admin)
+        CartItem.objects.bulk_create([CartItem(user=self.user, product=product) for product in self.products])
+        self.create_orders(10)
+        # The changelist counts the rows twice, unfiltered and filtered
+        for url in ('/admin/orders/order/', '/admin/cart/cartitem/', '/admin/products/product/'):
+            with self.assertQueryBudget(8, max_repeats=2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
@@ -1,18 +1,62 @@
-from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderCreateSerializer
-from cart.models import CartItem
+from config.throttling import InFlightLimit
+from .export import export_csv, export_ndjson
+from .models import Order, OrderItem, OrderStatusConflict
+from .serializers import OrderListSerializer, OrderReadSerializer, OrderSerializer, OrderCreateSerializer
+from .services import CheckoutError, OutOfStockError, checkout_cart
+
+def parse_moment(value):
+    """
+    Parse a date (taken as midnight) or an ISO 8601 datetime into an aware
+    datetime, or return None if it is neither.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None and parse_date(value) is not None:
+            moment = parse_datetime(f'{value}T00:00:00')
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def with_line_detail(queryset):
+    """
+    Orders with their items and the product snapshots they render fetched
+    in one query, as the full order representation renders them.
+    """
+    return queryset.prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('snapshot')))
+
+def with_line_summary(queryset):
+    """
+    Orders for OrderListSerializer: their item count and units annotated
+    in SQL, and their items with only the snapshot fields a list shows.
+    """
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    items = OrderItem.objects.select_related('snapshot').only(
+        'order_id', 'product_id', 'snapshot_id', 'quantity', 'price',
+        'snapshot__product_id', 'snapshot__name', 'snapshot__image',
+    )
+    return queryset.annotate(
+        item_count=Coalesce(Subquery(lines.annotate(count=Count('pk')).values('count')), 0),
+        units=Coalesce(Subquery(lines.annotate(units=Sum('quantity')).values('units')), 0),
+    ).prefetch_related(Prefetch('items', queryset=items))
 
 class IsAdminUser(permissions.BasePermission):
     """
     Custom permission to only allow admin users to access
     """
     def has_permission(self, request, view):
-        return request.user and request.user.is_admin
+        return getattr(request.user, 'is_admin', False)
 
 class OrderViewSet(viewsets.ModelViewSet):
     """
@@ -20,63 +64,120 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = None  # Set per action, see THROTTLE_BUCKETS
 
     def get_queryset(self):
         user = self.request.user
 
         # Admin users can see all orders, regular users only see their own
-        if user.role == 'ADMIN' or user.is_staff or user.is_superuser :
-            return Order.objects.all().prefetch_related('items__product')
-        return Order.objects.filter(user=user).prefetch_related('items__product')
+        queryset = Order.objects.all() if user.is_admin else Order.objects.filter(user=user)
+
+        # Lists show the latest orders first, and only load what the compact
+        # representation shows
+        if self.action == 'list':
+            return with_line_summary(queryset.order_by('-created_at', '-id'))
+        return with_line_detail(queryset)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderListSerializer
+        # Checkout only returns the new order, so it can use the read path too
+        if self.request.method in permissions.SAFE_METHODS or self.action == 'checkout':
+            return OrderReadSerializer
+        return super().get_serializer_class()
 
     def get_permissions(self):
         """
         Override to restrict update/delete to admin only
         """
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in ['update', 'partial_update', 'destroy', 'export']:
             return [IsAdminUser()]
         return super().get_permissions()
 
-    @action(detail=False, methods=['post'])
-    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except OrderStatusConflict as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_409_CONFLICT
+            )
+
+    @action(detail=False, methods=['post'], throttle_scope='checkout')
     def checkout(self, request):
         """
-        Creates a new order from the user's cart
+        Creates a new order from the user's cart, reserving its stock
+        """
+        with InFlightLimit('checkout', settings.CHECKOUT_MAX_IN_FLIGHT) as admitted:
+            if not admitted:
+                return Response(
+                    {'error': 'Too many checkouts in progress, please retry shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '1'}
+                )
+            try:
+                order = checkout_cart(request.user)
+            except OutOfStockError as exc:
+                return Response(
+                    {'error': str(exc), 'products': exc.product_ids},
+                    status=status.HTTP_409_CONFLICT
+                )
+            except CheckoutError as exc:
+                return Response(
+                    {'error': str(exc)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        serializer = self.get_serializer(self.get_queryset().get(pk=order.pk))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
         """
-        user = request.user
-        cart_items = CartItem.objects.filter(user=user).select_related('product')
+        Stream every order as NDJSON (default) or CSV, for admins.
 
-        if not cart_items.exists():
+        - ?output=ndjson|csv
+        - ?status=pending,processing
+        - ?created_after=2024-01-01&created_before=2024-02-01 (dates or ISO
+          datetimes; created_after is inclusive, created_before exclusive)
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
             return Response(
-                {'error': 'Your cart is empty'},
+                {'error': 'output must be ndjson or csv'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Calculate the total amount
-        total_amount = sum(item.quantity * item.product.price for item in cart_items)
-
-        # Create the order
-        order = Order.objects.create(
-            user=user,
-            total_amount=total_amount,
-            status='pending'
-        )
-
-        # Create order items
-        order_items = []
-        for cart_item in cart_items:
-            order_item = OrderItem(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            order_items.append(order_item)
+        queryset = Order.objects.all()
 
-        OrderItem.objects.bulk_create(order_items)
+        statuses = [value for value in request.query_params.get('status', '').split(',') if value]
+        valid_statuses = {choice for choice, _ in Order.STATUS_CHOICES}
+        if set(statuses) - valid_statuses:
+            return Response(
+                {'error': f'status must be one of {", ".join(sorted(valid_statuses))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
 
-        # Clear the cart
-        cart_items.delete()
+        for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            moment = parse_moment(value)
+            if moment is None:
+                return Response(
+                    {'error': f'{param} must be a date or an ISO 8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(**{lookup: moment})
 
-        serializer = self.get_serializer(order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        if output == 'csv':
+            response = StreamingHttpResponse(export_csv(queryset), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(
+                export_ndjson(queryset, self.get_serializer_context()),
+                content_type='application/x-ndjson'
+            )
+        response['Content-Disposition'] = f'attachment; filename="orders.{output}"'
+        return response
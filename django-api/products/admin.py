@@ -1,4 +1,7 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import F
+
 from .models import Category, Product
 
 
@@ -11,27 +14,85 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 
+class ProductAdminForm(forms.ModelForm):
+    """
+    Product form that remembers the stock it was shown with, so edits can
+    be applied as a difference from it
+    """
+
+    class Meta:
+        model = Product
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'stock' in self.fields:
+            self.fields['stock'].show_hidden_initial = True
+
+    def shown_stock(self):
+        field = self.fields['stock']
+        name = self.add_initial_prefix('stock')
+        if name not in self.data:
+            return self.initial.get('stock')
+        return field.to_python(field.hidden_widget().value_from_datadict(self.data, self.files, name))
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     """
     Admin configuration for the Product model.
     """
-    list_display = ('name', 'category', 'price', 'created_at', 'updated_at')
+    list_display = ('name', 'sku', 'category', 'price', 'stock', 'created_at', 'updated_at')
+    list_select_related = ('category',)
     list_filter = ('category', 'created_at')
-    list_editable = ('price',)
-    search_fields = ('name', 'description', 'category__name')
-    readonly_fields = ('created_at', 'updated_at')
+    list_editable = ('price', 'stock')
+    search_fields = ('name', 'sku', 'description', 'category__name')
+    readonly_fields = ('image_variants', 'created_at', 'updated_at')
     list_per_page = 25
+    form = ProductAdminForm
 
     fieldsets = (
         (None, {
-            'fields': ('category', 'name', 'description')
+            'fields': ('category', 'name', 'sku', 'description')
         }),
         ('Pricing', {
             'fields': ('price',)
         }),
+        ('Inventory', {
+            'fields': ('stock',)
+        }),
         ('Media', {
-            'fields': ('image',)
+            'fields': ('image', 'image_variants')
         }),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
-    )
\ No newline at end of file
+    )
+
+    def get_changelist_form(self, request, **kwargs):
+        return super().get_changelist_form(request, form=ProductAdminForm, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        stock_changed = change and 'stock' in form.changed_data
+        if stock_changed:
+            # Saved as a difference below, not as the value in the form
+            obj.stock = form.initial['stock']
+        super().save_model(request, obj, form, change)
+        if stock_changed:
+            self.adjust_stock(request, obj, form.shown_stock(), form.cleaned_data['stock'])
+
+    def adjust_stock(self, request, obj, before, after):
+        """
+        Apply a stock edit as the difference from the value the form was
+        shown with, so units sold or released meanwhile are kept. Turning
+        tracking on or off sets the value, if nobody else did first.
+        """
+        products = Product.objects.filter(pk=obj.pk)
+        if before is None or after is None:
+            changed = products.filter(stock__isnull=before is None).update(stock=after)
+        else:
+            changed = products.filter(stock__gte=max(before - after, 0)).update(stock=F('stock') + after - before)
+        obj.refresh_from_db(fields=['stock'])
+        if not changed:
+            self.message_user(
+                request, f'The stock of "{obj}" changed meanwhile and is now {obj.stock}; it was left as is.',
+                messages.WARNING,
+            )
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+CATALOGUE_VERSION_KEY = 'products:catalogue:version'
+CATALOGUE_MODIFIED_KEY = 'products:catalogue:modified'
+
+
+def get_catalogue_version():
+    """
+    Return the current ``(version, last_modified)`` pair of the catalogue.
+
+    If the counter has been evicted it is re-seeded from the clock rather
+    than from 1, so entries cached under an older version are never reused.
+    """
+    values = cache.get_many([CATALOGUE_VERSION_KEY, CATALOGUE_MODIFIED_KEY])
+    if len(values) == 2:
+        return values[CATALOGUE_VERSION_KEY], values[CATALOGUE_MODIFIED_KEY]
+
+    now = int(time.time())
+    cache.add(CATALOGUE_VERSION_KEY, time.time_ns() // 1000, None)
+    cache.add(CATALOGUE_MODIFIED_KEY, now, None)
+    values = cache.get_many([CATALOGUE_VERSION_KEY, CATALOGUE_MODIFIED_KEY])
+    return values.get(CATALOGUE_VERSION_KEY, now), values.get(CATALOGUE_MODIFIED_KEY, now)
+
+
+def bump_catalogue_version():
+    """
+    Invalidate every cached catalogue response.
+    """
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, time.time_ns() // 1000, None)
+    cache.set(CATALOGUE_MODIFIED_KEY, int(time.time()), None)
+
+
+class CatalogueCacheMixin:
+    """
+    Read-through cache for the list and retrieve actions of catalogue
+    viewsets.
+
+    Serialized response data is cached under a key built from the
+    normalized query string and the catalogue version, which is bumped
+    whenever a Product or Category is saved or deleted. Responses carry
+    ETag and Last-Modified headers, and conditional requests are answered
+    with 304 before the database is touched.
+    """
+    cache_query_params = ('category', 'min_price', 'max_price', 'ordering', 'page', 'pagination', 'cursor')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def use_replica(self, request):
+        # Don't read, then cache, what a lagging replica has of a change
+        _, last_modified = get_catalogue_version()
+        return (
+            super().use_replica(request)
+            and time.time() - last_modified >= settings.DATABASE_REPLICA_LAG_SECONDS
+        )
+
+    def get_cache_key(self, request, version):
+        params = sorted(
+            (name, value)
+            for name in self.cache_query_params
+            for value in request.query_params.getlist(name)
+        )
+        # Pagination links are absolute, so the origin is part of the key
+        raw = '|'.join([
+            str(version),
+            self.basename,
+            self.action,
+            str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')),
+            request.build_absolute_uri('/'),
+            urlencode(params),
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, validators, response = self.get_cached_response(request)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(f'products:response:{key}', response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        return self.add_validators(response, validators)
+
+    def get_cached_response(self, request):
+        """
+        Return the cache key and validator headers for the request, with the
+        304 or cached response if there is one.
+        """
+        version, last_modified = get_catalogue_version()
+        key = self.get_cache_key(request, version)
+        validators = {'ETag': f'"{key}"', 'Last-Modified': http_date(last_modified)}
+
+        response = get_conditional_response(request, etag=validators['ETag'], last_modified=last_modified)
+        if response is None:
+            data = cache.get(f'products:response:{key}')
+            if data is not None:
+                response = Response(data)
+        return key, validators, response
+
+    def add_validators(self, response, validators):
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+
+class AsyncCatalogueCacheMixin:
+    """
+    CatalogueCacheMixin for async viewsets. Cached and 304 responses are
+    served without touching the database.
+    """
+
+    async def list(self, request, *args, **kwargs):
+        return await self.acached_response(self.alist, request, *args, **kwargs)
+
+    async def retrieve(self, request, *args, **kwargs):
+        return await self.acached_response(self.aretrieve, request, *args, **kwargs)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        key, validators, response = self.get_cached_response(request)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(f'products:response:{key}', response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        return self.add_validators(response, validators)
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection
+from PIL import Image, ImageOps
+
+from .cache import bump_catalogue_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'products/variants'
+FORMATS = {'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+           'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4})}
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+SRGB_TO_LINEAR = [
+    value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+    for value in (channel / 255 for channel in range(256))
+]
+
+
+def _base83(value, length):
+    return ''.join(BASE83[value // 83 ** (length - i - 1) % 83] for i in range(length))
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image, x_components=4, y_components=3):
+    """
+    Encode an image as a BlurHash (https://blurha.sh), a ~30 character
+    placeholder clients can render while the real image loads.
+    """
+    image = image.convert('RGB')
+    image.thumbnail((32, 32))
+    width, height = image.size
+    pixels = [tuple(SRGB_TO_LINEAR[channel] for channel in pixel) for pixel in image.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == j == 0 else 2
+            red = green = blue = 0.0
+            for y in range(height):
+                cos_y = math.cos(math.pi * j * y / height)
+                row = pixels[y * width:(y + 1) * width]
+                for x, (r, g, b) in enumerate(row):
+                    basis = normalisation * math.cos(math.pi * i * x / width) * cos_y
+                    red += basis * r
+                    green += basis * g
+                    blue += basis * b
+            scale = 1 / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = int(max(0, min(82, math.floor(max(abs(c) for f in ac for c in f) * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _base83(0, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            int(max(0, min(18, math.floor(math.copysign(abs(c / max_value) ** 0.5, c) * 9 + 9.5))))
+            for c in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def generate_variants(name):
+    """
+    Write the resized JPEG and WebP variants of the stored image ``name``
+    and return its ``image_variants`` value. Only touches storage, so it can
+    run in any thread or process.
+    """
+    with default_storage.open(name, 'rb') as source:
+        data = source.read()
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    image.load()
+    image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    # Names follow the source path and content, so an existing file already
+    # holds these variants. Files are never replaced: product snapshots keep
+    # referring to the variants of the image they were taken with
+    stem = f'{os.path.splitext(name)[0]}-{hashlib.sha256(data).hexdigest()[:12]}'
+    variants = {'source': name, 'width': image.width, 'height': image.height, 'placeholder': blurhash(image)}
+    for label, width in settings.PRODUCT_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        files = {'width': resized.width, 'height': resized.height}
+        for key, (pil_format, extension, options) in FORMATS.items():
+            path = f'{VARIANT_DIR}/{stem}-{label}.{extension}'
+            if not default_storage.exists(path):
+                output = resized.convert('RGB') if pil_format == 'JPEG' else resized
+                buffer = BytesIO()
+                output.save(buffer, pil_format, **options)
+                path = default_storage.save(path, ContentFile(buffer.getvalue()))
+            files[key] = path
+        variants[label] = files
+    return variants
+
+
+def save_variants(product_id, name, variants):
+    """
+    Store the variants unless the product's image has changed since they
+    were generated. Returns whether they were stored.
+    """
+    if not Product.objects.filter(pk=product_id, image=name).update(image_variants=variants):
+        return False
+    # update() sends no signals, so invalidate the cached catalogue here
+    bump_catalogue_version()
+    return True
+
+
+def process_product_image(product_id, name):
+    try:
+        save_variants(product_id, name, generate_variants(name))
+    except Exception:
+        logger.exception('Could not generate image variants of product %s (%s)', product_id, name)
+    finally:
+        if connection.vendor != 'sqlite' or not connection.is_in_memory_db():
+            close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.PRODUCT_IMAGE_WORKERS, thread_name_prefix='product-images')
+        return _executor
+
+
+def schedule_image_processing(product):
+    """
+    Generate the image variants of a product in the background worker pool,
+    or in the current thread when PRODUCT_IMAGE_WORKERS is 0.
+    """
+    if not settings.PRODUCT_IMAGE_WORKERS:
+        return process_product_image(product.pk, product.image.name)
+    return get_executor().submit(process_product_image, product.pk, product.image.name)
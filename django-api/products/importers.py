@@ -0,0 +1,271 @@
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import bump_catalogue_version
+from .models import Category, Product
+from .signals import products_imported
+
+FORMATS = ('csv', 'jsonl')
+
+# Fields written on insert and overwritten when the SKU already exists
+UPDATE_FIELDS = ['name', 'price', 'category', 'updated_at']
+
+# Overwritten only for rows that carry them; new products get the defaults
+OPTIONAL_FIELDS = {'description': '', 'stock': None}
+
+# Statuses of orders whose units were taken from stock at checkout but are
+# still on hand at the supplier
+HELD_STATUSES = ('pending', 'processing')
+
+
+class ProductImportError(Exception):
+    """
+    Raised when an import cannot be started, e.g. for an unknown format
+    """
+
+
+def detect_format(filename, content_type=''):
+    """
+    Guess the input format from a file name or content type.
+    """
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    raise ProductImportError('Cannot tell the format, use csv or jsonl')
+
+
+def text_lines(stream):
+    """
+    Decode a binary stream (e.g. an uploaded file) line by line, dropping a
+    UTF-8 byte order mark. Text streams are returned as they are.
+    """
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return (
+        line.decode('utf-8-sig' if index == 0 else 'utf-8', errors='replace')
+        for index, line in enumerate(stream)
+    )
+
+
+def read_rows(lines, fmt):
+    """
+    Yield ``(line_number, row)`` pairs from an iterable of text lines, one
+    row at a time.
+
+    CSV input needs a header with the sku, name, price and category columns
+    (description and stock are optional). JSONL input has one object with
+    the same keys per line. Existing products keep their description when
+    the row has no description key, and their stock when it has no stock
+    value.
+
+    The stock column is the supplier's on-hand count. Product.stock is what
+    is left for sale, so the units held by pending and processing orders
+    are taken off it, and put back if those orders are cancelled.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = exc
+            yield line_number, row
+
+
+def parse_row(row):
+    """
+    Validate one input row and return the cleaned values, or raise
+    ValueError with a message for the import report.
+    """
+    if isinstance(row, Exception):
+        raise ValueError(f'Invalid JSON: {row}')
+    if not isinstance(row, dict):
+        raise ValueError('Expected an object')
+
+    def text(key, max_length, required=True):
+        value = row.get(key)
+        value = '' if value is None else str(value).strip()
+        if required and not value:
+            raise ValueError(f'{key} is required')
+        if len(value) > max_length:
+            raise ValueError(f'{key} is longer than {max_length} characters')
+        return value
+
+    values = {
+        'sku': text('sku', 64),
+        'name': text('name', 200),
+        'category': text('category', 100),
+    }
+    if 'description' in row:
+        values['description'] = text('description', 100_000, required=False)
+
+    if row.get('price') in (None, ''):
+        raise ValueError('price is required')
+    try:
+        price = Decimal(str(row['price']).strip())
+    except InvalidOperation:
+        raise ValueError(f'price {row["price"]!r} is not a number')
+    if not price.is_finite() or price < 0 or price.as_tuple().exponent < -2 or price >= 10 ** 8:
+        raise ValueError(f'price {row["price"]!r} must be between 0 and 99999999.99 with at most 2 decimal places')
+    values['price'] = price
+
+    stock = row.get('stock')
+    if stock not in (None, ''):
+        try:
+            values['stock'] = int(stock)
+        except (TypeError, ValueError):
+            raise ValueError(f'stock {stock!r} is not a whole number')
+        if values['stock'] < 0:
+            raise ValueError('stock cannot be negative')
+    return values
+
+
+class ImportReport:
+    """
+    Running totals of an import
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self, max_errors=None):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': [{'line': line, 'error': error} for line, error in self.errors[:max_errors]],
+        }
+
+
+class ProductImporter:
+    """
+    Upserts products from an iterable of input rows in batches, keyed by SKU.
+
+    Categories are resolved through an in-memory name -> id map and created
+    as needed. Invalid rows are recorded in the report and skipped, and a
+    batch the database rejects only fails its own rows.
+    """
+
+    def __init__(self, batch_size=None, progress=None):
+        self.batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+        self.progress = progress
+        self.categories = {}
+        for pk, name in Category.objects.order_by('-pk').values_list('pk', 'name'):
+            # The oldest category wins when names are duplicated
+            self.categories[name] = pk
+
+    def run(self, rows):
+        report = ImportReport()
+        batch, lines = {}, []
+        for line_number, row in rows:
+            report.rows += 1
+            try:
+                values = parse_row(row)
+            except ValueError as exc:
+                report.errors.append((line_number, str(exc)))
+                continue
+            # A SKU repeated within a batch is upserted once, last row wins
+            batch.pop(values['sku'], None)
+            batch[values['sku']] = values
+            lines.append(line_number)
+            if len(batch) >= self.batch_size:
+                self.flush(batch, lines, report)
+                batch, lines = {}, []
+        if batch:
+            self.flush(batch, lines, report)
+
+        report.elapsed = time.perf_counter() - report.started
+        if report.imported:
+            transaction.on_commit(bump_catalogue_version)
+        return report
+
+    def flush(self, batch, lines, report):
+        missing = {values['category'] for values in batch.values()} - set(self.categories)
+        try:
+            with transaction.atomic():
+                if missing:
+                    created = Category.objects.bulk_create([Category(name=name) for name in sorted(missing)])
+                    self.categories.update((category.name, category.pk) for category in created)
+                # One upsert per set of optional fields the rows carry
+                groups = defaultdict(list)
+                for values in batch.values():
+                    groups[tuple(field for field in OPTIONAL_FIELDS if field in values)].append(values)
+                for provided, rows in groups.items():
+                    Product.objects.bulk_create(
+                        [
+                            Product(
+                                sku=values['sku'],
+                                name=values['name'],
+                                price=values['price'],
+                                category_id=self.categories[values['category']],
+                                **{field: values.get(field, default) for field, default in OPTIONAL_FIELDS.items()},
+                            )
+                            for values in rows
+                        ],
+                        update_conflicts=True,
+                        unique_fields=['sku'],
+                        update_fields=UPDATE_FIELDS + list(provided),
+                    )
+                self.deduct_held_units([sku for sku, values in batch.items() if 'stock' in values])
+                products_imported.send(sender=Product, skus=list(batch))
+        except DatabaseError as exc:
+            # Categories created for the failed batch were rolled back too
+            for name in missing:
+                self.categories.pop(name, None)
+            report.errors.extend((line_number, f'Database error: {exc}') for line_number in lines)
+        else:
+            report.imported += len(lines)
+        report.elapsed = time.perf_counter() - report.started
+        if self.progress:
+            self.progress(report)
+
+    def deduct_held_units(self, skus):
+        """
+        Take the units of open orders off the on-hand counts just stored.
+        """
+        if not skus:
+            return
+        held = Subquery(
+            Product.objects.filter(pk=OuterRef('pk'))
+            .annotate(units=Sum('orderitem__quantity', filter=Q(orderitem__order__status__in=HELD_STATUSES)))
+            .values('units')
+        )
+        Product.objects.filter(sku__in=skus, stock__isnull=False).update(
+            stock=Greatest(F('stock') - Coalesce(held, 0), Value(0))
+        )
+
+
+def import_products(stream, fmt, batch_size=None, progress=None):
+    """
+    Import products from a text or binary stream in ``fmt`` ('csv' or
+    'jsonl') and return the ImportReport.
+    """
+    if fmt not in FORMATS:
+        raise ProductImportError(f'Unknown format {fmt!r}, use csv or jsonl')
+    return ProductImporter(batch_size, progress).run(read_rows(text_lines(stream), fmt))
@@ -0,0 +1,80 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, RequestFactory
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+
+from products.models import Category, Product
+from products.pagination import ProductCursorPagination
+from products.views import ProductViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare page-number and cursor pagination of /api/products/ at increasing '
+        'depths. Benchmark data is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--ordering', default='price', choices=['price', '-price', 'name', '-name'])
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['products'])
+            self.run(options['products'], options['ordering'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, total):
+        category = Category.objects.create(name='Benchmark')
+        batch = []
+        for i in range(total):
+            batch.append(Product(
+                name=f'Benchmark product {i % 1000:04d}',
+                description='Benchmark product',
+                price=Decimal(i % 500) + Decimal('0.99'),
+                category=category,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+    def run(self, total, ordering, repeat):
+        client = Client()
+        paginator = ProductCursorPagination()
+        request = Request(RequestFactory().get('/', {'ordering': ordering}))
+        paginator.ordering = paginator.get_ordering(request, None, ProductViewSet)
+        page_size = paginator.page_size
+        last_page = total // page_size
+
+        self.stdout.write(f'{total} products, ordering={ordering}, page_size={page_size}')
+        self.stdout.write(f'{"page":>8} {"page-number ms":>16} {"cursor ms":>12}')
+        for page in (1, 10, 100, last_page // 2, last_page):
+            offset = (page - 1) * page_size
+            page_url = f'/api/products/?ordering={ordering}&page={page}'
+
+            cursor_url = f'/api/products/?pagination=cursor&ordering={ordering}'
+            if offset:
+                row = Product.objects.order_by(*paginator.ordering)[offset - 1]
+                position = paginator._get_position_from_instance(row, paginator.ordering)
+                token = paginator.encode_token(Cursor(offset=0, reverse=False, position=position))
+                cursor_url += f'&cursor={token}'
+
+            self.stdout.write(
+                f'{page:>8} {self.time(client, page_url, repeat):>16.2f} '
+                f'{self.time(client, cursor_url, repeat):>12.2f}'
+            )
+
+    def time(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.content
+        return min(timings)
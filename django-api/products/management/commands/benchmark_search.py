@@ -0,0 +1,82 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from products.models import Category, Product
+from products.search import search_available, search_products
+
+WORDS = (
+    'oak walnut steel linen leather ceramic bamboo glass cotton velvet chair table '
+    'couch lamp shelf desk stool mirror rug vase kettle pan knife spoon bowl plate '
+    'earphones speaker charger cable blender toaster grinder modern rustic compact'
+).split()
+# Filler vocabulary so term frequencies resemble real product copy
+SYLLABLES = 'ka lo mi ne ru sa ti vo be da fe gi ho ju ly'.split()
+FILLER = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare full-text search with LIKE scans over a synthetic catalogue. '
+        'Benchmark data is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The full-text search index is only available on SQLite.')
+
+        with transaction.atomic():
+            self.seed(options['products'])
+            self.run(options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, total):
+        rng = random.Random(0)
+        categories = [Category.objects.create(name=name) for name in ('Furniture', 'Kitchen', 'Electronics')]
+        batch = []
+        for i in range(total):
+            batch.append(Product(
+                name=' '.join(rng.sample(WORDS, 2) + rng.sample(FILLER, 1)).title(),
+                description=' '.join(rng.choices(WORDS, k=2) + rng.choices(FILLER, k=30)),
+                price=Decimal(rng.randint(1, 500)),
+                category=categories[i % 3],
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {total} products')
+
+    def run(self, repeat):
+        self.stdout.write(f'{"query":<20} {"LIKE ms":>10} {"FTS5 ms":>10}')
+        for query in ('walnut', 'oak cha', 'kitchen kettle', 'velvet stool modern'):
+            self.stdout.write(
+                f'{query:<20} {self.time(lambda: self.like(query), repeat):>10.1f} '
+                f'{self.time(lambda: search_products(query, limit=10), repeat):>10.1f}'
+            )
+
+    def like(self, query):
+        condition = Q()
+        for term in query.split():
+            condition &= (
+                Q(name__icontains=term) | Q(description__icontains=term) | Q(category__name__icontains=term)
+            )
+        queryset = Product.objects.filter(condition).select_related('category')
+        # A relevance order needs every match, so LIKE has to scan the whole table
+        return queryset.count(), list(queryset.order_by('name')[:10])
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
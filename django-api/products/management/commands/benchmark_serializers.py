@@ -0,0 +1,85 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from orders.models import Order, OrderItem
+from orders.serializers import OrderReadSerializer, OrderSerializer
+from products.models import Category, Product
+from products.serializers import ProductReadSerializer, ProductSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the DRF serializers with the fast read serializers on product and '
+        'order payloads, checking that both render the same JSON. Benchmark data is '
+        'created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--orders', type=int, default=1_000)
+        parser.add_argument('--items', type=int, default=20, help='Items per order.')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['products'], options['orders'], options['items'])
+
+            # Rows are loaded once, so only serialization and rendering are timed
+            products = list(Product.objects.select_related('category').order_by('id'))
+            orders = list(Order.objects.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+            ).order_by('id'))
+            context = {'request': APIRequestFactory().get('/api/')}
+
+            self.stdout.write(f'{"payload":>24} {"DRF ms":>10} {"fast ms":>10} {"speedup":>8}')
+            for label, rows, serializer, fast_serializer in (
+                (f'{len(products)} products', products, ProductSerializer, ProductReadSerializer),
+                (f'{len(orders)} orders x {options["items"]}', orders, OrderSerializer, OrderReadSerializer),
+            ):
+                expected, drf_ms = self.time(serializer, rows, context, options['repeat'])
+                actual, fast_ms = self.time(fast_serializer, rows, context, options['repeat'])
+                if actual != expected:
+                    raise AssertionError(f'{fast_serializer.__name__} output differs from {serializer.__name__}')
+                self.stdout.write(f'{label:>24} {drf_ms:>10.1f} {fast_ms:>10.1f} {drf_ms / fast_ms:>7.1f}x')
+            transaction.set_rollback(True)
+
+    def seed(self, total_products, total_orders, items_per_order):
+        user = User.objects.create_user(email='benchmark-serializers@example.com', password=None)
+        categories = Category.objects.bulk_create([Category(name=f'Benchmark {i}') for i in range(20)])
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark product {i}',
+                description='Benchmark product description',
+                price=Decimal(i % 500) + Decimal('0.99'),
+                category=categories[i % len(categories)],
+                image=f'products/benchmark-{i}.jpg' if i % 3 else '',
+            )
+            for i in range(total_products)
+        ], batch_size=5000)
+
+        orders = Order.objects.bulk_create([
+            Order(user=user, total_amount=Decimal('99.99'), status='delivered') for _ in range(total_orders)
+        ], batch_size=5000)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(i * items_per_order + j) % len(products)],
+                      quantity=j + 1, price=Decimal('4.99'))
+            for i, order in enumerate(orders)
+            for j in range(items_per_order)
+        ], batch_size=5000)
+
+    def time(self, serializer_class, rows, context, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = JSONRenderer().render(serializer_class(rows, many=True, context=context).data)
+            timings.append((time.perf_counter() - start) * 1000)
+        return content, min(timings)
@@ -0,0 +1,185 @@
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.tokens import add_user_claims
+from products.models import Product
+
+User = get_user_model()
+
+# Server command line and extra environment of each mode
+MODES = {
+    'gunicorn-sync': (['config.wsgi'], {}),
+    'gunicorn-uvicorn': (['config.asgi', '-k', 'uvicorn_worker.UvicornWorker'], {}),
+    'async-views': (['config.asgi', '-k', 'uvicorn_worker.UvicornWorker'], {'DJANGO_ASYNC_READ_VIEWS': '1'}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the hot read endpoints (product list and detail, categories, cart '
+        'summary, /api/auth/me/) under gunicorn with sync workers, gunicorn with uvicorn '
+        'workers, and uvicorn workers with the async views, reporting requests/s and '
+        'latency percentiles. Uses the configured database, which needs at least one '
+        'product; a load-test user is created if needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help=f'Comma-separated server modes to run ({", ".join(MODES)}).')
+        parser.add_argument('--url', help='Load-test an already running server instead of starting them.')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per mode.')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        product_id = Product.objects.order_by('pk').values_list('pk', flat=True).first()
+        if product_id is None:
+            raise CommandError('The catalogue is empty, import some products first.')
+        user = (User.objects.filter(email='loadtest@example.com').first()
+                or User.objects.create_user(email='loadtest@example.com', password=None))
+        token = str(add_user_claims(AccessToken.for_user(user), user))
+
+        authorized = {'Authorization': f'Bearer {token}'}
+        endpoints = [
+            ('/api/products/', {}),
+            (f'/api/products/{product_id}/', {}),
+            ('/api/products/categories/', {}),
+            ('/api/cart/summary/', authorized),
+            ('/api/auth/me/', authorized),
+        ]
+
+        if options['url']:
+            results = {'external': self.run_load(options['url'], endpoints, options)}
+        else:
+            modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+            unknown = set(modes) - set(MODES)
+            if unknown:
+                raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+            for module in ['gunicorn'] + (['uvicorn_worker'] if set(modes) - {'gunicorn-sync'} else []):
+                if importlib.util.find_spec(module) is None:
+                    raise CommandError(f'{module} is not installed')
+            results = {}
+            for mode in modes:
+                with self.server(mode, options):
+                    results[mode] = self.run_load(f'http://127.0.0.1:{options["port"]}', endpoints, options)
+
+        self.report(results, endpoints)
+
+    def server(self, mode, options):
+        args, env = MODES[mode]
+        command = [
+            sys.executable, '-m', 'gunicorn', *args,
+            '--bind', f'127.0.0.1:{options["port"]}',
+            '--workers', str(options['workers']),
+            '--log-level', 'warning',
+        ]
+        return _Server(command, {**os.environ, **env}, options['port'])
+
+    def run_load(self, base_url, endpoints, options):
+        """
+        Send requests from ``concurrency`` keep-alive connections for
+        ``duration`` seconds, cycling through the endpoints.
+        """
+        url = urlsplit(base_url)
+        deadline = time.perf_counter() + options['duration']
+        samples = [[] for _ in endpoints]
+        errors = []
+        lock = threading.Lock()
+
+        def client(offset):
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            latencies = [[] for _ in endpoints]
+            failures = 0
+            index = offset
+            while time.perf_counter() < deadline:
+                path, headers = endpoints[index % len(endpoints)]
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', url.path.rstrip('/') + path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                if ok:
+                    latencies[index % len(endpoints)].append(time.perf_counter() - start)
+                else:
+                    failures += 1
+                index += 1
+            connection.close()
+            with lock:
+                for all_samples, own in zip(samples, latencies):
+                    all_samples.extend(own)
+                errors.append(failures)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, sum(errors), time.perf_counter() - started
+
+    def report(self, results, endpoints):
+        def percentile(values, fraction):
+            return statistics.quantiles(values, n=100)[int(fraction * 100) - 1] * 1000 if len(values) > 1 else 0.0
+
+        self.stdout.write(f'{"mode":<18} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for mode, (samples, errors, elapsed) in results.items():
+            latencies = [value for values in samples for value in values]
+            self.stdout.write(
+                f'{mode:<18} {len(latencies) / elapsed:>9.0f} {percentile(latencies, 0.5):>8.1f} '
+                f'{percentile(latencies, 0.99):>8.1f} {errors:>7}'
+            )
+
+        self.stdout.write('\np99 ms per endpoint')
+        self.stdout.write(f'{"endpoint":<28}' + ''.join(f'{mode:>18}' for mode in results))
+        for index, (path, _) in enumerate(endpoints):
+            row = ''.join(f'{percentile(samples[index], 0.99):>18.1f}' for samples, _, _ in results.values())
+            self.stdout.write(f'{path:<28}{row}')
+
+
+class _Server:
+    """
+    Runs a server process for the duration of a with block
+    """
+
+    def __init__(self, command, env, port):
+        self.command, self.env, self.port = command, env, port
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env, cwd=settings.BASE_DIR)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f'{" ".join(self.command)} exited with status {self.process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError('The server did not start within 30 seconds')
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
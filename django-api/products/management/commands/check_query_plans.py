@@ -0,0 +1,107 @@
+import re
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from cart.models import CartItem
+from orders.models import Order, OrderItem
+from orders.services import attach_snapshots
+from products.models import Category, Product
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the main API endpoints, run EXPLAIN QUERY PLAN over every SELECT '
+        'they issue and fail if any of them falls back to a full table scan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--allow-scan', action='append', default=['products_category'],
+            help='Table that may be scanned in full (default: products_category).',
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN is only supported on SQLite.')
+
+        failures = []
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with transaction.atomic(), override_settings(CACHES=dummy_cache):
+            for url, sql in self.capture_queries():
+                for detail in self.explain(sql):
+                    if options['verbose_plans']:
+                        self.stdout.write(f'{url}: {detail}')
+                    match = FULL_SCAN.match(detail)
+                    if match and match.group(1) not in options['allow_scan']:
+                        failures.append((url, detail, sql))
+            transaction.set_rollback(True)
+
+        for url, detail, sql in failures:
+            self.stderr.write(f'{url}: {detail}\n    {sql}')
+        if failures:
+            raise CommandError(f'{len(failures)} quer{"y" if len(failures) == 1 else "ies"} use a full table scan.')
+        self.stdout.write(self.style.SUCCESS('No full table scans found.'))
+
+    def capture_queries(self):
+        """
+        Yield ``(url, sql)`` for every SELECT issued by the main API endpoints.
+        """
+        user = User.objects.create_user(email='query-plans@example.com', password=None)
+        category = Category.objects.create(name='Query plans')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='', price=Decimal(i), category=category)
+            for i in range(1, 21)
+        ])
+        CartItem.objects.bulk_create([CartItem(user=user, product=product) for product in products[:3]])
+        order = Order.objects.create(user=user, total_amount=Decimal('3'))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, price=product.price) for product in products[:3]
+        ])
+        # Lines sell snapshots, as checkout makes them
+        attach_snapshots(order.items.all())
+
+        client = APIClient()
+        client.force_authenticate(user)
+        urls = [
+            f'/api/products/?ordering={ordering}'
+            for ordering in ('price', '-price', 'name', '-name')
+        ] + [
+            f'/api/products/?category={category.pk}&ordering=price',
+            f'/api/products/?category={category.pk}&ordering=-name',
+            '/api/products/?min_price=5&max_price=10&ordering=price',
+            '/api/products/?pagination=cursor&ordering=-price&max_price=15',
+            f'/api/products/{products[0].pk}/',
+            '/api/products/categories/',
+            '/api/cart/',
+            '/api/cart/summary/',
+            '/api/cart/summary/?fields=totals',
+            '/api/orders/',
+            f'/api/orders/{order.pk}/',
+        ]
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            next_url = response.data.get('next') if isinstance(response.data, dict) else None
+            for query in queries:
+                if query['sql'].startswith('SELECT'):
+                    yield url, query['sql']
+            if next_url and 'cursor=' in next_url and 'cursor=' not in url:
+                urls.append(next_url.replace('http://testserver', ''))
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import FORMATS, ProductImportError, detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Import products from a CSV or JSONL file, creating missing categories and '
+        'updating products whose SKU already exists. Invalid rows are reported and '
+        'skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - to read standard input.")
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, help='Products per upsert (default: PRODUCT_IMPORT_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ProductImportError as exc:
+            raise CommandError(f'{exc} (pass --format)')
+
+        def progress(report):
+            self.stdout.write(f'{report.rows} rows, {report.rows_per_second:.0f} rows/s')
+
+        try:
+            if path == '-':
+                report = import_products(sys.stdin, fmt, options['batch_size'], progress)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = import_products(stream, fmt, options['batch_size'], progress)
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for line, error in report.errors:
+            self.stderr.write(f'line {line}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.imported} of {report.rows} rows in {report.elapsed:.1f}s '
+            f'({report.rows_per_second:.0f} rows/s), {len(report.errors)} failed.'
+        ))
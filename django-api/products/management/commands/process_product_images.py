@@ -0,0 +1,73 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.images import generate_variants, save_variants
+from products.models import Product
+
+
+def _init_worker():
+    # Processes started with spawn (the default outside Linux) import nothing
+    # from the parent, so Django is configured again in each of them
+    django.setup()
+
+
+def _generate(job):
+    product_id, name = job
+    try:
+        return product_id, name, generate_variants(name), None
+    except Exception as exc:
+        return product_id, name, None, f'{type(exc).__name__}: {exc}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the resized variants and placeholders of existing product images, '
+        'spreading the image work over one process per CPU core.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes (default: one per CPU core, 0 to run inline).')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that are already up to date.')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        jobs = [
+            (pk, name)
+            for pk, name, variants in products.values_list('pk', 'image', 'image_variants')
+            if options['force'] or not variants or variants.get('source') != name
+        ]
+        if not jobs:
+            self.stdout.write('All product images are up to date.')
+            return
+
+        self.stdout.write(f'Processing {len(jobs)} images with {options["workers"]} workers')
+        start = time.perf_counter()
+        if options['workers'] > 0:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers'], initializer=_init_worker) as executor:
+                processed, failed = self.save(executor.map(_generate, jobs, chunksize=4))
+        else:
+            processed, failed = self.save(map(_generate, jobs))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} images in {elapsed:.1f}s ({processed / elapsed:.1f} images/s), {failed} failed.'
+        ))
+
+    def save(self, results):
+        processed = failed = 0
+        for product_id, name, variants, error in results:
+            if error:
+                failed += 1
+                self.stderr.write(f'Product {product_id} ({name}): {error}')
+            elif save_variants(product_id, name, variants):
+                processed += 1
+        return processed, failed
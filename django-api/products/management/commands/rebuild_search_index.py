@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index from the product table.'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The full-text search index is only available on SQLite.')
+
+        start = time.perf_counter()
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} products in {time.perf_counter() - start:.2f}s.'
+        ))
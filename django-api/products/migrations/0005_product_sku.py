@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_index = import_module('products.migrations.0003_product_search_index')
+
+# Adding a unique column makes SQLite rebuild products_product, which the
+# search index triggers get in the way of, so they are recreated around it
+TRIGGER_NAMES = ['insert', 'update', 'delete', 'category_update']
+DROP_TRIGGERS_SQL = [f'DROP TRIGGER IF EXISTS {search_index.FTS_TABLE}_{name}' for name in TRIGGER_NAMES]
+CREATE_TRIGGERS_SQL = [sql for sql in search_index.CREATE_SQL if 'CREATE TRIGGER' in sql]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            search_index.run_sqlite(DROP_TRIGGERS_SQL), search_index.run_sqlite(CREATE_TRIGGERS_SQL)
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Supplier stock keeping unit. Imports update the product with a matching SKU.', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(
+            search_index.run_sqlite(CREATE_TRIGGERS_SQL), search_index.run_sqlite(DROP_TRIGGERS_SQL)
+        ),
+    ]
@@ -1,3 +1,8 @@
+import hashlib
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class Category(models.Model):
@@ -16,13 +21,131 @@ class Product(models.Model):
     """
     Product model
     """
+    sku = models.CharField(
+        max_length=64, unique=True, null=True, blank=True,
+        help_text='Supplier stock keeping unit. Imports update the product with a matching SKU.'
+    )
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    image_variants = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text='Resized copies of the image and its placeholder, filled in by products.images.'
+    )
+    stock = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text='Units available for sale. Leave empty to not track inventory.'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Compared with on save, see below. Deferred stock isn't saved anyway
+        if 'stock' in instance.__dict__:
+            instance._loaded_stock = instance.stock
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if 'stock' in self.__dict__ and (fields is None or 'stock' in fields):
+            self._loaded_stock = self.stock
+
+    def save(self, *args, **kwargs):
+        # Stock only changes through conditional F() updates (checkout,
+        # reservations, admin adjustments); writing back the value read
+        # earlier would undo the ones made since. So saves of a loaded
+        # product leave it out, and refuse to drop a change to it: pass
+        # update_fields with 'stock' to overwrite it.
+        if (
+            hasattr(self, '_loaded_stock')
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            if self.stock != self._loaded_stock:
+                raise ValueError(
+                    f'Stock of {self!r} changed from {self._loaded_stock} to {self.stock}; '
+                    f'adjust it with an F() update, or save with update_fields including "stock"'
+                )
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stock'
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if 'stock' in self.__dict__ and (update_fields is None or 'stock' in update_fields):
+            self._loaded_stock = self.stock
+
+    class Meta:
+        indexes = [
+            # Category filter combined with each ordering option
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'name'], name='product_category_name_idx'),
+            # Price range filter and keyset pagination (id breaks ties)
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ]
+
+class ProductSnapshot(models.Model):
+    """
+    Immutable copy of a product as it was sold, shared by every order line
+    that bought the same version. Rows are content-addressed by ``digest``
+    and are kept when the product or its category is deleted.
+    """
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    product = models.ForeignKey(
+        Product, related_name='snapshots', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    sku = models.CharField(max_length=64, null=True, blank=True)
+    name = models.CharField(max_length=200)
+    description = models.TextField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.ForeignKey(
+        Category, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    category_name = models.CharField(max_length=100)
+    image = models.ImageField(upload_to='products/', null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True)
+    product_created_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Fields that make up a version, in digest order
+    VERSION_FIELDS = (
+        'product_id', 'sku', 'name', 'description', 'price', 'category_id', 'category_name',
+        'image', 'image_variants', 'product_created_at',
+    )
+
+    def __str__(self):
+        return f"{self.name} ({self.digest[:12]})"
+
+    @classmethod
+    def from_product(cls, product):
+        """
+        An unsaved snapshot of ``product``, which must have its category
+        loaded, with its digest computed.
+        """
+        snapshot = cls(
+            product_id=product.pk,
+            sku=product.sku,
+            name=product.name,
+            description=product.description,
+            price=product.price,
+            category_id=product.category_id,
+            category_name=product.category.name,
+            image=product.image.name or None,
+            image_variants=product.image_variants,
+            product_created_at=product.created_at,
+        )
+        version = [getattr(snapshot, field) for field in cls.VERSION_FIELDS]
+        version[cls.VERSION_FIELDS.index('image')] = snapshot.image.name or None
+        version[cls.VERSION_FIELDS.index('price')] = f'{Decimal(product.price):.2f}'
+        snapshot.digest = hashlib.sha256(
+            json.dumps(version, cls=DjangoJSONEncoder, sort_keys=True).encode()
+        ).hexdigest()
+        return snapshot
@@ -0,0 +1,153 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+from rest_framework.utils.urls import replace_query_param
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the product catalogue.
+
+    Pages are fetched with ``WHERE (field, id) > (last_field, last_id)``
+    instead of ``OFFSET n``, so page 500 costs the same as page 1 and no
+    ``COUNT(*)`` is issued. Supports the same ``?ordering=`` values as the
+    view, always using the primary key as a tie-breaker.
+    """
+    ordering = 'id'
+    ordering_param = 'ordering'
+
+    def get_ordering(self, request, queryset, view):
+        field = request.query_params.get(self.ordering_param, '')
+        allowed = getattr(view, 'ordering_fields', None) or []
+        if field.lstrip('-') not in allowed:
+            field = self.ordering
+
+        if field.lstrip('-') == 'id':
+            return (field,)
+        return (field, '-id' if field.startswith('-') else 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the (unevaluated) queryset of the requested page, or None if
+        pagination is turned off.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.reverse)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(o[1:] if o.startswith('-') else '-' + o for o in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(self._position_filter(ordering, self.cursor.position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether there is a following page
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def _position_filter(self, ordering, position):
+        """
+        Build the keyset predicate for the rows strictly after ``position``
+        in the given ordering.
+        """
+        lookups = [
+            (o.lstrip('-'), 'lt' if o.startswith('-') else 'gt', value)
+            for o, value in zip(ordering, position)
+        ]
+        condition = Q()
+        equal = {}
+        for field, lookup, value in lookups:
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            field = field.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            position.append(value if isinstance(value, int) else str(value))
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position = tokens['p']
+            reverse = bool(tokens.get('r', False))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was issued for
+        if tokens.get('o') != list(self.ordering) or not isinstance(position, list) \
+                or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_token(self, cursor):
+        """
+        Return the opaque cursor token for ``cursor`` under the current ordering.
+        """
+        tokens = {'o': list(self.ordering), 'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+        return urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode()).decode('ascii')
+
+    def encode_cursor(self, cursor):
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_token(cursor))
@@ -0,0 +1,101 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Product
+
+FTS_TABLE = 'products_product_fts'
+
+# bm25() column weights for name, description and category
+RANK_WEIGHTS = (10.0, 1.0, 4.0)
+
+# Control characters mark matches in SQLite's output so the text can be
+# HTML-escaped before the markers are turned into <mark> tags
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 query where every word must match as a prefix.
+    """
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _highlight(text):
+    return escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_products(query, limit, offset=0):
+    """
+    Return ``(products, highlights)`` for the best BM25 matches of ``query``.
+
+    ``highlights`` maps product ids to a dict with the relevance ``rank``,
+    the HTML-highlighted ``name`` and a ``snippet`` of the description.
+    """
+    match = build_match_query(query)
+    if not match:
+        return [], {}
+
+    if not search_available():
+        condition = Q()
+        for term in re.findall(r'\w+', query):
+            condition &= (
+                Q(name__icontains=term) | Q(description__icontains=term) | Q(category__name__icontains=term)
+            )
+        products = list(Product.objects.filter(condition).select_related('category')
+                        .order_by('name', 'id')[offset:offset + limit])
+        return products, {p.pk: {'rank': 0.0, 'name': escape(p.name), 'snippet': ''} for p in products}
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid,
+                   bm25({FTS_TABLE}, {weights}) AS score,
+                   highlight({FTS_TABLE}, 0, %s, %s),
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', 16)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY score
+            LIMIT %s OFFSET %s
+            """,
+            [_MARK_START, _MARK_END, _MARK_START, _MARK_END, match, limit, offset],
+        )
+        rows = cursor.fetchall()
+
+    highlights = {
+        pk: {'rank': -score, 'name': _highlight(name), 'snippet': _highlight(snippet)}
+        for pk, score, name, snippet in rows
+    }
+    in_bulk = Product.objects.select_related('category').in_bulk(list(highlights))
+    products = [in_bulk[pk] for pk, *_ in rows if pk in in_bulk]
+    return products, highlights
+
+
+@transaction.atomic
+def rebuild_index():
+    """
+    Repopulate the search index from the product table in bulk.
+
+    Returns the number of indexed products.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+            SELECT p.id, p.name, p.description, c.name
+            FROM products_product p JOIN products_category c ON c.id = p.category_id
+            """
+        )
+        count = cursor.rowcount
+        # Merge the index b-trees so queries touch as few pages as possible
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')")
+    return count
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Product, Category
+
+from config.serializers import FastReadMixin
+from .models import Category, Product, ProductSnapshot
 
 class CategorySerializer(serializers.ModelSerializer):
     """
@@ -9,12 +11,81 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name']
 
+class ImageVariantsField(serializers.Field):
+    """
+    URLs of the resized copies of a product image, or null until they have
+    been generated for the current image
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, product):
+        variants = product.image_variants
+        if not variants or not product.image or variants.get('source') != product.image.name:
+            return None
+
+        storage = product.image.storage
+        request = self.context.get('request')
+
+        def url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        ret = {'width': variants['width'], 'height': variants['height'], 'placeholder': variants['placeholder']}
+        for label, files in variants.items():
+            if isinstance(files, dict):
+                ret[label] = {
+                    'width': files['width'],
+                    'height': files['height'],
+                    'jpeg': url(files['jpeg']),
+                    'webp': url(files['webp']),
+                }
+        return ret
+
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for Product model
     """
     category_name = serializers.ReadOnlyField(source='category.name')
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'image', 'created_at']
+        fields = [
+            'id', 'sku', 'name', 'description', 'price', 'category', 'category_name',
+            'image', 'image_variants', 'created_at',
+        ]
+
+    def validate_sku(self, value):
+        # Store products without a SKU as NULL, which the unique constraint allows many of
+        return value or None
+
+class ProductReadSerializer(FastReadMixin, ProductSerializer):
+    """
+    Read-only fast path producing the same output as ProductSerializer
+    """
+
+class ProductSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Serializer for ProductSnapshot, with the same output as ProductSerializer
+    gave for the product when the snapshot was taken
+    """
+    id = serializers.ReadOnlyField(source='product_id')
+    category = serializers.ReadOnlyField(source='category_id')
+    image_variants = ImageVariantsField()
+    created_at = serializers.DateTimeField(source='product_created_at', read_only=True)
+
+    class Meta:
+        model = ProductSnapshot
+        fields = [
+            'id', 'sku', 'name', 'description', 'price', 'category', 'category_name',
+            'image', 'image_variants', 'created_at',
+        ]
+
+class ProductSnapshotReadSerializer(FastReadMixin, ProductSnapshotSerializer):
+    """
+    Read-only fast path producing the same output as ProductSnapshotSerializer
+    """
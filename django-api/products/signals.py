@@ -0,0 +1,40 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .cache import bump_catalogue_version
+from .images import schedule_image_processing
+from .models import Category, Product
+
+# Sent for every batch of products upserted by an import, with the batch's
+# ``skus``. bulk_create() does not send post_save.
+products_imported = Signal()
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalogue_cache(sender, **kwargs):
+    """
+    Bump the catalogue version once the change is committed, so readers
+    never cache pre-commit data under the new version.
+    """
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=Product)
+def process_product_image(sender, instance, raw=False, **kwargs):
+    """
+    Generate the image variants once a new image is committed, or drop the
+    variants of a removed image.
+    """
+    if raw:
+        return
+    variants = instance.image_variants or {}
+    if not instance.image:
+        if variants:
+            Product.objects.filter(pk=instance.pk).update(image_variants=None)
+            instance.image_variants = None
+    elif variants.get('source') != instance.image.name:
+        transaction.on_commit(partial(schedule_image_processing, instance))
@@ -0,0 +1,25 @@
+from .models import ProductSnapshot
+
+
+def snapshot_products(products):
+    """
+    Return ``{product_id: snapshot_id}`` for the current version of the
+    given products (a queryset), creating the snapshots that don't exist
+    yet. Two queries when every version is already snapshotted, four at
+    most, however many products.
+    """
+    snapshots = {
+        snapshot.digest: snapshot
+        for snapshot in map(ProductSnapshot.from_product, products.select_related('category'))
+    }
+    if not snapshots:
+        return {}
+    ids = dict(ProductSnapshot.objects.filter(digest__in=snapshots).values_list('digest', 'id'))
+    missing = [snapshot for digest, snapshot in snapshots.items() if digest not in ids]
+    if missing:
+        ProductSnapshot.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(
+            ProductSnapshot.objects.filter(digest__in=[snapshot.digest for snapshot in missing])
+            .values_list('digest', 'id')
+        )
+    return {snapshot.product_id: ids[digest] for digest, snapshot in snapshots.items()}
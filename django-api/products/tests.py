@@ -1,3 +1,721 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cart.models import Cart, CartItem
+from orders.services import checkout_cart, release_expired_reservations
+from config.async_views import async_reads
+from config.routers import read_from_replicas
+from .cache import CATALOGUE_MODIFIED_KEY, get_catalogue_version
+from .images import BASE83, blurhash, generate_variants
+from .models import Category, Product
+from .serializers import ProductReadSerializer, ProductSerializer
+from .urls import router
+from .views import AsyncCategoryViewSet, AsyncProductViewSet, CategoryViewSet, ProductViewSet
+
+
+class ProductCursorPaginationTests(TestCase):
+    """
+    Tests for the opt-in keyset pagination mode of the product list
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Furniture')
+        # Plenty of duplicate prices and names so the id tie-breaker matters
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i % 7}',
+                description='Description',
+                price=Decimal(10 + i % 5),
+                category=cls.category,
+            )
+            for i in range(37)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_product_once_in_order(self):
+        for ordering, key, reverse in [
+            ('price', lambda p: (p.price, p.id), False),
+            ('-price', lambda p: (p.price, p.id), True),
+            ('name', lambda p: (p.name, p.id), False),
+            ('-name', lambda p: (p.name, p.id), True),
+        ]:
+            with self.subTest(ordering=ordering):
+                ids = self.walk(f'/api/products/?pagination=cursor&ordering={ordering}')
+                expected = sorted(Product.objects.all(), key=key, reverse=reverse)
+                self.assertEqual(ids, [p.id for p in expected])
+
+    def test_respects_price_filters(self):
+        ids = self.walk('/api/products/?pagination=cursor&ordering=price&min_price=11&max_price=12')
+        expected = Product.objects.filter(price__gte=11, price__lte=12).order_by('price', 'id')
+        self.assertEqual(ids, [p.id for p in expected])
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/products/?pagination=cursor&ordering=-price')
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_page_fetch_uses_single_query(self):
+        first = self.client.get('/api/products/?pagination=cursor&ordering=price')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        first = self.client.get('/api/products/?pagination=cursor&ordering=name')
+        url = first.data['next'].replace('ordering=name', 'ordering=price')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get('/api/products/?page=2')
+        self.assertEqual(response.data['count'], 37)
+
+
+class CatalogueCacheTests(TestCase):
+    """
+    Tests for the versioned product response cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Kitchen')
+        cls.product = Product.objects.create(
+            name='Pan set', description='Non-stick', price=Decimal('49.99'), category=cls.category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get('/api/products/?ordering=price&category=%d' % self.category.pk)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/?category=%d&ordering=price' % self.category.pk)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_conditional_get_returns_not_modified_without_queries(self):
+        url = f'/api/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        last_modified = self.client.get(url)['Last-Modified']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_save_invalidates_cache(self):
+        url = f'/api/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('39.99')
+            self.product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['price'], '39.99')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_category_delete_invalidates_list(self):
+        self.assertEqual(self.client.get('/api/products/').data['count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertEqual(self.client.get('/api/products/').data['count'], 0)
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }
+        }):
+            url = f'/api/products/{self.product.pk}/'
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Guards the catalogue, cart and order queries against full table scans
+    """
+
+    def test_main_api_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out, stderr=StringIO())
+        self.assertIn('No full table scans found.', out.getvalue())
+
+
+class ProductSearchTests(TestCase):
+    """
+    Tests for the full-text product search endpoint
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.furniture = Category.objects.create(name='Furniture')
+        cls.kitchen = Category.objects.create(name='Kitchen')
+        cls.chair = Product.objects.create(
+            name='Oak chair', description='A sturdy <b>oak</b> dining chair', price=Decimal('80'),
+            category=cls.furniture,
+        )
+        cls.table = Product.objects.create(
+            name='Dining table', description='Seats six, pairs with the oak chair', price=Decimal('300'),
+            category=cls.furniture,
+        )
+        cls.pan = Product.objects.create(
+            name='Pan set', description='Non-stick pans', price=Decimal('50'), category=cls.kitchen,
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/products/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_ranks_name_matches_first(self):
+        results = self.search('oak chair')
+        self.assertEqual([r['id'] for r in results], [self.chair.pk, self.table.pk])
+        self.assertGreater(results[0]['search']['rank'], results[1]['search']['rank'])
+
+    def test_prefix_matching_and_category(self):
+        self.assertEqual([r['id'] for r in self.search('kitch')], [self.pan.pk])
+        self.assertEqual([r['id'] for r in self.search('din tab')], [self.table.pk])
+
+    def test_highlights_are_escaped(self):
+        result = self.search('sturdy')[0]
+        self.assertEqual(result['search']['name'], 'Oak chair')
+        self.assertIn('<mark>sturdy</mark>', result['search']['snippet'])
+        self.assertIn('&lt;b&gt;', result['search']['snippet'])
+
+    def test_index_follows_product_changes(self):
+        self.pan.name = 'Wok'
+        self.pan.save()
+        self.assertEqual([r['id'] for r in self.search('wok')], [self.pan.pk])
+        self.assertEqual(self.search('pan set'), [])
+
+        self.kitchen.name = 'Cookware'
+        self.kitchen.save()
+        self.assertEqual([r['id'] for r in self.search('cookware')], [self.pan.pk])
+
+        self.chair.delete()
+        self.assertEqual([r['id'] for r in self.search('oak')], [self.table.pk])
+
+    def test_missing_query(self):
+        self.assertEqual(self.client.get('/api/products/search/').status_code, 400)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM products_product_fts')
+        self.assertEqual(self.search('oak'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('oak')), 2)
+
+
+class ProductReadSerializerTests(TestCase):
+    """
+    The fast read serializer must render exactly like ProductSerializer
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lighting & <Lamps>')
+        Product.objects.bulk_create([
+            Product(name='Desk lamp', description='Adjustable', price=Decimal('19.9'), category=category,
+                    image='products/lamp.jpg'),
+            Product(name='Floor lamp "XL"', description='', price=Decimal('1234.56'), category=category, stock=3),
+            Product(name='Bulb', description='ünïcode', price=Decimal('0'), category=category, image=''),
+            Product(name='Shade', description='', price=Decimal('7.50'), category=category,
+                    image='products/lamp shade ü.jpg'),
+        ])
+
+    def assertSameJSON(self, queryset, **context):
+        expected = JSONRenderer().render(ProductSerializer(queryset, many=True, context=context).data)
+        actual = JSONRenderer().render(ProductReadSerializer(queryset, many=True, context=context).data)
+        self.assertEqual(actual, expected)
+
+    def test_parity(self):
+        queryset = Product.objects.select_related('category').order_by('id')
+        self.assertSameJSON(queryset)
+        self.assertSameJSON(queryset, request=APIRequestFactory().get('/api/products/'))
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(queryset)
+
+    def test_parity_without_category(self):
+        # The fast path cannot follow category.name and falls back to DRF
+        product = Product(name='Draft', description='', price=Decimal('5'))
+        self.assertEqual(ProductReadSerializer(product).data, ProductSerializer(product).data)
+
+
+class ProductImportTests(TestCase):
+    """
+    Tests for the bulk product import
+    """
+
+    CSV = (
+        'sku,name,description,price,category,stock\n'
+        'A-1,Oak chair,"Solid, oiled oak",120.00,Furniture,5\n'
+        'A-2,Oak table,,450,Furniture,\n'
+        'B-1,Desk lamp,,abc,Lighting,\n'
+        'B-2,,,10,Lighting,\n'
+        'B-3,Floor lamp,,89.5,Lighting,-1\n'
+        'A-1,Oak chair,Solid oak,125.00,Furniture,5\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.furniture = Category.objects.create(name='Furniture')
+        cls.admin = get_user_model().objects.create_user(email='importer@example.com', password=None, is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def run_command(self, content, suffix='.csv', *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8') as feed:
+            feed.write(content)
+            feed.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_products', feed.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_command_upserts_and_reports_errors(self):
+        stdout, stderr = self.run_command(self.CSV, '.csv', '--batch-size', '2')
+
+        self.assertIn('Imported 3 of 6 rows', stdout)
+        self.assertIn('rows/s', stdout)
+        self.assertEqual(stderr.splitlines(), [
+            "line 4: price 'abc' is not a number",
+            'line 5: name is required',
+            'line 6: stock cannot be negative',
+        ])
+
+        chair = Product.objects.get(sku='A-1')
+        self.assertEqual((chair.price, chair.description, chair.stock), (Decimal('125.00'), 'Solid oak', 5))
+        self.assertEqual(chair.category, self.furniture)
+        self.assertIsNone(Product.objects.get(sku='A-2').stock)
+        self.assertEqual(Category.objects.filter(name='Furniture').count(), 1)
+
+    def test_reimport_updates_in_place_and_reprices_carts(self):
+        self.run_command(self.CSV)
+        chair = Product.objects.get(sku='A-1')
+        user = get_user_model().objects.create_user(email='shopper@example.com', password=None)
+        CartItem.objects.create(user=user, product=chair, quantity=2)
+        Cart.objects.recalculate([user.pk])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.run_command('{"sku": "A-1", "name": "Oak chair", "price": "99.99", "category": "Seating"}\n'
+                             'not json\n', '.jsonl')
+
+        self.assertEqual(callbacks[0].__name__, 'bump_catalogue_version')
+        self.assertEqual(Product.objects.filter(sku='A-1').get().pk, chair.pk)
+        self.assertEqual(Product.objects.get(sku='A-1').category.name, 'Seating')
+        self.assertEqual(Cart.objects.get(pk=user.pk).subtotal, Decimal('199.98'))
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_reimport_keeps_columns_the_feed_lacks(self):
+        self.run_command(self.CSV)
+        self.run_command('sku,name,price,category\nA-1,Oak chair,130,Furniture\n')
+        self.run_command('{"sku": "A-2", "name": "Oak table", "price": 400, "category": "Furniture", '
+                         '"description": "Extends", "stock": 3}\n', '.jsonl')
+
+        chair = Product.objects.get(sku='A-1')
+        self.assertEqual((chair.price, chair.description, chair.stock), (Decimal('130.00'), 'Solid oak', 5))
+        table = Product.objects.get(sku='A-2')
+        self.assertEqual((table.description, table.stock), ('Extends', 3))
+
+    def test_imported_stock_keeps_reservations(self):
+        self.run_command(self.CSV)
+        chair = Product.objects.get(sku='A-1')
+        user = get_user_model().objects.create_user(email='shopper@example.com', password=None)
+        CartItem.objects.create(user=user, product=chair, quantity=2)
+        order = checkout_cart(user)
+
+        # 10 on hand at the supplier, 2 of them held by the pending order
+        self.run_command('sku,name,price,category,stock\nA-1,Oak chair,125.00,Furniture,10\n')
+        chair.refresh_from_db()
+        self.assertEqual(chair.stock, 8)
+
+        release_expired_reservations(now=order.reserved_until + timedelta(seconds=1))
+        chair.refresh_from_db()
+        self.assertEqual(chair.stock, 10)
+
+    def test_imported_products_are_searchable(self):
+        self.run_command(self.CSV)
+        response = self.client.get('/api/products/search/?q=table')
+        self.assertEqual([item['sku'] for item in response.data['results']], ['A-2'])
+
+    def test_endpoint_upload(self):
+        upload = SimpleUploadedFile('feed.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['rows'], response.data['imported'], response.data['failed']), (6, 3, 3))
+        self.assertEqual(response.data['errors'][0], {'line': 4, 'error': "price 'abc' is not a number"})
+
+    def test_endpoint_body(self):
+        body = '{"sku": "C-1", "name": "Rug", "price": 30, "category": "Textiles"}\n'
+        response = self.client.generic('POST', '/api/products/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported'], 1)
+        self.assertTrue(Product.objects.filter(sku='C-1', category__name='Textiles').exists())
+
+    def test_endpoint_rejects_unknown_format_and_non_admins(self):
+        response = self.client.generic('POST', '/api/products/import/', 'a,b', content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(get_user_model().objects.create_user(email='x@example.com', password=None))
+        upload = SimpleUploadedFile('feed.csv', self.CSV.encode(), content_type='text/csv')
+        self.assertEqual(self.client.post('/api/products/import/', {'file': upload}).status_code, 403)
+
+
+def image_file(name='photo.png', size=(800, 600), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProductImageTests(TestCase):
+    """
+    Tests for the product image variants
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Prints')
+        cls.admin = get_user_model().objects.create_user(email='images@example.com', password=None, is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_WORKERS=0))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_product(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(name='Poster', description='', price=Decimal('10'),
+                                          category=self.category, **fields)
+
+    def test_upload_generates_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/', {
+                'name': 'Poster', 'description': 'A3 print', 'price': '10.00', 'category': self.category.pk,
+                'image': image_file(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        variants = self.client.get(f'/api/products/{response.data["id"]}/').data['image_variants']
+        self.assertEqual((variants['width'], variants['height']), (800, 600))
+        self.assertEqual(len(variants['placeholder']), 28)
+        self.assertEqual((variants['thumbnail']['width'], variants['thumbnail']['height']), (160, 120))
+        self.assertEqual(variants['medium']['width'], 640)
+
+        prefix = 'http://testserver/media/products/variants/'
+        self.assertTrue(variants['small']['webp'].startswith(prefix))
+        with default_storage.open(variants['small']['webp'].removeprefix('http://testserver/media/')) as webp:
+            self.assertEqual(Image.open(webp).format, 'WEBP')
+        with default_storage.open(variants['small']['jpeg'].removeprefix('http://testserver/media/')) as jpeg:
+            self.assertEqual(Image.open(jpeg).size, (320, 240))
+
+    def test_small_images_are_not_enlarged(self):
+        product = self.create_product(image=image_file(size=(100, 50)))
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['medium']['width'], 100)
+
+    def test_variants_follow_image_changes(self):
+        product = self.create_product(image=image_file())
+        product.refresh_from_db()
+        first = product.image_variants['source']
+
+        product.image = image_file('other.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertNotEqual(product.image_variants['source'], first)
+        self.assertEqual(product.image_variants['source'], product.image.name)
+
+        product.image = None
+        product.save()
+        product.refresh_from_db()
+        self.assertIsNone(product.image_variants)
+        self.assertIsNone(ProductSerializer(product).data['image_variants'])
+
+    def test_stale_variants_are_not_exposed(self):
+        product = self.create_product(image=image_file())
+        Product.objects.filter(pk=product.pk).update(image='products/replaced.png')
+        product.refresh_from_db()
+        self.assertIsNone(ProductSerializer(product).data['image_variants'])
+        self.assertIsNone(ProductReadSerializer(product).data['image_variants'])
+
+    def test_variants_are_content_addressed(self):
+        names = [
+            default_storage.save(f'products/{folder}/photo.png', image_file(color=color))
+            for folder, color in (('a', (200, 30, 30)), ('b', (30, 30, 200)))
+        ]
+        first, second = (generate_variants(name) for name in names)
+        self.assertNotEqual(first['thumbnail']['jpeg'], second['thumbnail']['jpeg'])
+
+        # Regenerating reuses the files instead of writing new copies
+        written = set(default_storage.listdir('products/variants/products/a')[1])
+        self.assertEqual(generate_variants(names[0]), first)
+        self.assertEqual(set(default_storage.listdir('products/variants/products/a')[1]), written)
+
+    def test_blurhash_encodes_average_colour(self):
+        placeholder = blurhash(Image.new('RGB', (64, 48), (255, 0, 0)))
+        average = 0
+        for char in placeholder[2:6]:
+            average = average * 83 + BASE83.index(char)
+        self.assertEqual(average, 0xFF0000)
+
+    def test_backfill_command(self):
+        names = [default_storage.save(f'products/backfill-{i}.png', image_file()) for i in range(3)]
+        Product.objects.bulk_create([
+            Product(name=f'Print {i}', description='', price=Decimal('5'), category=self.category, image=name)
+            for i, name in enumerate(names)
+        ])
+
+        stdout = StringIO()
+        call_command('process_product_images', '--workers', '2', stdout=stdout)
+        self.assertIn('Processed 3 images', stdout.getvalue())
+        for product in Product.objects.all():
+            self.assertEqual(product.image_variants['source'], product.image.name)
+            self.assertTrue(default_storage.exists(product.image_variants['thumbnail']['webp']))
+
+        stdout = StringIO()
+        call_command('process_product_images', stdout=stdout)
+        self.assertIn('up to date', stdout.getvalue())
+
+
+class AsyncCatalogueViewTests(TestCase):
+    """
+    The async catalogue views must answer exactly like the sync ones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lighting = Category.objects.create(name='Lighting')
+        cls.seating = Category.objects.create(name='Seating')
+        Product.objects.bulk_create([
+            Product(name=f'Product {i:02}', description='', price=Decimal(i % 7) + Decimal('0.50'),
+                    category=cls.lighting if i % 2 else cls.seating)
+            for i in range(25)
+        ])
+        cls.admin = get_user_model().objects.create_user(email='async@example.com', password=None, is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        routes = async_reads(router.urls, {ProductViewSet: AsyncProductViewSet, CategoryViewSet: AsyncCategoryViewSet})
+        self.views = {route.name: route.callback for route in routes if 'format' not in str(route.pattern)}
+
+    def get(self, name, path, **kwargs):
+        cache.clear()
+        return async_to_sync(self.views[name])(APIRequestFactory().get(path), **kwargs)
+
+    def assertSameResponse(self, name, path, **kwargs):
+        cache.clear()
+        expected = self.client.get(path)
+        actual = self.get(name, path, **kwargs)
+        self.assertEqual((actual.status_code, actual.content), (expected.status_code, expected.content))
+        return actual
+
+    def test_product_list(self):
+        self.assertSameResponse('product-list', '/api/products/')
+        self.assertSameResponse('product-list', '/api/products/?ordering=-price&page=2')
+        self.assertSameResponse('product-list', f'/api/products/?category={self.lighting.pk}&min_price=2')
+        self.assertSameResponse('product-list', '/api/products/?page=9')
+
+    def test_invalid_category_filter(self):
+        response = self.assertSameResponse('product-list', '/api/products/?category=999')
+        self.assertEqual(response.status_code, 400)
+        self.assertSameResponse('product-list', '/api/products/?category=abc')
+
+    def test_cursor_pagination(self):
+        path = '/api/products/?pagination=cursor&ordering=price'
+        while path:
+            data = self.assertSameResponse('product-list', path).data
+            path = data['next']
+
+    def test_product_detail(self):
+        product = Product.objects.first()
+        self.assertSameResponse('product-detail', f'/api/products/{product.pk}/', pk=str(product.pk))
+        self.assertEqual(self.get('product-detail', '/api/products/0/', pk='0').status_code, 404)
+        self.assertEqual(self.get('product-detail', '/api/products/x/', pk='x').status_code, 404)
+
+    def test_category_list(self):
+        self.assertSameResponse('category-list', '/api/products/categories/')
+
+    def test_cached_and_conditional_responses_skip_the_database(self):
+        view = self.views['product-list']
+        first = async_to_sync(view)(APIRequestFactory().get('/api/products/'))
+        with self.assertNumQueries(0):
+            cached = async_to_sync(view)(APIRequestFactory().get('/api/products/'))
+            not_modified = async_to_sync(view)(
+                APIRequestFactory().get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+            )
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_writes_go_to_the_sync_view(self):
+        request = APIRequestFactory().post('/api/products/', {
+            'name': 'Lamp', 'description': 'Brass', 'price': '30.00', 'category': self.lighting.pk,
+        }, format='json')
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(self.admin)}'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = async_to_sync(self.views['product-list'])(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Product.objects.filter(name='Lamp').exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], CATALOGUE_CACHE_TIMEOUT=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Catalogue and report reads go to the replica, a second SQLite file
+    copied from the primary, but not the reads of users who just wrote,
+    right after catalogue changes or in transactions
+    """
+
+    # Resolved when the class is set up, once the replica is registered
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(email='replica@example.com', password=None)
+        self.admin = User.objects.create_user(email='replica-admin@example.com', password=None, is_staff=True)
+        self.product = Product.objects.create(name='Lamp', description='', price=Decimal('30.00'),
+                                              category=Category.objects.create(name='Lighting'))
+        self.replicate()
+        # Changes the replica hasn't caught up with yet
+        Product.objects.filter(pk=self.product.pk).update(name='Desk lamp')
+        Category.objects.bulk_create([Category(name='Garden')])
+        get_catalogue_version()
+        cache.set(CATALOGUE_MODIFIED_KEY, int(time.time()) - 60, None)
+
+    def replicate(self):
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica'].connection)
+
+    def product_name(self, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(f'/api/products/{self.product.pk}/').data['name']
+
+    def test_catalogue_reads_use_the_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.product_name(), 'Lamp')
+            self.assertEqual(self.product_name(self.user), 'Lamp')
+            response = self.client.get('/api/products/categories/')
+        self.assertEqual([category['name'] for category in response.data['results']], ['Lighting'])
+        self.assertTrue(replica)
+
+        view = next(
+            route.callback for route in async_reads(router.urls, {ProductViewSet: AsyncProductViewSet})
+            if route.name == 'product-detail'
+        )
+        response = async_to_sync(view)(APIRequestFactory().get(f'/api/products/{self.product.pk}/'),
+                                       pk=str(self.product.pk))
+        self.assertEqual(response.data['name'], 'Lamp')
+
+    def test_users_read_their_own_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post('/api/cart/', {'product': self.product.pk}, format='json').status_code, 201)
+        self.assertEqual(self.product_name(self.user), 'Desk lamp')
+        self.assertEqual(self.product_name(self.admin), 'Lamp')
+        self.assertEqual(self.product_name(), 'Lamp')
+
+        with override_settings(DATABASE_REPLICA_LAG_SECONDS=0):
+            client.force_authenticate(self.admin)
+            client.post('/api/cart/', {'product': self.product.pk}, format='json')
+            self.assertEqual(self.product_name(self.admin), 'Lamp')
+
+    def test_catalogue_changes_read_the_primary(self):
+        Product.objects.get(pk=self.product.pk).save()
+        self.assertEqual(self.product_name(), 'Desk lamp')
+
+    def test_writes_and_transactions_use_the_primary(self):
+        with read_from_replicas():
+            product = Product.objects.get(pk=self.product.pk)
+            self.assertEqual(product.name, 'Lamp')
+            with transaction.atomic():
+                self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Desk lamp')
+            product.stock = 3
+            product.save(update_fields=['stock'])
+            CartItem.objects.create(user=self.user, product=product)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 3)
+        self.assertTrue(CartItem.objects.filter(user=self.user, product=self.product).exists())
+
+    def test_reports_read_the_replica(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(client.get('/api/reports/revenue/').status_code, 200)
+        self.assertTrue(replica)
+        self.assertFalse(primary)
@@ -1,11 +1,18 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, CategoryViewSet
+
+from config.async_views import async_reads
+from .views import AsyncCategoryViewSet, AsyncProductViewSet, ProductViewSet, CategoryViewSet
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'', ProductViewSet)
 
+routes = router.urls
+if settings.ASYNC_READ_VIEWS:
+    routes = async_reads(routes, {ProductViewSet: AsyncProductViewSet, CategoryViewSet: AsyncCategoryViewSet})
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(routes)),
 ]
\ No newline at end of file
@@ -1,11 +1,18 @@
 from django.db.models import Q
-from rest_framework import viewsets, filters, permissions
+from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 
+from config.async_views import AsyncViewMixin
+from config.routers import AsyncReplicaReadMixin, ReplicaReadMixin
+from .cache import AsyncCatalogueCacheMixin, CatalogueCacheMixin
+from .importers import ProductImportError, detect_format, import_products
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .pagination import ProductCursorPagination
+from .search import search_products
+from .serializers import ProductReadSerializer, ProductSerializer, CategorySerializer
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -18,9 +25,9 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return True
 
         # Check if user is admin for other methods
-        return request.user and request.user.is_admin
+        return getattr(request.user, 'is_admin', False)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogueCacheMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for categories
     """
@@ -28,7 +35,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogueCacheMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for products
 
@@ -41,6 +48,22 @@ class ProductViewSet(viewsets.ModelViewSet):
     - /api/products/?ordering=-price (descending)
     - /api/products/?ordering=name (alphabetical)
     - /api/products/?ordering=-name (reverse alphabetical)
+
+    Pagination:
+    - /api/products/?page=2 (page numbers, default)
+    - /api/products/?pagination=cursor (keyset pagination; follow the
+      returned next/previous links, which carry an opaque ?cursor=)
+
+    Search:
+    - /api/products/search/?q=oak cha (ranked full-text search, every word
+      matches as a prefix)
+
+    Import (admins):
+    - POST /api/products/import/ with a CSV or JSONL file, upserting by SKU
+
+    Caching:
+    - list and detail responses are cached per catalogue version and carry
+      ETag/Last-Modified headers for conditional requests
     """
     queryset = Product.objects.all().select_related('category')
     serializer_class = ProductSerializer
@@ -49,6 +72,22 @@ class ProductViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category']
     ordering_fields = ['price', 'name']
 
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when the client opts in, page numbers otherwise.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = ProductCursorPagination()
+        return super().paginator
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return ProductReadSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -61,4 +100,85 @@ class ProductViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
-        return queryset
\ No newline at end of file
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search over product name, description and category name,
+        ranked by relevance with highlighted matches
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'The q parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        page_size = self.paginator.page_size
+
+        # Fetch one extra row to find out whether there is a next page
+        products, highlights = search_products(query, limit=page_size + 1, offset=(page - 1) * page_size)
+        results = self.get_serializer(products[:page_size], many=True).data
+        for item in results:
+            item['search'] = highlights[item['id']]
+
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if len(products) > page_size else None,
+            'previous': (
+                None if page == 1
+                else remove_query_param(url, 'page') if page == 2
+                else replace_query_param(url, 'page', page - 1)
+            ),
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Import products from a CSV or JSONL upload (multipart field "file") or
+        request body (Content-Type text/csv or application/x-ndjson).
+        Products are upserted by SKU and missing categories created; use
+        ?input=csv|jsonl if the format cannot be told from the upload.
+        Returns the import report with per-row errors.
+        """
+        if request.content_type.startswith('multipart/'):
+            upload = stream = request.FILES.get('file')
+        else:
+            upload, stream = None, request.stream
+        if stream is None:
+            return Response(
+                {'error': 'Upload a CSV or JSONL file'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fmt = request.query_params.get('input')
+        try:
+            if fmt is None:
+                fmt = detect_format(getattr(upload, 'name', ''), getattr(upload, 'content_type', None) or request.content_type)
+            report = import_products(stream, fmt)
+        except ProductImportError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(report.as_dict(max_errors=100))
+
+class AsyncCategoryViewSet(AsyncCatalogueCacheMixin, AsyncReplicaReadMixin, AsyncViewMixin, CategoryViewSet):
+    """
+    Async list and detail of categories, served under ASGI when
+    ASYNC_READ_VIEWS is on
+    """
+
+class AsyncProductViewSet(AsyncCatalogueCacheMixin, AsyncReplicaReadMixin, AsyncViewMixin, ProductViewSet):
+    """
+    Async list and detail of products, served under ASGI when
+    ASYNC_READ_VIEWS is on. Filtering, ordering, both pagination styles and
+    caching behave as in ProductViewSet.
+    """
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reports.rollups import order_date_range, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the daily sales rollups from the orders, a chunk of days per '
+        'transaction. Covers every day with orders unless --start/--end are given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--chunk-days', type=int, default=7, help='Days rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+        for option in ('start', 'end'):
+            if options[option]:
+                try:
+                    options[option] = parse_date(options[option])
+                except ValueError:
+                    options[option] = None
+                if options[option] is None:
+                    raise CommandError(f'--{option} must be a date (YYYY-MM-DD)')
+        bounds = order_date_range()
+        start = options['start'] or bounds and bounds[0]
+        end = options['end'] or bounds and bounds[1]
+        if start is None or end is None:
+            self.stdout.write('No orders to roll up.')
+            return
+
+        chunks = 0
+        for first, last in rebuild_rollups(start, end, options['chunk_days']):
+            chunks += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Rebuilt {first} to {last}')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the rollups of {start} to {end} in {chunks} chunk(s).'))
@@ -0,0 +1,73 @@
+from django.db import models
+
+from orders.models import Order
+from products.models import Category, Product
+
+
+class SalesRollup(models.Model):
+    """
+    Sales of the orders created on a day that have a given status. Kept up
+    to date as orders are placed and change status, see reports.rollups.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Path from OrderItem to the rolled up dimension, and its column here
+    dimension = None
+    dimension_column = None
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+    """
+    Sales per day and status
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='dailysales_day_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.orders} orders, {self.revenue}"
+
+
+class CategoryDailySales(SalesRollup):
+    """
+    Sales per day, category and status
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+
+    dimension = 'product__category'
+    dimension_column = 'category_id'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'status'], name='categorydailysales_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} category {self.category_id} {self.status}: {self.units} units, {self.revenue}"
+
+
+class ProductDailySales(SalesRollup):
+    """
+    Sales per day, product and status
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+
+    dimension = 'product'
+    dimension_column = 'product_id'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product', 'status'], name='productdailysales_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} product {self.product_id} {self.status}: {self.units} units, {self.revenue}"
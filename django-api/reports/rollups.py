@@ -0,0 +1,189 @@
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import CategoryDailySales, DailySales, ProductDailySales
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS = (DailySales, CategoryDailySales, ProductDailySales)
+
+
+def contributions(model, items, status):
+    """
+    What ``items`` (OrderItems) add to the rows of a rollup ``model``, with
+    ``status`` (an expression) as their status. The columns are in the
+    order of rollup_columns().
+    """
+    group = {'rollup_day': TruncDate('order__created_at'), 'rollup_status': status}
+    if model.dimension:
+        # Lines of deleted products only count in the overall rollup
+        items = items.filter(**{f'{model.dimension}__isnull': False})
+        group['rollup_dimension'] = F(model.dimension)
+    totals = {
+        'rollup_orders': Count('order', distinct=True),
+        'rollup_units': Sum('quantity'),
+        'rollup_revenue': Sum(F('quantity') * F('price')),
+    }
+    names = ['rollup_day', *(['rollup_dimension'] if model.dimension else []), 'rollup_status', *totals]
+    return items.order_by().values(**group).annotate(**totals).values_list(*names)
+
+
+def rollup_columns(model):
+    return ['day', *([model.dimension_column] if model.dimension else []), 'status', 'orders', 'units', 'revenue']
+
+
+def upsert(model, rows_sql, params):
+    """
+    Insert the rows selected by ``rows_sql`` into the rollup, adding their
+    totals to the rows that already exist.
+    """
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = rollup_columns(model)
+    increments = ', '.join(f'{quote(c)} = {table}.{quote(c)} + excluded.{quote(c)}' for c in columns[-3:])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(map(quote, columns))}) {rows_sql} "
+            f"ON CONFLICT ({', '.join(map(quote, columns[:-3]))}) DO UPDATE SET {increments}",
+            params,
+        )
+
+
+def add_to_rollup(model, queryset):
+    """
+    Add the rows of a contributions() queryset to the rollup with one
+    INSERT ... SELECT.
+    """
+    upsert(model, *queryset.query.sql_with_params())
+
+
+def deltas(model, items, old_status, new_status):
+    """
+    The rows to add to a rollup ``model`` to move ``items`` (OrderItem
+    values) from ``old_status`` to ``new_status``, keyed like its unique
+    constraint, in the order of rollup_columns().
+    """
+    signs = {status: sign for status, sign in ((old_status, -1), (new_status, 1)) if status is not None}
+    totals = defaultdict(lambda: [set(), 0, Decimal('0')])
+    for status in signs:
+        for item in items:
+            if model.dimension and item[model.dimension_column] is None:
+                continue
+            key = (
+                timezone.localdate(item['created_at']),
+                *([item[model.dimension_column]] if model.dimension else []),
+                status,
+            )
+            total = totals[key]
+            total[0].add(item['order_id'])
+            total[1] += item['quantity']
+            total[2] += item['quantity'] * item['price']
+    return [
+        (*key, signs[key[-1]] * len(orders), signs[key[-1]] * units, signs[key[-1]] * revenue)
+        for key, (orders, units, revenue) in totals.items()
+    ]
+
+
+def increment_rollup(model, rows):
+    """
+    Add ``rows`` to the rollup with one INSERT ... VALUES.
+    """
+    if not rows:
+        return
+    fields = [model._meta.get_field(column) for column in rollup_columns(model)]
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+    params = [field.get_db_prep_value(value, connection) for row in rows for field, value in zip(fields, row)]
+    upsert(model, f'VALUES {placeholders}', params)
+
+
+def order_sales(order_ids):
+    """
+    The items of the given orders, as deltas() takes them.
+    """
+    return list(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values('order_id', 'product_id', 'quantity', 'price',
+                category_id=F('product__category_id'), created_at=F('order__created_at'))
+    )
+
+
+@transaction.atomic
+def move_sales(items, old_status, new_status):
+    """
+    Move ``items`` (from order_sales()) from ``old_status`` to
+    ``new_status`` in every rollup. None stands for not being counted, as
+    for new or deleted orders.
+    """
+    for model in ROLLUPS:
+        increment_rollup(model, deltas(model, items, old_status, new_status))
+
+
+def move_sales_after_commit(items, old_status, new_status):
+    """
+    move_sales() for changes that are already committed, retrying locked
+    rollup rows a few times. A move that still fails is logged rather than
+    raised, as the orders are saved; rebuild_sales_rollups repairs the days
+    it missed.
+    """
+    attempts = settings.CHECKOUT_RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            return move_sales(items, old_status, new_status)
+        except OperationalError:
+            if attempt == attempts - 1:
+                logger.exception(
+                    'Could not move orders %s from %s to %s in the sales rollups',
+                    sorted({item['order_id'] for item in items}), old_status, new_status,
+                )
+                return
+            delay = min(settings.CHECKOUT_RETRY_BACKOFF * 2 ** attempt, settings.CHECKOUT_RETRY_BACKOFF_MAX)
+            time.sleep(delay * random.uniform(0.5, 1))
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def rebuild_rollups(start, end, chunk_days=7):
+    """
+    Recompute the rollups of the days from ``start`` to ``end`` from the
+    orders, a chunk of ``chunk_days`` days per transaction, so the rollups
+    of other days stay readable and each chunk only scans its own orders.
+    Yields the first and last day of each chunk once it is committed.
+    """
+    day = start
+    while day <= end:
+        last = min(day + timedelta(days=chunk_days - 1), end)
+        with transaction.atomic():
+            for model in ROLLUPS:
+                model.objects.filter(day__range=(day, last)).delete()
+            items = OrderItem.objects.filter(
+                order__created_at__gte=start_of_day(day),
+                order__created_at__lt=start_of_day(last + timedelta(days=1)),
+            )
+            for model in ROLLUPS:
+                add_to_rollup(model, contributions(model, items, F('order__status')))
+        yield day, last
+        day = last + timedelta(days=1)
+
+
+def order_date_range():
+    """
+    The days of the first and the last order, or None without orders.
+    """
+    first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return None
+    last = Order.objects.order_by('-created_at').values_list('created_at', flat=True).first()
+    return timezone.localdate(first), timezone.localdate(last)
@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from orders.models import Order
+from orders.signals import order_status_changed
+from .rollups import move_sales_after_commit, order_sales
+
+
+def schedule_move(order_ids, old_status, new_status):
+    """
+    Read the orders' items now, as the transaction sees them, and move
+    their sales once it commits, so checkouts and status updates don't
+    hold their locks while the rollups are written.
+    """
+    items = order_sales(order_ids)
+    if items:
+        transaction.on_commit(partial(move_sales_after_commit, items, old_status, new_status))
+
+
+@receiver(order_status_changed)
+def update_sales_rollups(sender, order_ids, old_status, new_status, **kwargs):
+    schedule_move(order_ids, old_status, new_status)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_order(sender, instance, **kwargs):
+    """
+    Take a deleted order out of the rollups while its items still exist.
+    """
+    schedule_move([instance.pk], instance.status, None)
@@ -0,0 +1,231 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cart.models import CartItem
+from config.testing import QueryBudgetMixin
+from orders.models import Order, OrderItem, OrderStatusConflict
+from orders.services import checkout_cart, release_expired_reservations
+from products.models import Category, Product
+from .models import CategoryDailySales, DailySales, ProductDailySales
+
+User = get_user_model()
+
+
+def rollup_rows():
+    """
+    Every rollup row with sales, comparable across rebuilds
+    """
+    return {
+        model.__name__: sorted(
+            model.objects.exclude(orders=0, units=0, revenue=0)
+            .values_list(*[f.attname for f in model._meta.concrete_fields if f.name != 'id'])
+        )
+        for model in (DailySales, CategoryDailySales, ProductDailySales)
+    }
+
+
+class SalesRollupTests(TestCase):
+    """
+    The rollups must follow orders as they are placed, change status and
+    are deleted, and match a rebuild from the orders
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='shopper@example.com', password=None)
+        cls.admin = User.objects.create_superuser(email='reports-admin@example.com', password='secret-pass-123')
+        cls.books = Category.objects.create(name='Books')
+        cls.games = Category.objects.create(name='Games')
+        cls.novel = Product.objects.create(name='Novel', description='', price=Decimal('12.50'), category=cls.books)
+        cls.atlas = Product.objects.create(name='Atlas', description='', price=Decimal('30.00'), category=cls.books)
+        cls.chess = Product.objects.create(name='Chess', description='', price=Decimal('45.00'), category=cls.games)
+
+    def checkout(self, *lines):
+        CartItem.objects.bulk_create([
+            CartItem(user=self.user, product=product, quantity=quantity) for product, quantity in lines
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            return checkout_cart(self.user)
+
+    def sales(self, status):
+        return DailySales.objects.get(day=timezone.localdate(), status=status)
+
+    def assert_matches_rebuild(self):
+        incremental = rollup_rows()
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(rollup_rows(), incremental)
+
+    def test_checkout_adds_sales(self):
+        self.checkout((self.novel, 2), (self.chess, 1))
+        self.checkout((self.novel, 1))
+
+        pending = self.sales('pending')
+        self.assertEqual((pending.orders, pending.units, pending.revenue), (2, 4, Decimal('82.50')))
+        books = CategoryDailySales.objects.get(category=self.books, status='pending')
+        self.assertEqual((books.orders, books.units, books.revenue), (2, 3, Decimal('37.50')))
+        chess = ProductDailySales.objects.get(product=self.chess, status='pending')
+        self.assertEqual((chess.orders, chess.units, chess.revenue), (1, 1, Decimal('45.00')))
+        self.assert_matches_rebuild()
+
+    def test_status_update_moves_sales(self):
+        order = self.checkout((self.atlas, 1))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/orders/{order.pk}/', {'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.sales('pending').orders, 0)
+        self.assertEqual(self.sales('shipped').revenue, Decimal('30.00'))
+        self.assert_matches_rebuild()
+
+    def test_expired_reservations_are_cancelled_in_rollups(self):
+        order = self.checkout((self.chess, 2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_expired_reservations(now=order.reserved_until + timedelta(seconds=1)), 1)
+
+        self.assertEqual(self.sales('pending').units, 0)
+        self.assertEqual(self.sales('cancelled').units, 2)
+        self.assert_matches_rebuild()
+
+    def test_stale_status_update_is_refused(self):
+        order = self.checkout((self.chess, 1))
+        stale = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_reservations(now=order.reserved_until + timedelta(seconds=1))
+        stale.status = 'shipped'
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(OrderStatusConflict):
+            stale.save()
+
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'cancelled')
+        self.assertEqual(self.sales('cancelled').orders, 1)
+        self.assertFalse(DailySales.objects.filter(status='shipped', orders__gt=0).exists())
+        self.assert_matches_rebuild()
+
+    def test_deleted_order_is_removed(self):
+        self.checkout((self.novel, 1))
+        deleted = self.checkout((self.atlas, 3))
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=deleted.pk).delete()
+
+        self.assertEqual(self.sales('pending').revenue, Decimal('12.50'))
+        self.assertEqual(ProductDailySales.objects.get(product=self.atlas).units, 0)
+        self.assert_matches_rebuild()
+
+    def test_rebuild_chunks_history(self):
+        for days_ago in (40, 10, 0):
+            order = Order.objects.create(user=self.user, total_amount=Decimal('12.50'), status='delivered')
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+            OrderItem.objects.create(order=order, product=self.novel, quantity=1, price=self.novel.price)
+
+        out = StringIO()
+        call_command('rebuild_sales_rollups', '--chunk-days=7', stdout=out)
+        self.assertIn('in 6 chunk(s)', out.getvalue())
+        self.assertEqual(DailySales.objects.filter(status='delivered').count(), 3)
+        self.assertEqual(sum(DailySales.objects.values_list('orders', flat=True)), 3)
+
+        # Rebuilding part of the history leaves the other days alone
+        start = (timezone.localdate() - timedelta(days=5)).isoformat()
+        call_command('rebuild_sales_rollups', f'--start={start}', stdout=StringIO())
+        self.assertEqual(DailySales.objects.filter(status='delivered').count(), 3)
+
+
+class ReportEndpointTests(QueryBudgetMixin, TestCase):
+    """
+    The report endpoints read the rollups, in queries that don't depend on
+    the number of orders
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='analyst@example.com', password='secret-pass-123')
+        cls.user = User.objects.create_user(email='customer@example.com', password=None)
+        books = Category.objects.create(name='Books')
+        games = Category.objects.create(name='Games')
+        cls.products = [
+            Product.objects.create(name='Novel', description='', price=Decimal('10.00'), category=books),
+            Product.objects.create(name='Chess', description='', price=Decimal('40.00'), category=games),
+            Product.objects.create(name='Cards', description='', price=Decimal('5.00'), category=games),
+        ]
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - timedelta(days=1)
+        rows = [
+            # day, product, status, orders, units, revenue
+            (cls.yesterday, cls.products[0], 'delivered', 3, 5, Decimal('50.00')),
+            (cls.yesterday, cls.products[1], 'delivered', 1, 1, Decimal('40.00')),
+            (cls.today, cls.products[1], 'pending', 2, 2, Decimal('80.00')),
+            (cls.today, cls.products[2], 'pending', 1, 20, Decimal('100.00')),
+            (cls.today, cls.products[0], 'cancelled', 4, 4, Decimal('40.00')),
+        ]
+        for day, product, status, orders, units, revenue in rows:
+            for model, key in (
+                (ProductDailySales, {'product': product}),
+                (CategoryDailySales, {'category': product.category}),
+                # Orders can hold several products, only the day totals know
+                (DailySales, {}),
+            ):
+                model.objects.get_or_create(day=day, status=status, **key)
+                model.objects.filter(day=day, status=status, **key).update(
+                    orders=F('orders') + orders, units=F('units') + units, revenue=F('revenue') + revenue
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_reports_are_for_admins(self):
+        self.client.force_authenticate(self.user)
+        for url in ('/api/reports/revenue/', '/api/reports/top-products/', '/api/reports/top-categories/'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_revenue_per_day(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/reports/revenue/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['period'], row['orders'], row['units'], row['revenue']) for row in response.data['results']],
+            [(self.yesterday, 4, 6, Decimal('90.00')), (self.today, 3, 22, Decimal('180.00'))],
+        )
+
+        response = self.client.get('/api/reports/revenue/', {'status': 'cancelled', 'interval': 'month'})
+        self.assertEqual([row['revenue'] for row in response.data['results']], [Decimal('40.00')])
+
+    def test_top_sellers(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/reports/top-products/')
+        self.assertEqual(
+            [(row['name'], row['revenue']) for row in response.data['results']],
+            [('Chess', Decimal('120.00')), ('Cards', Decimal('100.00')), ('Novel', Decimal('50.00'))],
+        )
+
+        response = self.client.get('/api/reports/top-products/', {'by': 'units', 'limit': 1})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Cards'])
+
+        response = self.client.get('/api/reports/top-categories/', {'start': self.today.isoformat()})
+        self.assertEqual(
+            [(row['name'], row['orders'], row['units']) for row in response.data['results']],
+            [('Games', 3, 22)],
+        )
+
+    def test_invalid_parameters(self):
+        for url, params in (
+            ('/api/reports/revenue/', {'interval': 'hour'}),
+            ('/api/reports/revenue/', {'start': 'yesterday'}),
+            ('/api/reports/revenue/', {'end': '2025-02-30'}),
+            ('/api/reports/revenue/', {'start': self.today.isoformat(), 'end': self.yesterday.isoformat()}),
+            ('/api/reports/revenue/', {'status': 'lost'}),
+            ('/api/reports/top-products/', {'by': 'price'}),
+            ('/api/reports/top-products/', {'limit': 0}),
+            ('/api/reports/top-categories/', {'limit': 'all'}),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import RevenueReportView, TopCategoriesView, TopProductsView
+
+urlpatterns = [
+    path('revenue/', RevenueReportView.as_view(), name='report-revenue'),
+    path('top-products/', TopProductsView.as_view(), name='report-top-products'),
+    path('top-categories/', TopCategoriesView.as_view(), name='report-top-categories'),
+]
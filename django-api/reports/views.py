@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.routers import ReplicaReadMixin
+from orders.models import Order
+from orders.views import IsAdminUser
+from .models import CategoryDailySales, DailySales, ProductDailySales
+
+INTERVALS = {'week': TruncWeek, 'month': TruncMonth}
+
+
+class ReportView(ReplicaReadMixin, APIView):
+    """
+    Base for the sales reports. They read the daily rollups only, so their
+    cost depends on the number of days asked for, not of orders.
+
+    - ?start=2025-01-01&end=2025-01-31 (inclusive, the last 30 days by default)
+    - ?status=delivered,shipped (every status but cancelled by default)
+    """
+    permission_classes = [IsAdminUser]
+    default_days = 30
+
+    def get_filters(self, request):
+        """
+        Return the rollup filters of the request, or an error message.
+        """
+        try:
+            end = request.query_params.get('end')
+            end = parse_date(end) if end else timezone.localdate()
+            start = request.query_params.get('start')
+            start = parse_date(start) if start else end and end - timedelta(days=self.default_days - 1)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return None, 'start and end must be dates (YYYY-MM-DD)'
+        if start > end:
+            return None, 'start must not be after end'
+
+        valid_statuses = {choice for choice, _ in Order.STATUS_CHOICES}
+        statuses = [value for value in request.query_params.get('status', '').split(',') if value]
+        if set(statuses) - valid_statuses:
+            return None, f'status must be one of {", ".join(sorted(valid_statuses))}'
+        return {'day__range': (start, end), 'status__in': statuses or sorted(valid_statuses - {'cancelled'})}, None
+
+    def get(self, request):
+        filters, error = self.get_filters(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = filters['day__range']
+        return Response({
+            'start': start,
+            'end': end,
+            'statuses': filters['status__in'],
+            'results': self.get_results(request, filters),
+        })
+
+
+class RevenueReportView(ReportView):
+    """
+    Orders, units and revenue per day, week or month (?interval=).
+    """
+
+    def get(self, request):
+        interval = request.query_params.get('interval', 'day')
+        if interval not in ('day', *INTERVALS):
+            return Response(
+                {'error': f'interval must be one of day, {", ".join(INTERVALS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().get(request)
+
+    def get_results(self, request, filters):
+        interval = request.query_params.get('interval', 'day')
+        period = F('day') if interval == 'day' else INTERVALS[interval]('day')
+        return list(
+            DailySales.objects.filter(**filters)
+            .values(period=period)
+            .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('period')
+        )
+
+
+class TopSellersView(ReportView):
+    """
+    Best selling products or categories, by revenue, units or orders
+    (?by=, revenue by default), at most ?limit= of them (10 by default).
+    """
+    model = None
+    dimension = None
+    orderings = ('revenue', 'units', 'orders')
+    max_limit = 100
+
+    def get(self, request):
+        if request.query_params.get('by', 'revenue') not in self.orderings:
+            return Response(
+                {'error': f'by must be one of {", ".join(self.orderings)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {'error': f'limit must be a number from 1 to {self.max_limit}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().get(request)
+
+    def get_results(self, request, filters):
+        by = request.query_params.get('by', 'revenue')
+        limit = int(request.query_params.get('limit', 10))
+        return list(
+            self.model.objects.filter(**filters)
+            .values(self.dimension, name=F(f'{self.dimension}__name'))
+            .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+            .filter(units__gt=0)
+            .order_by(f'-{by}', 'name')[:limit]
+        )
+
+
+class TopProductsView(TopSellersView):
+    model = ProductDailySales
+    dimension = 'product'
+
+
+class TopCategoriesView(TopSellersView):
+    model = CategoryDailySales
+    dimension = 'category'
@@ -1,8 +1,8 @@
 import api from './axioConfig';
-import type { PaginatedResponse, OrderData } from '@/types/api'
+import type { PaginatedResponse, OrderData, OrderListData } from '@/types/api'
 
 export const orderService = {
-  getOrders: async (page = 1): Promise<PaginatedResponse<OrderData>> => {
+  getOrders: async (page = 1): Promise<PaginatedResponse<OrderListData>> => {
     const response = await api.get('/orders/', { params: { page } });
     return response.data;
   },
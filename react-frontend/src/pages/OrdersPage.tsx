@@ -7,7 +7,7 @@ import { Skeleton } from "@/components/ui/skeleton";
 import { Button } from "@/components/ui/button";
 import { Link } from "react-router";
 import { Tabs, TabsContent } from "@/components/ui/tabs";
-import { OrderData } from "@/types/api";
+import { OrderListData } from "@/types/api";
 
 const OrdersPage = () => {
   // const { user } = useAuth();
@@ -104,7 +104,7 @@ const OrdersPage = () => {
             </TabsList> */}
 
             <TabsContent value="all" className="space-y-6">
-              {orders.map((order: OrderData) => (
+              {orders.map((order: OrderListData) => (
                 <div key={order.id} className="bg-white rounded-lg shadow-sm p-6">
                   <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between mb-4">
                     <div>
@@ -151,8 +151,8 @@ const OrdersPage = () => {
 
             <TabsContent value="processing" className="space-y-6">
               {orders
-                .filter((order: OrderData) => order.status === "processing")
-                .map((order: OrderData) => (
+                .filter((order: OrderListData) => order.status === "processing")
+                .map((order: OrderListData) => (
                   <div key={order.id} className="bg-white rounded-lg shadow-sm p-6">
                     {/* Same content as above, but filtered */}
                     <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between mb-4">
@@ -201,8 +201,8 @@ const OrdersPage = () => {
             {/* Similar TabsContent for shipped status */}
             <TabsContent value="shipped" className="space-y-6">
               {orders
-                .filter((order: OrderData) => order.status === "shipped")
-                .map((order:OrderData) => (
+                .filter((order: OrderListData) => order.status === "shipped")
+                .map((order: OrderListData) => (
                   <div key={order.id} className="bg-white rounded-lg shadow-sm p-6">
                     {/* Same content structure as above */}
                     <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between mb-4">
@@ -251,8 +251,8 @@ const OrdersPage = () => {
             {/* TabsContent for delivered status */}
             <TabsContent value="delivered" className="space-y-6">
               {orders
-                .filter((order: OrderData) => order.status === "delivered")
-                .map((order: OrderData) => (
+                .filter((order: OrderListData) => order.status === "delivered")
+                .map((order: OrderListData) => (
                   <div key={order.id} className="bg-white rounded-lg shadow-sm p-6">
                     {/* Same content structure as above */}
                     <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between mb-4">
@@ -1,15 +1,23 @@
 import { createSlice, createAsyncThunk, PayloadAction } from '@reduxjs/toolkit';
 import { orderService } from '@/lib/api/orderService';
-import { OrderData, PaginatedResponse } from '@/types/api';
+import { OrderData, OrderListData, PaginatedResponse } from '@/types/api';
 
 interface OrderState {
-  orders: OrderData[];
+  orders: OrderListData[];
   order: OrderData | null;
   loading: boolean;
   error: string | null;
   totalCount: number;
 }
 
+// Checkout and status updates return the full order; the list keeps the
+// compact shape the order list endpoint serves
+const toListOrder = (order: OrderData): OrderListData => ({
+  ...order,
+  item_count: order.items.length,
+  units: order.items.reduce((units, item) => units + item.quantity, 0),
+});
+
 const initialState: OrderState = {
   orders: [],
   order: null,
@@ -84,7 +92,7 @@ const orderSlice = createSlice({
         state.loading = true;
         state.error = null;
       })
-      .addCase(fetchOrders.fulfilled, (state, action: PayloadAction<PaginatedResponse<OrderData>>) => {
+      .addCase(fetchOrders.fulfilled, (state, action: PayloadAction<PaginatedResponse<OrderListData>>) => {
         state.orders = action.payload.results;
         state.totalCount = action.payload.count;
         state.loading = false;
@@ -115,7 +123,7 @@ const orderSlice = createSlice({
       })
       .addCase(checkout.fulfilled, (state, action: PayloadAction<OrderData>) => {
         state.order = action.payload;
-        state.orders.unshift(action.payload);
+        state.orders.unshift(toListOrder(action.payload));
         state.totalCount += 1;
         state.loading = false;
       })
@@ -133,7 +141,7 @@ const orderSlice = createSlice({
         // Update the order in the orders array
         const index = state.orders.findIndex((order) => order.id === action.payload.id);
         if (index !== -1) {
-          state.orders[index] = action.payload;
+          state.orders[index] = toListOrder(action.payload);
         }
 
         // Update current order if we're viewing it
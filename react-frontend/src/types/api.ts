@@ -106,4 +106,15 @@ export interface OrderData {
   items: OrderItemData[];
   created_at: string;
   updated_at: string;
+}
+
+// Order lists carry only the product's id, name and image on each line
+export interface OrderListItemData extends Omit<OrderItemData, 'product_detail'> {
+  product_detail: Pick<ProductData, 'id' | 'name' | 'image'>;
+}
+
+export interface OrderListData extends Omit<OrderData, 'items'> {
+  item_count: number;
+  units: number;
+  items: OrderListItemData[];
 }
\ No newline at end of file